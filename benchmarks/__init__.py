@@ -0,0 +1,5 @@
+"""
+Benchmarks for djmodgraph. Run each module from the repository root, e.g.
+
+    python -m benchmarks.bench_parallel_parsing
+"""
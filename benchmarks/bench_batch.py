@@ -0,0 +1,70 @@
+"""
+Compare writing one filtered graph per model with separate `--models` runs
+against a single `--models-from` run, each as its own djmodgraph process.
+
+    python -m benchmarks.bench_batch --apps 20 --models-per-app 50 --queries 20 --format svg
+
+Separate runs are timed for --queries models and scaled up to every query,
+as running them all takes minutes for large projects. The single run writes
+every query.
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_project
+from model_class_dependencies import get_models_for_directory
+
+log = logging.getLogger(__name__)
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_class_dependencies.py')
+
+
+def djmodgraph(*args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, SCRIPT, *args, '-nocache', '-noshow'], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=10)
+    parser.add_argument('--models-per-app', type=int, default=30)
+    parser.add_argument('--queries', type=int, default=10,
+                        help='Number of separate runs to time.')
+    parser.add_argument('--format', default='svg')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'project')
+        generate_project(source, apps=args.apps, models_per_app=args.models_per_app)
+        names = list(get_models_for_directory(source))
+        queries = os.path.join(directory, 'queries.txt')
+        with open(queries, 'w') as f:
+            f.write('\n'.join(names))
+
+        extension = 'png' if args.format == 'matplotlib' else args.format
+        separate = [
+            djmodgraph(source, '--models', name, '--format', args.format,
+                       '--saveas', os.path.join(directory, f'{name}.{extension}'))
+            for name in names[:args.queries]
+        ]
+        batch = djmodgraph(source, '--models-from', queries, '--format', args.format,
+                           '--saveas', os.path.join(directory, 'batch'))
+        single = djmodgraph(source, '--format', args.format, '--saveas', os.path.join(directory, f'all.{extension}'))
+
+    per_query = sum(separate) / len(separate)
+    print(f'{len(names)} models, {args.format}')
+    print(f'{"one full run":<28} {single:>9.2f}s')
+    print(f'{"separate runs, per query":<28} {per_query:>9.2f}s')
+    print(f'{"separate runs, all queries":<28} {per_query * len(names):>9.2f}s (estimated)')
+    print(f'{"one --models-from run":<28} {batch:>9.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Time drawing a generated project with its apps collapsed, against drawing
+every model.
+
+    python -m benchmarks.bench_collapse_apps --apps 250 --models-per-app 20 --full-max 1000
+
+The project is parsed once. Each view is grouped, laid out with the force
+layout and drawn with show_graph to a PNG.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_project
+from model_class_dependencies import (
+    get_models_for_directory,
+    group_by_app,
+)
+from model_class_graph import (
+    classify,
+    collapse_apps,
+    generate_graph,
+    show_graph,
+)
+from model_class_layout import force_layout
+
+log = logging.getLogger(__name__)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=250)
+    parser.add_argument('--models-per-app', type=int, default=20)
+    parser.add_argument('--expand', type=int, default=2, help='Number of apps to expand in the last view.')
+    parser.add_argument('--full-max', type=int, default=None,
+                        help='Skip drawing every model for larger projects, as it takes minutes at 5k models.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'project')
+        generate_project(source, apps=args.apps, models_per_app=args.models_per_app, noise_files_per_app=0)
+        models = get_models_for_directory(source)
+        print(f'{len(models)} models in {args.apps} apps')
+
+        def collapsed(expand=()):
+            nodes, edges = classify(models)
+            return collapse_apps(models, nodes, edges, group_by_app(models, source), expand)
+
+        views = [
+            ('collapsed', collapsed),
+            (f'{args.expand} expanded', lambda: collapsed([f'app{a}' for a in range(args.expand)])),
+        ]
+        if args.full_max is None or len(models) <= args.full_max:
+            views.insert(0, ('every model', lambda: generate_graph(models)))
+
+        print(f'{"view":<14} {"nodes":>7} {"edges":>8} {"graph (s)":>10} {"layout (s)":>11} {"draw (s)":>9}')
+        for name, build in views:
+            graph_time, (graph, nodes, edges) = timed(build)
+            layout_time, positions = timed(force_layout, graph)
+            draw_time, _ = timed(
+                show_graph, graph, nodes, edges, show=False, positions=positions,
+                saveas=os.path.join(directory, 'graph.png'),
+            )
+            print(
+                f'{name:<14} {graph.number_of_nodes():>7} {graph.number_of_edges():>8} '
+                f'{graph_time:>10.3f} {layout_time:>11.3f} {draw_time:>9.3f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Time force_layout at increasing graph sizes, and spring_layout from networkx
+for comparison where it finishes in reasonable time.
+
+    python -m benchmarks.bench_force_layout --sizes 1000 5000 20000 --spring-max 1000
+
+Each size is also laid out again from its own positions with one model
+added, which is what happens on a layout cache miss after a small change.
+"""
+
+import argparse
+import logging
+import time
+
+from benchmarks.bench_generate_graph import generate_models
+from model_class_graph import generate_graph
+from model_class_layout import (
+    force_layout,
+    spring_layout,
+)
+
+log = logging.getLogger(__name__)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--theta', type=float, default=.8)
+    parser.add_argument('--spring-max', type=int, default=1000,
+                        help='Skip spring_layout for larger sizes, as it takes minutes at 5k models.')
+    args = parser.parse_args()
+
+    print(f'{"models":>8} {"edges":>8} {"layout":<14} {"time (s)":>9} {"per step (ms)":>14}')
+    for size in args.sizes:
+        graph, _, _ = generate_graph(generate_models(size))
+
+        layouts = [('force', force_layout, {'theta': args.theta})]
+        if size <= args.spring_max:
+            layouts.append(('spring', spring_layout, {}))
+
+        for name, fn, options in layouts:
+            elapsed, positions = timed(fn, graph, iterations=args.iterations, **options)
+            print(
+                f'{size:>8} {graph.number_of_edges():>8} {name:<14} {elapsed:>9.2f} '
+                f'{elapsed / args.iterations * 1000:>14.1f}'
+            )
+
+            graph.add_edge('NewModel', next(iter(graph.nodes)))
+            elapsed, _ = timed(fn, graph, positions, iterations=args.iterations, **options)
+            graph.remove_node('NewModel')
+            print(f'{size:>8} {graph.number_of_edges():>8} {name + " seeded":<14} {elapsed:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Time generate_graph with and without a --models query as the number of
+models grows. Time per model should stay roughly constant.
+
+    python -m benchmarks.bench_generate_graph --sizes 1000 2000 4000 8000
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Dict
+
+from model_class_dependencies import (
+    Field,
+    PyClass,
+)
+from model_class_graph import generate_graph
+
+log = logging.getLogger(__name__)
+
+RELATION_TYPES = [
+    'models.ForeignKey',
+    'models.OneToOneField',
+    'models.ManyToManyField',
+]
+
+
+def generate_models(count: int, relations_per_model: int = 3, seed: int = 0) -> Dict[str, PyClass]:
+    """Build resolved models in memory, without writing or parsing any files."""
+    rng = random.Random(seed)
+    names = [f'Model{i}' for i in range(count)]
+
+    models = {'BaseModel': PyClass('BaseModel', ['models.Model'], [], abstract=True)}
+    for name in names:
+        fields = [
+            Field(f'rel_{i}', rng.choice(RELATION_TYPES), [rng.choice(names)], {})
+            for i in range(relations_per_model)
+        ]
+        models[name] = PyClass(name, ['BaseModel'], fields)
+
+    for model in models.values():
+        model.is_model = True
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 8000])
+    parser.add_argument('--query-fraction', type=float, default=0.1,
+                        help='Fraction of models passed as for_models.')
+    args = parser.parse_args()
+
+    print(f'{"models":>8} {"all (s)":>10} {"query (s)":>10} {"query us/model":>15}')
+    for size in args.sizes:
+        models = generate_models(size)
+        for_models = [f'Model{i}' for i in range(int(size * args.query_fraction))]
+
+        start = time.perf_counter()
+        generate_graph(models)
+        everything = time.perf_counter() - start
+
+        start = time.perf_counter()
+        generate_graph(models, for_models=for_models)
+        query = time.perf_counter() - start
+
+        print(f'{size:>8} {everything:>10.3f} {query:>10.3f} {query / size * 1e6:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Measure startup cost with `python -X importtime` for the parse-only path and
+for the graph module, and list the slowest imports of each.
+
+    python -m benchmarks.bench_import_time --repeat 5
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+
+log = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'parse only': 'from model_class_dependencies import get_models_for_directory',
+    'graph module': 'import model_class_graph',
+    'graph and plotting': 'import model_class_graph, matplotlib.pyplot, networkx',
+}
+
+HEAVY_MODULES = ['matplotlib', 'networkx', 'numpy']
+
+
+def importtime(code: str):
+    """Return (total microseconds, {module: cumulative microseconds}) for
+    the top-level imports made by code."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+        if not name.startswith('  '):
+            # Only count top-level imports in the total, as nested ones are
+            # included in their parent's cumulative time.
+            modules.setdefault('<total>', 0)
+            modules['<total>'] += int(cumulative)
+    return modules.pop('<total>', 0), modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest imports to list.')
+    args = parser.parse_args()
+
+    # Write bytecode caches first so that compiling the modules is not measured.
+    importtime('import model_class_dependencies, model_class_graph')
+
+    for label, code in TARGETS.items():
+        runs = [importtime(code) for _ in range(args.repeat)]
+        total, modules = min(runs, key=lambda run: run[0])
+        heavy = [m for m in HEAVY_MODULES if m in modules]
+        print(f'{label:<20} {total / 1000:8.1f}ms  heavy modules loaded: {", ".join(heavy) or "none"}')
+        for name, cumulative in sorted(modules.items(), key=lambda m: m[1], reverse=True)[:args.top]:
+            print(f'    {cumulative / 1000:8.1f}ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Time layered_layout on generated inheritance hierarchies, and count the
+crossings between subclass edges in adjacent layers before and after
+ordering.
+
+    python -m benchmarks.bench_layered_layout --sizes 1000 3000 10000
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Dict
+
+from model_class_dependencies import (
+    Field,
+    PyClass,
+)
+from model_class_graph import generate_graph
+from model_class_layout import (
+    _is_subclass_edge,
+    layered_layout,
+)
+
+log = logging.getLogger(__name__)
+
+
+def generate_hierarchy(
+        count: int,
+        multiple_inheritance: float = .2,
+        relations_per_model: int = 3,
+        seed: int = 0,
+) -> Dict[str, PyClass]:
+    """Build resolved models in memory where each model subclasses one or,
+    with probability multiple_inheritance, two models defined before it."""
+    rng = random.Random(seed)
+    models = {'BaseModel': PyClass('BaseModel', ['models.Model'], [], abstract=True)}
+    names = ['BaseModel']
+    for i in range(count):
+        name = f'Model{i}'
+        bases = [rng.choice(names)]
+        if rng.random() < multiple_inheritance:
+            bases.append(rng.choice(names))
+        fields = [
+            Field(f'rel_{j}', 'models.ForeignKey', [rng.choice(names)], {})
+            for j in range(relations_per_model)
+        ]
+        models[name] = PyClass(name, bases, fields)
+        names.append(name)
+
+    for model in models.values():
+        model.is_model = True
+    return models
+
+
+def subclass_crossings(graph, positions) -> int:
+    """Count crossings between subclass edges that join the same two rows."""
+    rows = {}
+    for source, target in graph.edges():
+        if _is_subclass_edge(graph, source, target):
+            (lower_x, lower_y), (upper_x, upper_y) = positions[source], positions[target]
+            rows.setdefault((upper_y, lower_y), []).append((upper_x, lower_x))
+
+    count = 0
+    for edges in rows.values():
+        edges.sort()
+        for i, (_, lower) in enumerate(edges):
+            count += sum(1 for upper, other in edges[i + 1:] if other < lower and upper != edges[i][0])
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 3000, 10000])
+    parser.add_argument('--iterations', type=int, default=8)
+    parser.add_argument('-nocrossings', dest='crossings', action='store_false',
+                        help='Skip counting crossings, which is quadratic in the widest layer.')
+    args = parser.parse_args()
+
+    print(f'{"models":>8} {"edges":>8} {"time (s)":>9} {"crossings before":>17} {"after":>8}')
+    for size in args.sizes:
+        graph, _, _ = generate_graph(generate_hierarchy(size))
+
+        start = time.perf_counter()
+        positions = layered_layout(graph, iterations=args.iterations, max_width=len(graph))
+        elapsed = time.perf_counter() - start
+
+        before = after = '-'
+        if args.crossings:
+            # A negative budget skips every sweep and keeps the initial order.
+            before = subclass_crossings(graph, layered_layout(graph, iterations=-1, max_width=len(graph)))
+            after = subclass_crossings(graph, positions)
+        print(f'{size:>8} {graph.number_of_edges():>8} {elapsed:>9.3f} {before:>17} {after:>8}')
+
+
+if __name__ == '__main__':
+    main()
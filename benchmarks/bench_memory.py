@@ -0,0 +1,60 @@
+"""
+Measure the memory held by the parsed models of a synthetic project.
+
+Memory is traced with tracemalloc while get_models_for_directory runs. The
+retained figure is what the returned models dict keeps alive afterwards.
+
+    python -m benchmarks.bench_memory --apps 100 --models-per-app 100
+"""
+
+import argparse
+import gc
+import logging
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import generate_project
+from model_class_dependencies import get_models_for_directory
+
+log = logging.getLogger(__name__)
+
+
+def run(directory):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    models = get_models_for_directory(directory)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    fields = sum(len(m.fields) for m in models.values())
+    print(
+        f'{len(models)} models, {fields} fields in {elapsed:.2f}s\n'
+        f'  retained: {retained / 1024 / 1024:8.1f}MB  ({retained / len(models):.0f} bytes/model)\n'
+        f'  peak:     {peak / 1024 / 1024:8.1f}MB'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=100)
+    parser.add_argument('--models-per-app', type=int, default=100)
+    parser.add_argument('--fields-per-model', type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_project(
+            directory,
+            apps=args.apps,
+            models_per_app=args.models_per_app,
+            fields_per_model=args.fields_per_model,
+            noise_files_per_app=0,
+        )
+        run(directory)
+
+
+if __name__ == '__main__':
+    main()
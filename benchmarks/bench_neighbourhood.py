@@ -0,0 +1,60 @@
+"""
+Time neighbourhood queries at increasing depth on a large generated graph,
+against generate_graph with for_models, which scans every model.
+
+    python -m benchmarks.bench_neighbourhood --models 100000 --depths 1 2 3
+
+The index is built once, as in a --models-from run. Each query starts from
+one model and follows relations forward, so neighbourhoods grow by about
+three models per model at each step.
+"""
+
+import argparse
+import logging
+import time
+
+from benchmarks.bench_generate_graph import generate_models
+from model_class_graph import (
+    EdgeIndex,
+    classify,
+    filter_graph,
+    generate_graph,
+)
+
+log = logging.getLogger(__name__)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', type=int, default=100000)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3, 4, 5])
+    parser.add_argument('--direction', default='forward')
+    args = parser.parse_args()
+
+    models = generate_models(args.models)
+    build, (_, edges) = timed(classify, models)
+    index_time, index = timed(EdgeIndex, edges)
+    scan, _ = timed(generate_graph, models, for_models=['Model0'])
+
+    print(f'{args.models} models')
+    print(f'{"classify":<30} {build:>9.3f}s')
+    print(f'{"EdgeIndex":<30} {index_time:>9.3f}s')
+    print(f'{"generate_graph, for_models":<30} {scan:>9.3f}s')
+    print()
+    print(f'{"depth":>5} {"models":>8} {"edges":>8} {"filter_graph (ms)":>18}')
+    for depth in args.depths:
+        elapsed, (subgraph, _, _) = timed(
+            filter_graph, models, index, ['Model0'],
+            depth=depth, kinds=['foreignkey', 'onetoone', 'manytomany'], direction=args.direction,
+        )
+        print(f'{depth:>5} {len(subgraph):>8} {subgraph.number_of_edges():>8} {elapsed * 1000:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare serial and parallel parse_classes_from_directory on a synthetic tree.
+
+    python -m benchmarks.bench_parallel_parsing --apps 200 --jobs 1 2 4 8
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_project
+from model_class_dependencies import parse_classes_from_directory
+
+log = logging.getLogger(__name__)
+
+
+def _time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=200)
+    parser.add_argument('--models-per-app', type=int, default=50)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_project(directory, apps=args.apps, models_per_app=args.models_per_app)
+
+        serial, expected = _time(lambda: parse_classes_from_directory(directory), args.repeat)
+        print(f'jobs=1   {serial:8.3f}s  ({len(expected)} classes)')
+
+        for jobs in args.jobs:
+            elapsed, actual = _time(
+                lambda: parse_classes_from_directory(directory, jobs=jobs),
+                args.repeat,
+            )
+            assert list(actual) == list(expected), 'Parallel output differs from serial'
+            print(f'jobs={jobs:<3} {elapsed:8.3f}s  speedup x{serial / elapsed:.2f}')
+
+
+if __name__ == '__main__':
+    main()
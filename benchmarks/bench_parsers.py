@@ -0,0 +1,96 @@
+"""
+Compare throughput and accuracy of each engine in PARSERS.
+
+Accuracy is reported as agreement with the ast engine, which reads the same
+syntax tree as Python itself: the number of classes and fields that each
+engine finds differently.
+
+    python -m benchmarks.bench_parsers --apps 100
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_project
+from model_class_dependencies import (
+    PARSERS,
+    find_python_files,
+)
+
+log = logging.getLogger(__name__)
+
+EXAMPLE_PACKAGE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'tests/data/example-models-package',
+)
+
+
+def _read_tree(directory):
+    texts = []
+    for filepath in find_python_files(directory):
+        with open(filepath, 'r') as f:
+            texts.append(f.read())
+    return texts
+
+
+def _differences(expected, actual):
+    """Return the number of classes and fields that differ between two parse results."""
+    classes = 0
+    fields = 0
+    for name in expected.keys() | actual.keys():
+        a, b = expected.get(name), actual.get(name)
+        if a is None or b is None:
+            classes += 1
+            continue
+        if a.class_dependencies != b.class_dependencies or a.abstract != b.abstract:
+            classes += 1
+        a_fields = {f.name: f for f in a.fields}
+        b_fields = {f.name: f for f in b.fields}
+        fields += sum(1 for f in a_fields.keys() | b_fields.keys() if a_fields.get(f) != b_fields.get(f))
+    return classes, fields
+
+
+def run(label, texts, repeat):
+    size = sum(len(t) for t in texts) / 1024 / 1024
+    print(f'{label}: {len(texts)} files, {size:.1f}MB')
+
+    reference = [PARSERS['ast'](t) for t in texts]
+    for name, parse in PARSERS.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = [parse(t) for t in texts]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        classes = fields = 0
+        for expected, actual in zip(reference, results):
+            c, f = _differences(expected, actual)
+            classes += c
+            fields += f
+
+        print(
+            f'  {name:<9} {best:8.3f}s {size / best:7.2f}MB/s  '
+            f'classes differing: {classes:<6} fields differing: {fields}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=100)
+    parser.add_argument('--models-per-app', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    run('example-models-package', _read_tree(EXAMPLE_PACKAGE), args.repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_project(directory, apps=args.apps, models_per_app=args.models_per_app)
+        run('synthetic', _read_tree(directory), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
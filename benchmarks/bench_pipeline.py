@@ -0,0 +1,166 @@
+"""
+Time each stage of the pipeline end to end on a synthetic project and write
+the results as JSON, so that runs on different commits can be compared.
+
+    python -m benchmarks.bench_pipeline --apps 20 --models-per-app 50 --output before.json
+    python -m benchmarks.bench_pipeline --apps 20 --models-per-app 50 --compare before.json
+
+Each repeat runs every stage in order on fresh data. The best time for each
+stage is reported alongside every individual run.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_project
+from model_class_dependencies import (
+    filter_models,
+    inherit_mixin_fields,
+    parse_classes_from_directory,
+)
+from model_class_graph import (
+    generate_graph,
+    show_graph,
+)
+
+log = logging.getLogger(__name__)
+
+STAGES = [
+    'parse_classes_from_directory',
+    'filter_models',
+    'inherit_mixin_fields',
+    'generate_graph',
+    'show_graph',
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(directory, jobs=1, parser='regex', render=True, saveas=None):
+    """Run every stage once and return ({stage: seconds}, counts)."""
+    timings = {}
+
+    def timed(stage, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    classes = timed(
+        'parse_classes_from_directory',
+        lambda: parse_classes_from_directory(directory, jobs=jobs, parser=parser),
+    )
+    class_count = len(classes)
+    timed('filter_models', lambda: filter_models(classes))
+    timed('inherit_mixin_fields', lambda: inherit_mixin_fields(classes))
+    graph, nodes, edges = timed('generate_graph', lambda: generate_graph(classes))
+    if render:
+        timed('show_graph', lambda: show_graph(graph, nodes, edges, show=False, saveas=saveas))
+
+    counts = {
+        'classes': class_count,
+        'models': len(classes),
+        'fields': sum(len(m.fields) for m in classes.values()),
+        'nodes': graph.number_of_nodes(),
+        'edges': {kind: len(e) for kind, e in edges.items()},
+    }
+    return timings, counts
+
+
+def compare(report, previous):
+    """Print the change in best time for each stage against an earlier report."""
+    print(f'{"stage":<30} {"before (s)":>11} {"after (s)":>11} {"change":>8}')
+    for stage in STAGES:
+        before = previous['best'].get(stage)
+        after = report['best'].get(stage)
+        if before is None or after is None:
+            continue
+        print(f'{stage:<30} {before:>11.3f} {after:>11.3f} {(after - before) / before:>+8.1%}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apps', type=int, default=20)
+    parser.add_argument('--models-per-app', type=int, default=20)
+    parser.add_argument('--fields-per-model', type=int, default=6)
+    parser.add_argument('--relation-density', type=float, default=1 / 3)
+    parser.add_argument('--mixin-depth', type=int, default=2)
+    parser.add_argument('--noise-files-per-app', type=int, default=5)
+    parser.add_argument('--noise-classes-per-app', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--parser', default='regex')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-norender', dest='render', action='store_false',
+                        help='Skip show_graph, which dominates on large projects.')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+    parser.add_argument('--compare', help='JSON report from an earlier run to compare against.')
+    args = parser.parse_args()
+
+    project = {
+        'apps': args.apps,
+        'models_per_app': args.models_per_app,
+        'fields_per_model': args.fields_per_model,
+        'relation_density': args.relation_density,
+        'mixin_depth': args.mixin_depth,
+        'noise_files_per_app': args.noise_files_per_app,
+        'noise_classes_per_app': args.noise_classes_per_app,
+        'seed': args.seed,
+    }
+
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'project')
+        generate_project(source, **project)
+        for _ in range(args.repeat):
+            timings, counts = run_pipeline(
+                source,
+                jobs=args.jobs,
+                parser=args.parser,
+                render=args.render,
+                saveas=os.path.join(directory, 'graph.png'),
+            )
+            runs.append(timings)
+
+    report = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'project': project,
+        'options': {'jobs': args.jobs, 'parser': args.parser, 'render': args.render},
+        'counts': counts,
+        'best': {stage: min(run[stage] for run in runs) for stage in runs[0]},
+        'runs': runs,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
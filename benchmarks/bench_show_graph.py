@@ -0,0 +1,60 @@
+"""
+Compare show_graph drawing curved arrows, one patch per edge, with drawing
+each kind of edge as a single collection. Both use the same precomputed
+circular layout and save a PNG, so only drawing is timed.
+
+    python -m benchmarks.bench_show_graph --sizes 100 1000 5000 --curved-max 1000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import networkx as nx
+
+from benchmarks.bench_generate_graph import generate_models
+from model_class_graph import (
+    generate_graph,
+    show_graph,
+)
+
+log = logging.getLogger(__name__)
+
+PATHS = {
+    'curved': None,  # No limit, so curved arrows are always drawn.
+    'collection': 0,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--curved-max', type=int, default=1000,
+                        help='Skip curved arrows for larger sizes, as they take minutes at 5k models.')
+    args = parser.parse_args()
+
+    print(f'{"models":>8} {"edges":>8} {"path":<11} {"time (s)":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            graph, nodes, edges = generate_graph(generate_models(size))
+            positions = nx.circular_layout(graph)
+            edge_count = sum(len(e) for e in edges.values())
+
+            for name, limit in PATHS.items():
+                if limit is None and size > args.curved_max:
+                    continue
+                start = time.perf_counter()
+                show_graph(
+                    graph, nodes, edges,
+                    show=False,
+                    positions=positions,
+                    saveas=os.path.join(directory, f'{name}-{size}.png'),
+                    curved_edge_limit=limit,
+                )
+                print(f'{size:>8} {edge_count:>8} {name:<11} {time.perf_counter() - start:>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare write_svg with show_graph saving an SVG through matplotlib. Both use
+the same precomputed circular layout, so only drawing is timed.
+
+    python -m benchmarks.bench_svg --sizes 100 1000 10000 --matplotlib-max 1000
+
+Peak memory is traced with tracemalloc in a separate run of each, as tracing
+slows both down.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+
+from benchmarks.bench_generate_graph import generate_models
+from model_class_export import write_svg
+from model_class_graph import (
+    generate_graph,
+    show_graph,
+)
+
+log = logging.getLogger(__name__)
+
+
+def _with_svg(graph, nodes, edges, positions, path):
+    with open(path, 'w') as f:
+        write_svg(graph, nodes, edges, f, positions=positions)
+
+
+def _with_matplotlib(graph, nodes, edges, positions, path):
+    show_graph(graph, nodes, edges, show=False, layout_fn=lambda g: positions, saveas=path)
+
+
+def measure(fn, *args):
+    """Return (seconds, peak traced bytes) for fn(*args)."""
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--matplotlib-max', type=int, default=None,
+                        help='Skip matplotlib for larger sizes, as it takes minutes at 10k models.')
+    args = parser.parse_args()
+
+    print(f'{"models":>8} {"edges":>8} {"renderer":<11} {"time (s)":>9} {"peak (MB)":>10} {"file (MB)":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            graph, nodes, edges = generate_graph(generate_models(size))
+            positions = nx.circular_layout(graph)
+            edge_count = sum(len(e) for e in edges.values())
+
+            renderers = [('svg', _with_svg)]
+            if args.matplotlib_max is None or size <= args.matplotlib_max:
+                renderers.append(('matplotlib', _with_matplotlib))
+
+            for name, fn in renderers:
+                path = os.path.join(directory, f'{name}-{size}.svg')
+                elapsed, peak = measure(fn, graph, nodes, edges, positions, path)
+                print(
+                    f'{size:>8} {edge_count:>8} {name:<11} {elapsed:>9.3f} '
+                    f'{peak / 1024 / 1024:>10.1f} {os.path.getsize(path) / 1024 / 1024:>10.1f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
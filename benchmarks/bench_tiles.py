@@ -0,0 +1,89 @@
+"""
+Time write_tiles and measure its peak memory as the grid grows, against
+show_graph drawing the same graph as one image with as many pixels as all
+the tiles together.
+
+    python -m benchmarks.bench_tiles --models 5000 --grids 2 4 8
+
+Each run is in its own process, so that the peak resident set size reported
+by the operating system belongs to that run alone. It includes the image
+buffers that matplotlib allocates outside Python, which tracemalloc misses.
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from model_class_graph import TILE_SIZE
+
+log = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(mode: str, models: int, grid: int, directory: str):
+    """Draw the graph once in this process and print timings as JSON."""
+    import matplotlib.pyplot as plt
+
+    from benchmarks.bench_generate_graph import generate_models
+    from model_class_graph import generate_graph, show_graph, write_tiles
+    from model_class_layout import force_layout
+
+    graph, nodes, edges = generate_graph(generate_models(models))
+    positions = force_layout(graph, iterations=20)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if mode == 'tiles':
+        write_tiles(graph, nodes, edges, directory, positions=positions, grid=grid)
+    else:
+        # Keep the figure open to save it at the combined resolution of the tiles.
+        close, plt.close = plt.close, lambda *args: None
+        show_graph(graph, nodes, edges, show=False, positions=positions)
+        plt.close = close
+        plt.figure(1).savefig(os.path.join(directory, 'graph.png'), dpi=100 * grid * TILE_SIZE / 28)
+        plt.close('all')
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': elapsed, 'peak_kb': peak, 'drawing_kb': peak - baseline}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', type=int, default=5000)
+    parser.add_argument('--grids', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--single-max', type=int, default=4,
+                        help='Skip the single image for larger grids, as it needs gigabytes of memory.')
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'GRID'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        with tempfile.TemporaryDirectory() as directory:
+            run(args.run[0], args.models, int(args.run[1]), directory)
+        return
+
+    print(f'{"grid":>5} {"pixels":>12} {"mode":<7} {"time (s)":>9} {"peak RSS (MB)":>14} {"drawing (MB)":>13}')
+    for grid in args.grids:
+        modes = ['tiles'] + (['single'] if grid <= args.single_max else [])
+        for mode in modes:
+            result = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_tiles', '--models', str(args.models), '--run', mode, str(grid)],
+                cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+            )
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            side = grid * TILE_SIZE * 100  # matplotlib's default dpi.
+            print(
+                f'{grid:>5} {f"{side}x{side}":>12} {mode:<7} {report["seconds"]:>9.1f} '
+                f'{report["peak_kb"] / 1024:>14.0f} {report["drawing_kb"] / 1024:>13.0f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Generate synthetic Django projects for benchmarking.
+"""
+
+import logging
+import os
+import random
+
+log = logging.getLogger(__name__)
+
+
+FIELD_TYPES = [
+    'models.CharField(max_length=255)',
+    'models.TextField(blank=True)',
+    'models.PositiveIntegerField(default=0)',
+    'models.DateField(null=True)',
+    'models.BooleanField(default=False)',
+]
+
+RELATION_TYPES = [
+    'models.ForeignKey',
+    'models.OneToOneField',
+    'models.ManyToManyField',
+]
+
+
+def _noise_module(app: int, index: int) -> str:
+    lines = ['import logging\n\nlog = logging.getLogger(__name__)\n']
+    for i in range(20):
+        lines.append(
+            f'\n\nclass App{app}View{index}_{i}(View):\n'
+            f'    template_name = \'app{app}/view{i}.html\'\n\n'
+            f'    def get(self, request, *args, **kwargs):\n'
+            f'        context = self.get_context_data(**kwargs)\n'
+            f'        log.info(\'rendering %s\', self.template_name)\n'
+            f'        return render(request, self.template_name, context)\n'
+        )
+        lines.append(
+            f'\n\ndef helper_{i}(value):\n'
+            f'    result = [x * {i} for x in range(value)]\n'
+            f'    return sum(result)\n'
+        )
+    return ''.join(lines)
+
+
+def _noise_class(app: int, index: int) -> str:
+    """A non-model class that looks like a model to a quick scan of its body."""
+    return (
+        f'\n\nclass App{app}Form{index}(forms.ModelForm):\n'
+        f'    name = forms.CharField(max_length=64)\n'
+        f'    notes = forms.CharField(widget=forms.Textarea(attrs={{\'rows\': 3}}))\n\n'
+        f'    class Meta:\n'
+        f'        fields = [\'name\', \'notes\']\n'
+    )
+
+
+def generate_project(
+        directory: str,
+        apps: int = 10,
+        models_per_app: int = 20,
+        fields_per_model: int = 6,
+        noise_files_per_app: int = 5,
+        seed: int = 0,
+        relation_density: float = 1 / 3,
+        mixin_depth: int = 0,
+        noise_classes_per_app: int = 0,
+):
+    """Write a fake Django project to directory, with one models.py per app.
+
+    Each model extends a shared abstract BaseModel and has a mix of plain
+    fields and relation fields pointing at other generated models. Each app
+    also gets noise_files_per_app modules of non-model code, as most files in
+    a real project do not define any models.
+
+    relation_density is the fraction of fields that are relations. With
+    mixin_depth > 0, each app defines a chain of that many abstract mixins
+    between BaseModel and its models. noise_classes_per_app non-model classes
+    are added to each models.py."""
+    rng = random.Random(seed)
+    model_names = [
+        f'App{a}Model{m}' for a in range(apps) for m in range(models_per_app)
+    ]
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'base.py'), 'w') as f:
+        f.write(
+            'from django.db import models\n\n\n'
+            'class BaseModel(models.Model):\n'
+            '    created_on = models.DateTimeField(auto_now_add=True)\n\n'
+            '    class Meta:\n'
+            '        abstract = True\n'
+        )
+
+    for a in range(apps):
+        app_dir = os.path.join(directory, f'app{a}')
+        os.makedirs(app_dir, exist_ok=True)
+
+        lines = ['from django import forms\nfrom django.db import models\n']
+        base = 'BaseModel'
+        for d in range(mixin_depth):
+            lines.append(
+                f'\n\nclass App{a}Mixin{d}({base}):\n'
+                f'    mixin_{d} = {rng.choice(FIELD_TYPES)}\n\n'
+                f'    class Meta:\n'
+                f'        abstract = True\n'
+            )
+            base = f'App{a}Mixin{d}'
+
+        for m in range(models_per_app):
+            lines.append(f'\n\nclass App{a}Model{m}({base}):\n')
+            for i in range(fields_per_model):
+                if rng.random() < relation_density:
+                    relation = rng.choice(RELATION_TYPES)
+                    target = rng.choice(model_names)
+                    lines.append(
+                        f'    field_{i} = {relation}(\n'
+                        f'        \'{target}\',\n'
+                        f'        on_delete=models.CASCADE,\n'
+                        f'    )\n'
+                    )
+                else:
+                    lines.append(f'    field_{i} = {rng.choice(FIELD_TYPES)}\n')
+
+        for n in range(noise_classes_per_app):
+            lines.append(_noise_class(a, n))
+
+        with open(os.path.join(app_dir, 'models.py'), 'w') as f:
+            f.write(''.join(lines))
+
+        for n in range(noise_files_per_app):
+            with open(os.path.join(app_dir, f'views{n}.py'), 'w') as f:
+                f.write(_noise_module(a, n))
+
+    return model_names
@@ -3,38 +3,82 @@ Parse project files and build a dependency diagram between Django models,
 including class inheritance and foreign key/m2m/121 relationships.
 """
 import argparse
+import ast
+import hashlib
+import io
+import json
 import logging
 import os
+import pickle
 import re
-from dataclasses import dataclass
+import sys
+import tempfile
+import time
+import tokenize
+import tracemalloc
+from collections import deque
+from collections.abc import Sequence
+from contextlib import contextmanager, nullcontext
+from itertools import islice
 from typing import (
+    Callable,
+    Container,
     Dict,
+    Iterator,
     List,
+    Optional,
+    Set,
+    TextIO,
     Tuple,
 )
 
-import matplotlib.pyplot as plt
-import networkx as nx
+__version__ = '0.1'
 
 log = logging.getLogger(__name__)
 log.addHandler(logging.StreamHandler())
 log.setLevel(logging.INFO)
 
 
+def __getattr__(name):
+    # Graph building and drawing need networkx and matplotlib, which are slow
+    # to import, so they live in model_class_graph and are only imported
+    # when first used.
+    if name in ('generate_graph', 'show_graph'):
+        import model_class_graph
+        return getattr(model_class_graph, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# Each of these patterns must run in time linear to the size of its input:
+# avoid nested or adjacent quantifiers that can match the same characters,
+# and unbounded scans that can be retried from many starting positions.
+# See tests/test_pathological_inputs.py.
 FIELD_REGEX = re.compile(
-    r'\s+([^\s]+) = ([^(]+?)\(([^)]*?)\)',
-    re.DOTALL
-)
-ABSTRACT_MODEL_REGEX = re.compile(
-    r'.*class Meta:.*abstract = True',
-    re.DOTALL
+    r'^[ \t]+(\S+) = ([^(\n]+?)\(([^)]*)\)',
+    re.MULTILINE
 )
 MODEL_REGEX = re.compile(
-    r'^class ([\S]+)\(([^)]*?)\):\n(.*?)(\Z|(?=^[\S]))',
-    re.DOTALL | re.MULTILINE
+    r'^class ([^\s(]+)\(([^()]*)\):\n',
+    re.MULTILINE
+)
+# The body of a class ends at the next line that is not indented.
+CLASS_END_REGEX = re.compile(
+    r'^\S',
+    re.MULTILINE
 )
 
 
+# Field types that relate one model to another, and the kind of edge each
+# one produces in generate_graph.
+RELATION_FIELD_TYPES = {
+    'models.ForeignKey': 'foreignkey',
+    'models.OneToOneField': 'onetoone',
+    'models.ManyToManyField': 'manytomany',
+}
+
+# Increment when the structure of cached parse results changes.
+CACHE_VERSION = 4
+
 DIRECTORY_BLACKLIST = [
     '__pycache__',
     '.git',
@@ -48,53 +92,273 @@ DIRECTORY_BLACKLIST = [
 ]
 
 
-@dataclass
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
 class Field:
-    name: str
-    type: str
-    args: List
-    kwargs: Dict
+    """A field assigned in a class body, e.g. `name = models.CharField(max_length=64)`.
+
+    Names, types and arguments repeat across a project, so they are interned:
+    every field of the same type shares one type string."""
+
+    __slots__ = ('name', 'type', 'args', 'kwargs')
+
+    def __init__(self, name: str, type: str, args: List, kwargs: Dict):
+        self.name = _intern(name)
+        self.type = _intern(type)
+        self.args = [_intern(x) for x in args]
+        self.kwargs = {_intern(k): _intern(v) for k, v in kwargs.items()}
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.name, self.type, self.args, self.kwargs) == \
+            (other.name, other.type, other.args, other.kwargs)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'Field(name={self.name!r}, type={self.type!r}, args={self.args!r}, kwargs={self.kwargs!r})'
+
+    def __reduce__(self):
+        # Rebuild through __init__ so that unpickled strings are interned too.
+        return self.__class__, (self.name, self.type, self.args, self.kwargs)
+
+
+class InheritedFields(Sequence):
+    """The fields of a model, including those it inherits.
+
+    Nothing is copied from base classes: each instance holds the fields
+    declared on its own model and refers to the InheritedFields of the models
+    it extends. Iterating walks the method resolution order and yields each
+    field whose name is not already defined closer to the model, so creating
+    one takes time and memory for its own fields only, however deep the
+    hierarchy above it.
+
+    Single inheritance continues into the order of the base. Only a class with
+    several bases keeps an order of its own, merged once when first needed."""
+
+    __slots__ = ('own', 'bases', '_merged', '_length')
+
+    def __init__(self, own: List[Field], bases: Tuple['InheritedFields', ...] = ()):
+        self.own = own
+        self.bases = bases
+        self._merged: Optional[Tuple[InheritedFields, ...]] = None
+        self._length: Optional[int] = None
+
+    def _linearize(self) -> Iterator['InheritedFields']:
+        node = self
+        while True:
+            yield node
+            if len(node.bases) != 1:
+                break
+            node = node.bases[0]
+
+        if len(node.bases) > 1:
+            if node._merged is None:
+                node._merged = tuple(_c3_merge([b.mro() for b in node.bases] + [list(node.bases)]))
+            yield from node._merged
+
+    def mro(self) -> List['InheritedFields']:
+        """Return self and all bases, linearized in the same way as Python classes."""
+        return list(self._linearize())
+
+    def __iter__(self) -> Iterator[Field]:
+        seen = set()
+        for node in self._linearize():
+            for field in node.own:
+                if field.name not in seen:
+                    seen.add(field.name)
+                    yield field
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for field in islice(self, index, None):
+                return field
+        raise IndexError('InheritedFields index out of range')
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (InheritedFields, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'InheritedFields({list(self)!r})'
+
+
+def _c3_merge(sequences: List[List]) -> List:
+    """Merge linearizations of base classes as in Python's C3 method resolution order.
+
+    Each sequence is read through a pointer to its head, and the number of
+    times each class appears after the head of a sequence is counted, so the
+    merge takes time proportional to the total length of sequences times
+    their number.
+
+    If the hierarchy has no consistent order, the remaining classes are
+    appended depth-first instead of raising an error."""
+    sequences = [s for s in sequences if s]
+    heads = [0] * len(sequences)
+    # Compare by identity: `in` would compare InheritedFields by value.
+    tails: Dict[int, int] = {}
+    for sequence in sequences:
+        for x in sequence[1:]:
+            tails[id(x)] = tails.get(id(x), 0) + 1
+
+    merged = set()
+    result = []
+
+    def advance(i: int):
+        """Move past the head of sequences[i], and any classes already merged."""
+        sequence = sequences[i]
+        heads[i] += 1
+        while heads[i] < len(sequence):
+            tails[id(sequence[heads[i]])] -= 1
+            if id(sequence[heads[i]]) not in merged:
+                break
+            heads[i] += 1
+
+    while True:
+        active = [i for i in range(len(sequences)) if heads[i] < len(sequences[i])]
+        if not active:
+            return result
+        for i in active:
+            head = sequences[i][heads[i]]
+            if not tails.get(id(head)):
+                break
+        else:
+            head = sequences[active[0]][heads[active[0]]]
+
+        result.append(head)
+        merged.add(id(head))
+        for i in active:
+            if sequences[i][heads[i]] is head:
+                advance(i)
 
 
-@dataclass
 class PyClass:
-    name: str
-    class_dependencies: List[str]
-    fields: List[Field]
-    abstract: bool = False
-    is_model = False
+    """A top-level class and, once it is known to be a model, its fields."""
+
+    __slots__ = (
+        'name',
+        'class_dependencies',
+        '_fields',
+        'abstract',
+        'source',  # Path of the file that defines this class.
+        'is_model',
+        # Relation fields and the names of the models they reference, by
+        # relation kind. Built from fields when first needed and cleared when
+        # fields is set.
+        '_relations',
+    )
+
+    def __init__(
+            self,
+            name: str,
+            class_dependencies: List[str],
+            fields: List[Field],
+            abstract: bool = False,
+            source: Optional[str] = None,
+    ):
+        self.name = _intern(name)
+        self.class_dependencies = [_intern(x) for x in class_dependencies]
+        self.fields = fields
+        self.abstract = abstract
+        self.source = source
+        self.is_model = False
+
+    @property
+    def fields(self) -> List[Field]:
+        return self._fields
+
+    @fields.setter
+    def fields(self, value: List[Field]):
+        self._fields = value
+        self._relations = None
+
+    def copy(self) -> 'PyClass':
+        """Return a new, unclassified PyClass with the same parse results."""
+        return PyClass(self.name, self.class_dependencies, self.fields, self.abstract, self.source)
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.name, self.class_dependencies, self.fields, self.abstract, self.source) == \
+            (other.name, other.class_dependencies, other.fields, other.abstract, other.source)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f'PyClass(name={self.name!r}, class_dependencies={self.class_dependencies!r}, '
+            f'fields={self.fields!r}, abstract={self.abstract!r}, source={self.source!r})'
+        )
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.name, self.class_dependencies, self.fields, self.abstract, self.source),
+            (None, {'is_model': self.is_model}),
+        )
+
+    def index_relations(self):
+        """Classify relation fields by kind so that the accessors below do not
+        need to scan fields again."""
+        relations = {}
+        for field in self.fields:
+            kind = RELATION_FIELD_TYPES.get(field.type)
+            if kind is None:
+                continue
+            target = field.args[0] if field.args else field.kwargs.get('to')
+            if target:
+                fields, targets = relations.setdefault(kind, ([], []))
+                fields.append(field)
+                targets.append(target)
+        self._relations = relations
+
+    def _relation(self, kind: str) -> Tuple[List[Field], List[str]]:
+        if not self.is_model:
+            return [], []
+        if self._relations is None:
+            self.index_relations()
+        return self._relations.get(kind) or ([], [])
 
     def foreign_key_fields(self) -> List[Field]:
-        if self.is_model:
-            return [x for x in self.fields if x.type == 'models.ForeignKey']
-        return []
+        return self._relation('foreignkey')[0]
 
     def one_to_one_fields(self) -> List[Field]:
-        if self.is_model:
-            return [x for x in self.fields if x.type == 'models.OneToOneField']
-        return []
+        return self._relation('onetoone')[0]
 
     def many_to_many_fields(self) -> List[Field]:
-        if self.is_model:
-            return [x for x in self.fields if x.type == 'models.ManyToManyField']
-        return []
+        return self._relation('manytomany')[0]
 
     def foreign_key_models(self) -> List[str]:
         """Return the list of names of models that this model references by ForeignKey."""
-        return [x.args[0] for x in self.foreign_key_fields()]
+        return self._relation('foreignkey')[1]
 
     def one_to_one_models(self) -> List[str]:
         """Return the list of names of models that this model references by OneToOneField."""
-        return [x.args[0] for x in self.one_to_one_fields()]
+        return self._relation('onetoone')[1]
 
     def many_to_many_models(self) -> List[str]:
         """Return the list of names of models that this model references by ManyToManyField."""
-        return [x.args[0] for x in self.many_to_many_fields()]
+        return self._relation('manytomany')[1]
 
     def related_models(self) -> List[str]:
         """Return the list of names of models that this model references by
         any of ForeignKey, OneToOneFIeld, ManyToManyField."""
-        return self.foreign_key_models() + self.one_to_one_models() + self.many_to_many_models()
+        return _flatten(self._relation(kind)[1] for kind in RELATION_FIELD_TYPES.values())
 
 
 def _flatten(lst):
@@ -109,7 +373,7 @@ def parse_field_params(text: str) -> Tuple[List, Dict]:
             continue
 
         if '=' in param:
-            name, value = param.split('=')
+            name, value = param.split('=', 1)
             kwargs[name.strip(' \n\'"')] = value.strip(' \n\'"')
         else:
             args.append(param.strip(' \n\'"'))
@@ -132,7 +396,10 @@ def parse_field(text: str) -> Field:
 def parse_fields(text: str) -> List[Field]:
     fields = []
 
-    matches = FIELD_REGEX.findall(text)
+    # A field cannot end after the last closing parenthesis. Stopping there
+    # means an unclosed call cannot make every later match attempt scan to
+    # the end of text.
+    matches = FIELD_REGEX.findall(text, 0, text.rfind(')') + 1)
     for m in matches:
         field_args, field_kwargs = parse_field_params(m[2])
         fields.append(Field(
@@ -145,14 +412,40 @@ def parse_fields(text: str) -> List[Field]:
     return fields
 
 
-def parse_classes(text: str) -> Dict[str, PyClass]:
+def is_abstract(body: str) -> bool:
+    """Return True if the class body contains `abstract = True` after `class Meta:`."""
+    meta = body.find('class Meta:')
+    return meta != -1 and body.find('abstract = True', meta + len('class Meta:')) != -1
+
+
+def split_classes(text: str) -> Iterator[Tuple[str, str, str]]:
+    """Yield the name, bases and body of each top-level class in text."""
+    pos = 0
+    while True:
+        header = MODEL_REGEX.search(text, pos)
+        if header is None:
+            return
+
+        end = CLASS_END_REGEX.search(text, header.end())
+        pos = end.start() if end else len(text)
+        yield header.group(1), header.group(2), text[header.end():pos]
+
+
+def parse_classes(text: str, names: Optional[Container[str]] = None) -> Dict[str, PyClass]:
+    """Find the classes defined in text.
+
+    If names is given, fields and abstract status are only parsed for the
+    classes with those names. Other classes are returned with just their name
+    and dependencies."""
     classes = {}
-    matches = MODEL_REGEX.findall(text)
-    for m in matches:
-        model_name = m[0]
-        class_dependencies = [x.strip() for x in m[1].split(',')]
-        fields = parse_fields(m[2])
-        abstract = ABSTRACT_MODEL_REGEX.match(m[2]) is not None
+    for model_name, bases, body in split_classes(text):
+        class_dependencies = [x.strip() for x in bases.split(',')]
+        if names is None or model_name in names:
+            fields = parse_fields(body)
+            abstract = is_abstract(body)
+        else:
+            fields = []
+            abstract = False
         classes[model_name] = PyClass(
             name=model_name,
             class_dependencies=class_dependencies,
@@ -162,224 +455,999 @@ def parse_classes(text: str) -> Dict[str, PyClass]:
     return classes
 
 
-def filter_models(classes: Dict[str, PyClass], search_iter=2):
-    for iteration in range(0, search_iter):
-        # is_model status will 'trickle down' to models that are `search_iter`
-        # subclasses away from models.Model
-        for cls in classes.values():
-            if cls.is_model:
+def _strip_param(text: str) -> str:
+    return text.strip(' \n\'"')
+
+
+def _line_offsets(text) -> List[int]:
+    """Return the offset in text (str or bytes) at which each line starts, indexed from 1."""
+    newline = b'\n' if isinstance(text, bytes) else '\n'
+    offsets = [0, 0]
+    index = text.find(newline)
+    while index != -1:
+        offsets.append(index + 1)
+        index = text.find(newline, index + 1)
+    return offsets
+
+
+def _is_abstract_meta(node: ast.ClassDef) -> bool:
+    for statement in node.body:
+        if (isinstance(statement, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == 'abstract' for t in statement.targets)
+                and isinstance(statement.value, ast.Constant)
+                and statement.value.value is True):
+            return True
+    return False
+
+
+def parse_classes_ast(text: str, names: Optional[Container[str]] = None) -> Dict[str, PyClass]:
+    """Equivalent to parse_classes, using the ast module instead of regular expressions.
+
+    Only fields assigned directly in the class body are included, so nested
+    classes and method bodies are ignored. Calls with nested parentheses are
+    parsed correctly. Falls back to parse_classes if text is not valid Python."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError) as e:
+        log.debug(f'Falling back to regex parser: {e}')
+        return parse_classes(text, names)
+
+    # Node column offsets are in bytes.
+    data = text.encode()
+    offsets = _line_offsets(data)
+
+    def source(node) -> str:
+        start = offsets[node.lineno] + node.col_offset
+        end = offsets[node.end_lineno] + node.end_col_offset
+        return data[start:end].decode()
+
+    classes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or not (node.bases or node.keywords):
+            continue
+
+        fields = []
+        abstract = False
+        body = node.body if names is None or node.name in names else []
+        for statement in body:
+            if isinstance(statement, ast.ClassDef) and statement.name == 'Meta':
+                abstract = abstract or _is_abstract_meta(statement)
                 continue
 
-            for dep in cls.class_dependencies:
-                if dep == 'models.Model':
-                    cls.is_model = True
-                    break
+            if isinstance(statement, ast.Assign) and len(statement.targets) == 1:
+                target = statement.targets[0]
+            elif isinstance(statement, ast.AnnAssign):
+                target = statement.target
+            else:
+                continue
+
+            call = statement.value
+            if not isinstance(target, ast.Name) or not isinstance(call, ast.Call):
+                continue
+
+            fields.append(Field(
+                target.id,
+                source(call.func),
+                [_strip_param(source(a)) for a in call.args],
+                {k.arg: _strip_param(source(k.value)) for k in call.keywords if k.arg},
+            ))
+
+        classes[node.name] = PyClass(
+            name=node.name,
+            class_dependencies=[source(b) for b in node.bases],
+            fields=fields,
+            abstract=abstract,
+        )
+
+    return classes
+
+
+def _split_tokens(tokens: List[tokenize.TokenInfo], separator: str) -> List[List[tokenize.TokenInfo]]:
+    """Split tokens on each separator that is not inside brackets."""
+    parts = [[]]
+    depth = 0
+    for token in tokens:
+        if token.type == tokenize.OP:
+            if token.string in '([{':
+                depth += 1
+            elif token.string in ')]}':
+                depth -= 1
+            elif depth == 0 and token.string == separator:
+                parts.append([])
+                continue
+        parts[-1].append(token)
+    return [p for p in parts if p]
+
+
+def _closing_bracket(tokens: List[tokenize.TokenInfo], start: int) -> int:
+    """Return the index of the bracket that closes the one at tokens[start]."""
+    depth = 0
+    for index in range(start, len(tokens)):
+        token = tokens[index]
+        if token.type == tokenize.OP:
+            if token.string in '([{':
+                depth += 1
+            elif token.string in ')]}':
+                depth -= 1
+                if depth == 0:
+                    return index
+    return -1
+
+
+def parse_classes_tokenize(text: str, names: Optional[Container[str]] = None) -> Dict[str, PyClass]:
+    """Equivalent to parse_classes, using a single pass over the tokenize stream.
+
+    Like parse_classes_ast, only fields assigned directly in the class body are
+    included. Unlike it, there is no syntax tree to build, and files that do
+    not compile may still be tokenized. Falls back to parse_classes if text
+    cannot be tokenized."""
+    offsets = _line_offsets(text)
+
+    def source(first: tokenize.TokenInfo, last: tokenize.TokenInfo) -> str:
+        return text[offsets[first.start[0]] + first.start[1]:offsets[last.end[0]] + last.end[1]]
+
+    classes = {}
+    cls: Optional[PyClass] = None
+    parse_body = False
+    meta_depth = None
+    depth = 0
+    line: List[tokenize.TokenInfo] = []
+
+    def parse_header(tokens):
+        if len(tokens) < 4 or tokens[0].string != 'class' or tokens[2].string != '(':
+            return None
+        close = _closing_bracket(tokens, 2)
+        bases = _split_tokens(tokens[3:close], ',')
+        return PyClass(
+            name=tokens[1].string,
+            class_dependencies=[source(b[0], b[-1]) for b in bases if b[0].string != '**'
+                                and not (len(b) > 1 and b[1].string == '=')],
+            fields=[],
+        )
+
+    def parse_field_tokens(tokens):
+        if len(tokens) < 5 or tokens[0].type != tokenize.NAME:
+            return None
+        parts = _split_tokens(tokens, '=')
+        if len(parts) != 2 or parts[0][0] is not tokens[0]:
+            return None
+        if len(parts[0]) > 1 and parts[0][1].string != ':':
+            return None
+
+        value = parts[1]
+        paren = next((i for i, t in enumerate(value) if t.string == '('), -1)
+        if paren < 1 or _closing_bracket(value, paren) != len(value) - 1:
+            return None
+        if any(t.type != tokenize.NAME and t.string != '.' for t in value[:paren]):
+            return None
+
+        args = []
+        kwargs = {}
+        for param in _split_tokens(value[paren + 1:-1], ','):
+            if len(param) > 2 and param[1].string == '=' and param[0].type == tokenize.NAME:
+                kwargs[param[0].string] = _strip_param(source(param[2], param[-1]))
+            elif param[0].string not in ('*', '**'):
+                args.append(_strip_param(source(param[0], param[-1])))
+
+        return Field(tokens[0].string, source(value[0], value[paren - 1]), args, kwargs)
+
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            if token.type == tokenize.INDENT:
+                depth += 1
+            elif token.type == tokenize.DEDENT:
+                depth -= 1
+                if meta_depth is not None and depth <= meta_depth:
+                    meta_depth = None
+            elif token.type in (tokenize.NEWLINE, tokenize.ENDMARKER) and line:
+                if depth == 0:
+                    cls = parse_header(line)
+                    if cls:
+                        classes[cls.name] = cls
+                    parse_body = cls is not None and (names is None or cls.name in names)
+                elif parse_body and depth == 1:
+                    if line[0].string == 'class' and len(line) > 1 and line[1].string == 'Meta':
+                        meta_depth = depth
+                    else:
+                        field = parse_field_tokens(line)
+                        if field:
+                            cls.fields.append(field)
+                elif parse_body and meta_depth == 1 and depth == 2:
+                    if [t.string for t in line] == ['abstract', '=', 'True']:
+                        cls.abstract = True
+                line = []
+            elif token.type not in (tokenize.NL, tokenize.COMMENT, tokenize.NEWLINE, tokenize.ENDMARKER):
+                line.append(token)
+    except (tokenize.TokenError, IndentationError, SyntaxError) as e:
+        log.debug(f'Falling back to regex parser: {e}')
+        return parse_classes(text, names)
+
+    return classes
+
+
+# Each engine takes the text of a file and optionally the names of the
+# classes whose bodies should be parsed - see parse_classes.
+PARSERS: Dict[str, Callable[..., Dict[str, PyClass]]] = {
+    'regex': parse_classes,
+    'ast': parse_classes_ast,
+    'tokenize': parse_classes_tokenize,
+}
+
+
+def _subclass_index(classes: Dict[str, PyClass]) -> Dict[str, List[PyClass]]:
+    """Map each class name to the classes that directly extend it."""
+    subclasses: Dict[str, List[PyClass]] = {}
+    for cls in classes.values():
+        for dep in cls.class_dependencies:
+            subclasses.setdefault(dep, []).append(cls)
+    return subclasses
+
 
-                if dep in classes and classes[dep].is_model:
-                    cls.is_model = True
-                    break
+def filter_models(
+        classes: Dict[str, PyClass],
+        search_iter=None,
+        known_models: Optional[Dict[str, PyClass]] = None,
+) -> int:
+    """Remove any classes that are not models.
+
+    A class is a model if it extends models.Model, directly or through any
+    number of other classes. Model status is propagated down from
+    models.Model through an index of subclasses, so each class and each
+    inheritance edge is visited once. search_iter is no longer used.
+
+    known_models may contain models that have already been resolved outside
+    of classes - subclasses of these are also treated as models.
+
+    Return the number of classes that were examined during propagation."""
+    known_models = known_models or {}
+    subclasses = _subclass_index(classes)
+
+    worklist = deque(['models.Model'])
+    worklist.extend(name for name in subclasses if name in known_models)
+    worklist.extend(cls.name for cls in classes.values() if cls.is_model)
+
+    examined = 0
+    while worklist:
+        for cls in subclasses.get(worklist.popleft(), ()):
+            examined += 1
+            if not cls.is_model:
+                cls.is_model = True
+                worklist.append(cls.name)
 
     non_models = [c for c in classes.values() if not c.is_model]
     for c in non_models:
         del classes[c.name]
 
+    log.debug(f'filter_models: examined {examined} classes, found {len(classes)} models')
+    return examined
+
 
-def inherit_mixin_fields(models: Dict[str, PyClass]):
+def inherit_mixin_fields(
+        models: Dict[str, PyClass],
+        known_models: Optional[Dict[str, PyClass]] = None,
+):
     """Cross-reference models to check for subclasses that inherit fields from
     parent.
+
+    Each model's fields are replaced by InheritedFields which refers to its
+    own declared fields and the resolved fields of its parents, in the order
+    they are declared. Each model is resolved once, however many subclasses
+    it has, and no field lists are copied.
+
+    Parents may also be found in known_models, which are not modified.
     """
-    for model in models.values():
-        for dep in model.class_dependencies:
-            if dep in models:
-                model.fields += models[dep].fields
+    known_models = known_models or {}
+    resolved: Dict[str, InheritedFields] = {}
 
+    def declared(model: PyClass) -> List[Field]:
+        fields = model.fields
+        return fields.own if isinstance(fields, InheritedFields) else fields
 
-def generate_graph(
-        models: Dict[str, PyClass],
-        for_models=None,  # Prune any nodes/edges that are not connected to a model with this name.
-        abstract_enabled=True,
-        related_field_enabled=True,
-        subclass_enabled=True,
-) -> Tuple[nx.Graph, Dict, Dict]:
-    def filter_edge_for_model(output_list: List, self_name: str, foreign_name: str):
-        """If for_model is defined, only add the edge to output_list if it matches
-        either self_name or foreign_name.
-        If for_model is not defined then just add the edge."""
-        if not for_models:
-            # print('NOT FOR_MODELS')
-            output_list.append((self_name, foreign_name))
-        elif for_models and (self_name in for_models or foreign_name in for_models):
-            # print(self_name, foreign_name, 'in', for_models)
-            output_list.append((self_name, foreign_name))
-        # else:
-        #     print('X', self_name, foreign_name, 'not in', for_models)
-
-    graph = nx.MultiDiGraph(format='png', directed=True)
-
-    foreign_key_relations = []
-    one_to_one_relations = []
-    many_to_many_relations = []
-    subclass_relations = []
-
-    # Classify edges and add them to graph
     for model in models.values():
-        for fk in model.foreign_key_models():
-            filter_edge_for_model(foreign_key_relations, model.name, fk)
-        for oto in model.one_to_one_models():
-            filter_edge_for_model(one_to_one_relations, model.name, oto)
-        for mtm in model.many_to_many_models():
-            filter_edge_for_model(many_to_many_relations, model.name, mtm)
-
-        for dep in model.class_dependencies:
-            filter_edge_for_model(subclass_relations, model.name, dep)
-
-    # Classify nodes and add them to graph
-    abstract_models = [models[a].name for a in models.keys() if models[a].abstract]
-    concrete_models = [x.name for x in models.values() if x.name not in abstract_models]
-
-    if for_models:
-        # Remove any nodes that are not connected by edges filtered by for_model
-        filtered_edges = (foreign_key_relations + one_to_one_relations
-                          + many_to_many_relations + subclass_relations)
-        filtered_nodes = _flatten(filtered_edges)
-
-        abstract_models = [m for m in abstract_models if m in filtered_nodes]
-        concrete_models = [m for m in concrete_models if m in filtered_nodes]
-
-    # Add nodes to graph
-    if abstract_enabled:
-        graph.add_nodes_from(abstract_models)
-
-    graph.add_nodes_from(concrete_models)
-
-    # Add edges to graph
-    if related_field_enabled:
-        graph.add_edges_from(foreign_key_relations + one_to_one_relations + many_to_many_relations)
-    if subclass_enabled:
-        graph.add_edges_from(subclass_relations)
-
-    nodes = {
-        'abstract': abstract_models,
-        'concrete': concrete_models,
-    }
+        # Resolve parents before children without recursion, so that deep
+        # hierarchies cannot exceed the recursion limit.
+        stack = [(model, False)]
+        visiting = set()
+        while stack:
+            current, parents_done = stack.pop()
+            if current.name in resolved:
+                continue
 
-    edges = {
-        'foreignkey': foreign_key_relations,
-        'onetoone': one_to_one_relations,
-        'manytomany': many_to_many_relations,
-        'subclass': subclass_relations,
-    }
+            parents = [models[d] for d in current.class_dependencies if d in models]
+            if not parents_done:
+                visiting.add(current.name)
+                stack.append((current, True))
+                # Parents that are already being resolved form a cycle and are skipped.
+                stack.extend((p, False) for p in reversed(parents) if p.name not in visiting)
+                continue
 
-    return graph, nodes, edges
+            bases = []
+            for dep in current.class_dependencies:
+                if dep in resolved:
+                    bases.append(resolved[dep])
+                elif dep in known_models:
+                    known = known_models[dep].fields
+                    bases.append(known if isinstance(known, InheritedFields) else InheritedFields(known))
+
+            resolved[current.name] = InheritedFields(declared(current), tuple(bases))
+            visiting.discard(current.name)
+
+    for name, fields in resolved.items():
+        # Relations are indexed from the fields when they are first needed.
+        models[name].fields = fields
+
+
+class Profile:
+    """Wall time and peak memory of each stage of a run, and the time spent
+    reading and parsing each file.
+
+    Pass an instance as the profile argument of get_models_for_directory,
+    parse_classes_from_directory, parse_files, parse_model_fields and
+    show_graph, and wrap any other steps in stage(). Then call report() or
+    write().
+
+    File reads and parsing happen together for each file, so their stages
+    hold the sum of per-file times. With jobs > 1 that sum is spread across
+    worker processes, which stop tracing memory when they start. Stages
+    should not be nested.
+
+    With memory, allocations are traced with tracemalloc, which slows down
+    every stage, and allocation-heavy ones such as parsing most. Compare
+    times between runs with the same setting only."""
+
+    def __init__(self, slowest: int = 10, memory: bool = True):
+        self.slowest = slowest
+        self.memory = memory
+        self.stages: Dict[str, Dict] = {}
+        self.files: Dict[str, List] = {}  # path -> [size, classes, read seconds, parse seconds]
+
+    def _add(self, name: str, seconds: float, peak_memory: Optional[int]):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'peak_memory': None})
+        stage['seconds'] += seconds
+        if peak_memory is not None:
+            stage['peak_memory'] = max(stage['peak_memory'] or 0, peak_memory)
+
+    @contextmanager
+    def _measure(self):
+        """Yield a dict that holds the elapsed seconds and the peak memory
+        allocated in the enclosed block on exit."""
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        elif self.memory and hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+        result = {}
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            result['seconds'] = time.perf_counter() - start
+            result['peak_memory'] = tracemalloc.get_traced_memory()[1] if self.memory else None
+            if started:
+                tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Add the time and peak memory of the enclosed block to the named stage."""
+        with self._measure() as measured:
+            yield
+        self._add(name, measured['seconds'], measured['peak_memory'])
+
+    def map_files(self, fn, args: List[Tuple], jobs: int = 1, count: Callable = len) -> List:
+        """Like _starmap, where the first of each args is a file path, recording
+        read and parse times for each file. count returns the number of
+        classes in a result of fn."""
+        with self._measure() as measured:
+            timed = _starmap(_timed_file_call, [(fn,) + tuple(a) for a in args], jobs)
+
+        results = []
+        read_total = parse_total = 0.0
+        for a, (result, read, total) in zip(args, timed):
+            filepath = a[0]
+            entry = self.files.get(filepath)
+            if entry is None:
+                entry = self.files[filepath] = [os.path.getsize(filepath), 0, 0.0, 0.0]
+            entry[1] = max(entry[1], count(result))
+            entry[2] += read
+            entry[3] += total - read
+            read_total += read
+            parse_total += total - read
+            results.append(result)
+
+        self._add('read', read_total, measured['peak_memory'])
+        self._add('parse', parse_total, measured['peak_memory'])
+        return results
+
+    def report(self) -> Dict:
+        slowest = sorted(self.files.items(), key=lambda item: item[1][2] + item[1][3], reverse=True)
+        return {
+            'stages': [
+                {'name': name, 'seconds': stage['seconds'], 'peak_memory': stage['peak_memory']}
+                for name, stage in self.stages.items()
+            ],
+            'files': {
+                'count': len(self.files),
+                'bytes': sum(entry[0] for entry in self.files.values()),
+                'read_seconds': sum(entry[2] for entry in self.files.values()),
+                'parse_seconds': sum(entry[3] for entry in self.files.values()),
+            },
+            'slowest_files': [
+                {
+                    'path': filepath,
+                    'size': size,
+                    'classes': classes,
+                    'read_seconds': read,
+                    'parse_seconds': parse,
+                }
+                for filepath, (size, classes, read, parse) in slowest[:self.slowest]
+            ],
+        }
+
+    def write(self, stream: TextIO):
+        json.dump(self.report(), stream, indent=2)
+        stream.write('\n')
+
+
+def _stage(profile: Optional[Profile], name: str):
+    return profile.stage(name) if profile else nullcontext()
+
+
+def _map_files(fn, args: List[Tuple], jobs: int = 1, profile: Optional[Profile] = None, count: Callable = len) -> List:
+    if profile:
+        return profile.map_files(fn, args, jobs, count)
+    return _starmap(fn, args, jobs)
+
+
+# Seconds spent in _read_source since the last _timed_file_call in this process.
+_read_seconds = 0.0
+
+
+def _read_source(filepath: str) -> str:
+    global _read_seconds
+    start = time.perf_counter()
+    with open(filepath, 'r') as f:
+        text = f.read()
+    _read_seconds += time.perf_counter() - start
+    return text
+
+
+def _timed_file_call(fn, filepath: str, *args):
+    """Return fn(filepath, *args) with the seconds spent reading the file and in total."""
+    global _read_seconds
+    _read_seconds = 0.0
+    start = time.perf_counter()
+    result = fn(filepath, *args)
+    return result, _read_seconds, time.perf_counter() - start
+
+
+def find_python_files(directory: str) -> Iterator[str]:
+    """Yield the path of each .py file in directory, skipping any
+    subdirectory in DIRECTORY_BLACKLIST."""
+    for cwd, dirs, files in os.walk(directory):
+        for d in DIRECTORY_BLACKLIST:
+            if d in dirs:
+                dirs.remove(d)
 
+        dotpy = [f for f in files if f.endswith('.py')]
 
-def show_graph(
-        graph: nx.Graph, nodes: Dict, edges: Dict,
-        show=True,
-        layout_fn=nx.circular_layout,
-        saveas=None,
-        abstract_enabled=True,
-        related_field_enabled=True,
-        subclass_enabled=True,
-):
-    fig = plt.figure(1, figsize=(28, 28))
-    ax = fig.add_subplot(1, 1, 1)
-    ax.set_facecolor('#333333')
-
-    layout = layout_fn(graph)
-
-    if related_field_enabled:
-        nx.draw_networkx_edges(
-            graph, layout,
-            edgelist=edges.get('foreignkey'),
-            edge_color='#4f9bd1',
-            alpha=.9,
-            connectionstyle='arc3, rad=.2'
-        )
+        for filename in dotpy:
+            yield os.path.join(cwd, filename)
 
-        nx.draw_networkx_edges(
-            graph, layout,
-            edgelist=edges.get('onetoone'),
-            edge_color='#9bd14f',
-            alpha=.9,
-            connectionstyle='arc3, rad=.2'
-        )
 
-        nx.draw_networkx_edges(
-            graph, layout,
-            edgelist=edges.get('manytomany'),
-            edge_color='#d14f9b',
-            alpha=.9,
-            connectionstyle='arc3, rad=.2'
-        )
+def parse_classes_from_file(
+        filepath: str,
+        parser: str = 'regex',
+        names: Optional[Container[str]] = None,
+) -> Dict[str, PyClass]:
+    """Parse filepath with the given engine from PARSERS. See parse_classes for names."""
+    classes = PARSERS[parser](_read_source(filepath), names)
 
-    if subclass_enabled:
-        nx.draw_networkx_edges(
-            graph, layout,
-            edgelist=edges.get('subclass'),
-            edge_color='#d68bb6',
-            alpha=.3,
-            connectionstyle='arc3, rad=.05'
-        )
+    for cls in classes.values():
+        cls.source = filepath
+    return classes
 
-    if abstract_enabled:
-        nx.draw_networkx_nodes(
-            graph, layout,
-            nodelist=nodes.get('abstract'),
-            node_color='#555555',
-            node_shape='o',
-            node_size=200,
-            alpha=.7,
-        )
 
-    nx.draw_networkx_nodes(
-        graph, layout,
-        nodelist=nodes.get('concrete'),
-        node_color='#244461',
-        node_shape='o',
-        node_size=200,
-        alpha=1.0,
-    )
+def _parse_file(
+        filepath: str,
+        known_digest: Optional[str] = None,
+        parser: str = 'regex',
+        names: Optional[Container[str]] = None,
+) -> Tuple[str, Optional[Dict[str, PyClass]]]:
+    """Return the content hash of filepath and the classes it defines.
 
-    nx.draw_networkx_labels(
-        graph, layout,
-        font_size=8,
-        font_color='#eeeeee',
+    If the hash matches known_digest the file is not parsed again and the
+    classes are returned as None."""
+    text = _read_source(filepath)
+    digest = hashlib.sha1(text.encode()).hexdigest()
+    if digest == known_digest:
+        return digest, None
+
+    classes = PARSERS[parser](text, names)
+    for cls in classes.values():
+        cls.source = filepath
+    return digest, classes
+
+
+def _parse_bodies(filepath: str, names: List[str], parser: str = 'regex') -> Dict[str, Tuple[List[Field], bool]]:
+    """Return the fields and abstract status of each of the named classes in filepath."""
+    classes = parse_classes_from_file(filepath, parser=parser, names=set(names))
+    return {name: (classes[name].fields, classes[name].abstract) for name in names if name in classes}
+
+
+def _starmap(fn, args: List[Tuple], jobs: int = 1) -> List:
+    """Apply fn to each tuple of args, in a process pool if jobs allows it.
+    Results are returned in the same order as args."""
+    workers = min(jobs or os.cpu_count() or 1, len(args))
+
+    if workers <= 1:
+        return [fn(*a) for a in args]
+
+    # Imported here as multiprocessing adds to startup time for serial runs.
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Several files per task keeps inter-process overhead low on large trees.
+    chunksize = max(1, len(args) // (workers * 4))
+    # Forked workers inherit tracing from a Profile, which would only slow them down.
+    initializer = tracemalloc.stop if tracemalloc.is_tracing() else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        return list(pool.map(fn, *zip(*args), chunksize=chunksize))
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'djmodgraph')
+
+
+def _cache_fingerprint() -> str:
+    """Cached results are only valid for the tool and regex versions that created them."""
+    key = [
+        __version__,
+        CACHE_VERSION,
+        MODEL_REGEX.pattern,
+        FIELD_REGEX.pattern,
+        CLASS_END_REGEX.pattern,
+    ]
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def _dump_atomic(path: str, obj):
+    """Pickle obj to path, so that readers only ever see a complete file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ParseCache:
+    """Keep the result of parsing each file in a directory between runs.
+
+    Entries are keyed by file path. An entry is reused without reading the
+    file if its mtime and size are unchanged, or after reading it if the hash
+    of its contents is unchanged. The whole cache is dropped if
+    _cache_fingerprint changes.
+
+    Each entry holds the class headers found in the file and the bodies of
+    any of those classes that have been parsed since - see
+    parse_model_fields.
+
+    Results from each of PARSERS are kept separately. If cache_dir is None
+    the cache is only kept in memory."""
+
+    def __init__(self, cache_dir: Optional[str], directory: str, parser: str = 'regex'):
+        self.parser = parser
+        key = hashlib.sha1(f'{os.path.abspath(directory)}:{parser}'.encode()).hexdigest()
+        self.path = os.path.join(cache_dir, f'{key}.pickle') if cache_dir else None
+        self.fingerprint = _cache_fingerprint()
+
+        # filepath -> (mtime_ns, size, digest, classes, bodies)
+        self.entries: Dict[str, Tuple[int, int, str, Dict[str, PyClass], Dict[str, Tuple[List[Field], bool]]]] = {}
+        self._used = set()
+        self._dirty = False
+
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path, 'rb') as f:
+                fingerprint, entries = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            log.warning(f'Ignoring unreadable parse cache {self.path}: {e}')
+            return
+
+        if fingerprint == self.fingerprint:
+            self.entries = entries
+        else:
+            log.info('Parse cache was created by a different version and will be rebuilt.')
+
+    def get(self, filepath: str, stat: os.stat_result) -> Optional[Dict[str, PyClass]]:
+        """Return cached classes for filepath if the file has not been modified."""
+        self._used.add(filepath)
+        entry = self.entries.get(filepath)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[3]
+        return None
+
+    def digest(self, filepath: str) -> Optional[str]:
+        entry = self.entries.get(filepath)
+        return entry[2] if entry else None
+
+    def classes(self, filepath: str) -> Dict[str, PyClass]:
+        return self.entries[filepath][3]
+
+    def put(self, filepath: str, stat: os.stat_result, digest: str, classes: Dict[str, PyClass]):
+        """Store the classes found in filepath. Any bodies stored for a previous
+        version of the file are discarded unless its contents are unchanged."""
+        self._used.add(filepath)
+        bodies = self.bodies(filepath) if digest == self.digest(filepath) else {}
+        self.entries[filepath] = (stat.st_mtime_ns, stat.st_size, digest, classes, bodies)
+        self._dirty = True
+
+    def bodies(self, filepath: str) -> Dict[str, Tuple[List[Field], bool]]:
+        """Return the fields and abstract status of any classes in filepath that have been parsed."""
+        entry = self.entries.get(filepath)
+        return entry[4] if entry else {}
+
+    def put_bodies(self, filepath: str, bodies: Dict[str, Tuple[List[Field], bool]]):
+        self.entries[filepath][4].update(bodies)
+        self._dirty = True
+
+    def save(self):
+        """Write the cache to disk, dropping entries for files that were not seen in this run."""
+        if self.path is None:
+            return
+
+        unused = self.entries.keys() - self._used
+        if not self._dirty and not unused:
+            return
+
+        for filepath in unused:
+            del self.entries[filepath]
+
+        _dump_atomic(self.path, (self.fingerprint, self.entries))
+        self._dirty = False
+
+
+def parse_files(
+        filepaths: List[str],
+        jobs: int = 1,
+        cache: Optional[ParseCache] = None,
+        parser: str = 'regex',
+        headers_only: bool = False,
+        profile: Optional[Profile] = None,
+) -> Dict[str, Dict[str, PyClass]]:
+    """Parse each of filepaths with the given engine from PARSERS and return
+    the classes found in each file.
+
+    If jobs is greater than 1, files are read and parsed in a pool of that many
+    worker processes. If jobs is 0 or None, one worker per CPU is used.
+
+    If headers_only is True, classes are returned without fields - see
+    parse_model_fields.
+
+    If cache is given, only files that have changed since the previous run
+    are read and parsed. It must have been created for the same parser.
+
+    If profile is given, the time spent reading and parsing each file is
+    recorded in it."""
+    if cache is None:
+        names = () if headers_only else None
+        parsed = _map_files(parse_classes_from_file, [(fp, parser, names) for fp in filepaths], jobs, profile)
+        return dict(zip(filepaths, parsed))
+
+    results: Dict[str, Dict[str, PyClass]] = {}
+    stats = {}
+    pending = []
+    for filepath in filepaths:
+        stats[filepath] = os.stat(filepath)
+        classes = cache.get(filepath, stats[filepath])
+        if classes is None:
+            pending.append(filepath)
+        else:
+            results[filepath] = classes
+
+    log.debug(f'Parse cache: {len(filepaths) - len(pending)} hits, {len(pending)} misses')
+
+    parsed = _map_files(
+        _parse_file,
+        [(fp, cache.digest(fp), parser, ()) for fp in pending],
+        jobs, profile,
+        count=lambda result: len(result[1] or ()),
     )
+    for filepath, (digest, classes) in zip(pending, parsed):
+        if classes is None:
+            # Modified time changed but the contents did not.
+            cache.put(filepath, stats[filepath], digest, cache.classes(filepath))
+        else:
+            cache.put(filepath, stats[filepath], digest, classes)
+        results[filepath] = cache.classes(filepath)
 
-    if saveas:
-        plt.savefig(saveas)
+    cache.save()
 
-    if show:
-        plt.show()
+    # Return copies, as the cache holds headers: filter_models marks the
+    # classes it returns as models and parse_model_fields fills in their
+    # fields, neither of which should be saved with them.
+    results = {
+        filepath: {name: cls.copy() for name, cls in classes.items()}
+        for filepath, classes in results.items()
+    }
+    if not headers_only:
+        _parse_bodies_for(
+            [cls for classes in results.values() for cls in classes.values()], jobs, cache, parser, profile)
 
+    return {filepath: results[filepath] for filepath in filepaths}
 
-def parse_classes_from_directory(directory: str) -> Dict[str, PyClass]:
-    models = {}
 
-    for cwd, dirs, files in os.walk(directory):
-        for d in DIRECTORY_BLACKLIST:
-            if d in dirs:
-                dirs.remove(d)
+def _parse_bodies_for(
+        classes: List[PyClass],
+        jobs: int = 1,
+        cache: Optional[ParseCache] = None,
+        parser: str = 'regex',
+        profile: Optional[Profile] = None,
+):
+    names_by_file: Dict[str, List[str]] = {}
+    for model in classes:
+        if model.source:
+            names_by_file.setdefault(model.source, []).append(model.name)
+
+    bodies_by_file = {}
+    pending = []
+    for filepath, names in names_by_file.items():
+        bodies_by_file[filepath] = cache.bodies(filepath) if cache else {}
+        missing = [name for name in names if name not in bodies_by_file[filepath]]
+        if missing:
+            pending.append((filepath, missing))
+
+    parsed = _map_files(_parse_bodies, [(fp, names, parser) for fp, names in pending], jobs, profile)
+    for (filepath, _), bodies in zip(pending, parsed):
+        if cache:
+            cache.put_bodies(filepath, bodies)
+        else:
+            bodies_by_file[filepath] = bodies
 
-        dotpy = [f for f in files if f.endswith('.py')]
+    for model in classes:
+        body = bodies_by_file.get(model.source, {}).get(model.name)
+        if body:
+            fields, model.abstract = body
+            # A copy, so that the list held by the cache is not shared with the model.
+            model.fields = list(fields)
+
+    if cache:
+        cache.save()
 
-        for filename in dotpy:
-            filepath = os.path.join(cwd, filename)
-            with open(filepath, 'r') as f:
-                models.update(parse_classes(f.read()))
+
+def parse_model_fields(
+        models: Dict[str, PyClass],
+        jobs: int = 1,
+        cache: Optional[ParseCache] = None,
+        parser: str = 'regex',
+        profile: Optional[Profile] = None,
+):
+    """Parse the fields and abstract status of models that were found by
+    parse_files with headers_only=True.
+
+    Each source file is read once, and only the bodies of the given models
+    are parsed. With a cache, bodies that were parsed in a previous run are
+    reused. The cache must have been brought up to date by parse_files in
+    this run."""
+    _parse_bodies_for(list(models.values()), jobs=jobs, cache=cache, parser=parser, profile=profile)
+
+
+def parse_classes_from_directory(
+        directory: str,
+        jobs: int = 1,
+        cache: Optional[ParseCache] = None,
+        parser: str = 'regex',
+        headers_only: bool = False,
+        profile: Optional[Profile] = None,
+) -> Dict[str, PyClass]:
+    """Parse every .py file in directory. See parse_files for other arguments.
+
+    Results are merged in the same order as a serial walk so the output
+    does not depend on the number of jobs."""
+    models = {}
+    with _stage(profile, 'walk'):
+        filepaths = list(find_python_files(directory))
+    for classes in parse_files(
+            filepaths, jobs=jobs, cache=cache, parser=parser, headers_only=headers_only,
+            profile=profile).values():
+        models.update(classes)
 
     return models
 
 
-def get_models_for_directory(directory: str) -> Dict[str, PyClass]:
-    classes = parse_classes_from_directory(directory)
-    filter_models(classes)
-    inherit_mixin_fields(classes)
+def get_models_for_directory(
+        directory: str,
+        jobs: int = 1,
+        cache_dir: Optional[str] = None,
+        parser: str = 'regex',
+        profile: Optional[Profile] = None,
+) -> Dict[str, PyClass]:
+    """Find the models defined in directory.
+
+    Discovery runs in two phases: class headers are parsed from every file,
+    then fields are parsed only for the classes that filter_models accepts."""
+    cache = ParseCache(cache_dir, directory, parser=parser) if cache_dir else None
+    classes = parse_classes_from_directory(
+        directory, jobs=jobs, cache=cache, parser=parser, headers_only=True, profile=profile)
+    with _stage(profile, 'filter'):
+        filter_models(classes)
+    parse_model_fields(classes, jobs=jobs, cache=cache, parser=parser, profile=profile)
+    with _stage(profile, 'inherit'):
+        inherit_mixin_fields(classes)
     return classes
 
 
+def app_label(source: str, root: str) -> str:
+    """Name the app that defines the model in source: the dotted path of its
+    directory relative to root, as in INSTALLED_APPS. A models package
+    belongs to the directory that contains it, and files directly in root
+    to an app named after root."""
+    directory = os.path.dirname(os.path.abspath(source))
+    if os.path.basename(directory) == 'models':
+        directory = os.path.dirname(directory)
+    relative = os.path.relpath(directory, os.path.abspath(root))
+    if relative == '.':
+        return os.path.basename(os.path.abspath(root))
+    return relative.replace(os.sep, '.')
+
+
+def group_by_app(models: Dict[str, PyClass], root: Optional[str] = None) -> Dict[str, str]:
+    """Map the name of each model to the name of its app, as given by
+    app_label. root defaults to the deepest directory that contains every
+    source file. Models without a source are not included."""
+    sources = {name: model.source for name, model in models.items() if model.source}
+    if not sources:
+        return {}
+    if root is None:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(s)) for s in sources.values()])
+        if os.path.basename(root) == 'models':
+            root = os.path.dirname(root)
+
+    # Many models share a file, so each file is only labelled once.
+    labels = {source: app_label(source, root) for source in set(sources.values())}
+    return {name: labels[source] for name, source in sources.items()}
+
+
+class DirectoryWatcher:
+    """Keep the classes parsed from a directory in memory so that they can be
+    brought up to date by parsing only the files that have changed.
+
+    models holds the result of get_models_for_directory."""
+
+    def __init__(
+            self,
+            directory: str,
+            jobs: int = 1,
+            cache: Optional[ParseCache] = None,
+            parser: str = 'regex',
+    ):
+        self.directory = directory
+        self.jobs = jobs
+        self.cache = cache or ParseCache(None, directory, parser=parser)
+        self.parser = parser
+
+        self.stats: Dict[str, Tuple[int, int]] = {}
+        self.classes_by_file: Dict[str, Dict[str, PyClass]] = {}
+        self.classes: Dict[str, PyClass] = {}
+        self.models: Dict[str, PyClass] = {}
+
+        self.update()
+
+    def _changed_files(self) -> Tuple[List[str], Dict[str, Tuple[int, int]], List[str]]:
+        """Return all current .py files, the (mtime, size) of those which have
+        been modified since the last update, and those which have been
+        removed. Files that disappear while they are listed are left out."""
+        filepaths = []
+        modified = {}
+        for filepath in find_python_files(self.directory):
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                # Such as an editor's temporary file, removed since the walk.
+                continue
+            filepaths.append(filepath)
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self.stats.get(filepath) != key:
+                modified[filepath] = key
+
+        removed = list(self.stats.keys() - set(filepaths))
+        return filepaths, modified, removed
+
+    def _parse(self, filepaths: List[str]) -> Dict[str, Dict[str, PyClass]]:
+        """Parse the class headers of filepaths, leaving out any that can no
+        longer be read. They are tried again on the next update."""
+        try:
+            return parse_files(filepaths, jobs=self.jobs, cache=self.cache, parser=self.parser, headers_only=True)
+        except OSError:
+            pass
+
+        parsed = {}
+        for filepath in filepaths:
+            try:
+                parsed.update(parse_files([filepath], cache=self.cache, parser=self.parser, headers_only=True))
+            except OSError as e:
+                log.debug(f'Skipping {filepath}: {e}')
+        return parsed
+
+    @staticmethod
+    def _subclasses(classes: Dict[str, PyClass], names: Set[str]) -> Set[str]:
+        """Return names along with the names of all classes in classes that
+        extend any of them, directly or indirectly."""
+        subclasses = _subclass_index(classes)
+
+        result = set(names)
+        stack = list(names)
+        while stack:
+            for sub in subclasses.get(stack.pop(), ()):
+                if sub.name not in result:
+                    result.add(sub.name)
+                    stack.append(sub.name)
+        return result
+
+    def update(self) -> Set[str]:
+        """Parse any files that have changed since the last update and resolve
+        the affected models again.
+
+        Return the names of classes that were affected by the changes."""
+        filepaths, modified, removed = self._changed_files()
+        if not modified and not removed:
+            return set()
+
+        # Nothing is kept until every step has succeeded, so that a failed
+        # update is tried again in full.
+        stats = dict(self.stats)
+        classes_by_file = dict(self.classes_by_file)
+
+        changed = set()
+        for filepath in removed:
+            del stats[filepath]
+            changed.update(classes_by_file.pop(filepath, {}))
+
+        for filepath, classes in self._parse(list(modified)).items():
+            changed.update(classes_by_file.get(filepath, {}))
+            changed.update(classes)
+            classes_by_file[filepath] = classes
+            stats[filepath] = modified[filepath]
+
+        all_classes = {}
+        for filepath in filepaths:
+            all_classes.update(classes_by_file.get(filepath, {}))
+
+        affected = self._subclasses(all_classes, changed)
+        unaffected = {name: m for name, m in self.models.items() if name not in affected}
+
+        # Resolve copies so that the parsed classes are not modified.
+        resolved = {name: all_classes[name].copy() for name in all_classes if name in affected}
+        filter_models(resolved, known_models=unaffected)
+        parse_model_fields(resolved, jobs=self.jobs, cache=self.cache, parser=self.parser)
+        inherit_mixin_fields(resolved, known_models=unaffected)
+
+        self.stats = stats
+        self.classes_by_file = classes_by_file
+        self.classes = all_classes
+        self.models = {
+            name: unaffected.get(name) or resolved[name]
+            for name in all_classes if name in unaffected or name in resolved
+        }
+
+        log.debug(f'Resolved {len(resolved)} of {len(self.models)} models again')
+        return affected
+
+
 def _parse_args():
+    from model_class_export import WRITERS
+    from model_class_layout import LAYOUTS
+
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
@@ -399,12 +1467,179 @@ def _parse_args():
              'that share a direct relationship with them (in either direction).',
     )
 
+    parser.add_argument(
+        '--models-from',
+        default=None,
+        help='File with one query per line, each a list of model names as '
+             'for `--models`. Writes one graph per query to the `--saveas` '
+             'directory, parsing and laying out the project only once.',
+    )
+
+    parser.add_argument(
+        '--each-model',
+        default=False,
+        action='store_true',
+        help='Like `--models-from`, with one query for each model in the project.',
+    )
+
+    parser.add_argument(
+        '--depth',
+        type=int,
+        default=1,
+        help='Show models up to this many relationships away from the models '
+             'in `--models`, `--models-from` or `--each-model`. Defaults to 1.',
+    )
+
+    parser.add_argument(
+        '--follow',
+        nargs='+',
+        default=None,
+        choices=['foreignkey', 'onetoone', 'manytomany', 'subclass'],
+        help='Kinds of relationship to follow from the chosen models. Defaults to all of them.',
+    )
+
+    parser.add_argument(
+        '--direction',
+        default='both',
+        choices=['both', 'forward', 'reverse'],
+        help='Follow relationships from a model to the models it refers to or '
+             'inherits from (`forward`), back to the models that refer to or '
+             'inherit from it (`reverse`), or `both`. Defaults to `both`.',
+    )
+
+    parser.add_argument(
+        '--collapse-apps',
+        default=False,
+        action='store_true',
+        help='Draw each app, i.e. each directory of models under `cwd`, as a '
+             'single node, with one edge of each kind between two apps that '
+             'is wider the more relationships it stands for.',
+    )
+
+    parser.add_argument(
+        '--expand-apps',
+        nargs='+',
+        default=None,
+        metavar='APP',
+        help='Apps to show model by model with `--collapse-apps`, named by '
+             'their dotted path under `cwd`, for example `shop.orders`.',
+    )
+
     parser.add_argument(
         '--saveas',
         default=None,
         help='Save the graph to the given filename.',
     )
 
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker processes used to parse files. '
+             'Use 0 to start one worker per CPU.',
+    )
+
+    parser.add_argument(
+        '--parser',
+        default='regex',
+        choices=list(PARSERS),
+        help='Engine used to find classes and fields in each file. '
+             '`ast` and `tokenize` read nested parentheses and nested classes '
+             'correctly. Defaults to `regex`.',
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        default=default_cache_dir(),
+        help='Directory where parsed files are cached between runs. '
+             'Only files that have changed since the previous run are parsed again. '
+             'Defaults to $XDG_CACHE_HOME/djmodgraph or ~/.cache/djmodgraph.',
+    )
+
+    parser.add_argument(
+        '-nocache',
+        dest='cache',
+        default=True,
+        action='store_false',
+        help='Parse every file and lay out the graph without reading or updating the cache.',
+    )
+
+    parser.add_argument(
+        '--watch',
+        default=False,
+        action='store_true',
+        help='Keep running and update the `--saveas` output whenever a .py file changes.',
+    )
+
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=1.0,
+        help='Seconds between checks for changed files in `--watch` mode.',
+    )
+
+    parser.add_argument(
+        '--format',
+        default='matplotlib',
+        choices=['matplotlib'] + list(WRITERS),
+        help='Output format. `matplotlib` draws the graph and can show it or '
+             'save it as an image. Other formats are written to `--saveas`, or '
+             'to stdout if it is not given.',
+    )
+
+    parser.add_argument(
+        '--layout',
+        default='circular',
+        choices=list(LAYOUTS),
+        help='How to position models when drawing the graph. Positions are '
+             'cached between runs, and a changed graph is laid out starting '
+             'from the cached positions.',
+    )
+
+    parser.add_argument(
+        '--layout-iterations',
+        type=int,
+        default=None,
+        help='Number of simulation steps for the `spring` and `force` '
+             'layouts, defaulting to 50, or the most ordering sweeps for the '
+             '`layered` layout, defaulting to 8. Fewer is faster but less tidy.',
+    )
+
+    parser.add_argument(
+        '--tiles',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Draw the graph as an N by N grid of images in the `--saveas` '
+             'directory, with an index.html that links them. Each image is '
+             'drawn on its own, so large graphs stay readable without one huge image.',
+    )
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='-',
+        default=None,
+        help='Write a JSON report of the time of each stage, and the slowest '
+             'files, to this file or to stdout if no file is given.',
+    )
+
+    parser.add_argument(
+        '--profile-memory',
+        default=False,
+        action='store_true',
+        help='Also report the peak memory of each stage in `--profile`. '
+             'Tracing memory makes every stage slower, parsing most of all, '
+             'so compare times only between runs that both use it or both do not.',
+    )
+
+    parser.add_argument(
+        '--profile-files',
+        type=int,
+        default=10,
+        help='Number of slowest files to include in the `--profile` report.',
+    )
+
     parser.add_argument(
         '-noshow',
         dest='show',
@@ -453,6 +1688,44 @@ def _parse_args():
 
     parsed = parser.parse_args()
 
+    if parsed.watch and not parsed.saveas:
+        parser.error('--watch requires --saveas')
+
+    if parsed.watch and parsed.profile:
+        parser.error('--profile cannot be used with --watch')
+
+    if parsed.profile_memory and not parsed.profile:
+        parser.error('--profile-memory requires --profile')
+
+    if parsed.profile == '-' and parsed.format != 'matplotlib' and not parsed.saveas:
+        parser.error(f'--profile needs a filename when --format {parsed.format} is written to stdout')
+
+    if parsed.models_from or parsed.each_model:
+        if parsed.models_from and parsed.each_model:
+            parser.error('--models-from and --each-model cannot be used together')
+        if not parsed.saveas:
+            parser.error('--models-from and --each-model require --saveas')
+        for option in ('models', 'watch', 'tiles', 'collapse_apps'):
+            if getattr(parsed, option):
+                parser.error(f'--models-from and --each-model cannot be used with --{option.replace("_", "-")}')
+
+    if parsed.depth != 1 or parsed.follow or parsed.direction != 'both':
+        if not (parsed.models or parsed.models_from or parsed.each_model):
+            parser.error('--depth, --follow and --direction require --models, --models-from or --each-model')
+        if parsed.depth < 1:
+            parser.error('--depth must be at least 1')
+
+    if parsed.expand_apps and not parsed.collapse_apps:
+        parser.error('--expand-apps requires --collapse-apps')
+
+    if parsed.tiles is not None:
+        if not parsed.saveas:
+            parser.error('--tiles requires --saveas')
+        if parsed.format != 'matplotlib':
+            parser.error('--tiles can only be used with --format matplotlib')
+        if parsed.tiles < 1:
+            parser.error('--tiles must be at least 1')
+
     if parsed.cwd == '.':
         parsed.cwd = os.getcwd()
 
@@ -473,6 +1746,178 @@ def _parse_args():
     return parsed
 
 
+def _layout_cache(clargs, enabled_entities: Dict):
+    from model_class_layout import LayoutCache
+
+    key = repr([
+        os.path.abspath(clargs.cwd), clargs.layout, sorted(clargs.models or []), enabled_entities,
+        clargs.depth, clargs.follow, clargs.direction,
+        clargs.collapse_apps, sorted(clargs.expand_apps or []),
+    ])
+    return LayoutCache(clargs.cache_dir if clargs.cache else None, key)
+
+
+def _render(
+        clargs, graph, nodes: Dict, edges: Dict, enabled_entities: Dict,
+        show: bool, layout_cache, profile=None,
+        saveas: Optional[str] = None,
+        positions: Optional[Dict] = None,
+):
+    """Draw or write the graph in the format chosen by clargs, to saveas or
+    else clargs.saveas. positions may hold positions for a larger graph
+    than this one, to use instead of laying this one out."""
+    from model_class_export import POSITIONED_WRITERS, WRITERS
+
+    saveas = saveas or clargs.saveas
+    kwargs = dict(enabled_entities)
+    if positions is not None:
+        kwargs['positions'] = {node: positions[node] for node in graph.nodes}
+    elif clargs.format == 'matplotlib' or clargs.format in POSITIONED_WRITERS:
+        with _stage(profile, 'layout'):
+            kwargs['positions'] = layout_cache.layout(graph, clargs.layout, clargs.layout_iterations)
+
+    if clargs.tiles:
+        from model_class_graph import write_tiles
+        with _stage(profile, 'render'):
+            write_tiles(graph, nodes, edges, saveas, grid=clargs.tiles, **kwargs)
+        return
+
+    if clargs.format == 'matplotlib':
+        from model_class_graph import show_graph
+        show_graph(
+            graph, nodes, edges,
+            saveas=saveas,
+            show=show,
+            profile=profile,
+            **kwargs,
+        )
+        return
+
+    write = WRITERS[clargs.format]
+    with _stage(profile, 'render'):
+        if saveas:
+            with open(saveas, 'w') as f:
+                write(graph, nodes, edges, f, **kwargs)
+        else:
+            write(graph, nodes, edges, sys.stdout, **kwargs)
+
+
+def _neighbourhood(clargs) -> Dict:
+    """Options for filter_graph that set how far to look around each query."""
+    return {'depth': clargs.depth, 'kinds': clargs.follow, 'direction': clargs.direction}
+
+
+def _generate_graph(clargs, models: Dict[str, PyClass], enabled_entities: Dict):
+    """Build the graph for clargs.models, or for every model if it is not set,
+    with apps collapsed if clargs.collapse_apps is set."""
+    from model_class_graph import EdgeIndex, classify, collapse_apps, filter_graph, generate_graph
+
+    if not clargs.models or (clargs.depth == 1 and not clargs.follow and clargs.direction == 'both'):
+        if not clargs.collapse_apps:
+            # generate_graph finds direct neighbours without building an index.
+            return generate_graph(models, for_models=clargs.models, **enabled_entities)
+        nodes, edges = classify(models, for_models=clargs.models)
+    else:
+        _, edges = classify(models)
+        graph, nodes, edges = filter_graph(
+            models, EdgeIndex(edges), clargs.models, **enabled_entities, **_neighbourhood(clargs),
+        )
+        if not clargs.collapse_apps:
+            return graph, nodes, edges
+
+    apps = group_by_app(models, clargs.cwd)
+    expand = set(clargs.expand_apps or ())
+    unknown = expand - set(apps.values())
+    if unknown:
+        log.warning(f'No apps named {", ".join(sorted(unknown))}')
+    return collapse_apps(models, nodes, edges, apps, expand, **enabled_entities)
+
+
+def _read_queries(path: str) -> List[List[str]]:
+    """Read one list of model names from each line of path, ignoring blank
+    lines and comments that start with #."""
+    queries = []
+    with open(path) as f:
+        for line in f:
+            names = line.split('#', 1)[0].split()
+            if names:
+                queries.append(names)
+    return queries
+
+
+def _batch(clargs, models: Dict[str, PyClass], enabled_entities: Dict, layout_cache, profile=None):
+    """Write one graph for each query to the clargs.saveas directory.
+
+    The full graph is built and laid out once. Each query is then filtered
+    from it, and keeps the positions its models have in the full graph."""
+    from model_class_export import POSITIONED_WRITERS
+    from model_class_graph import EdgeIndex, filter_graph, generate_graph
+
+    with _stage(profile, 'graph'):
+        graph, _, edges = generate_graph(models, **enabled_entities)
+        index = EdgeIndex(edges)
+
+    positions = None
+    if clargs.format == 'matplotlib' or clargs.format in POSITIONED_WRITERS:
+        with _stage(profile, 'layout'):
+            positions = layout_cache.layout(graph, clargs.layout, clargs.layout_iterations)
+
+    if clargs.models_from:
+        queries = _read_queries(clargs.models_from)
+    else:
+        queries = [[name] for name in models]
+
+    extension = 'png' if clargs.format == 'matplotlib' else clargs.format
+    os.makedirs(clargs.saveas, exist_ok=True)
+    for query in queries:
+        missing = [name for name in query if name not in models and name not in graph]
+        if missing:
+            log.warning(f'Skipping {" ".join(query)}: no models named {", ".join(missing)}')
+            continue
+
+        with _stage(profile, 'graph'):
+            subgraph, nodes, subgraph_edges = filter_graph(
+                models, index, query, **enabled_entities, **_neighbourhood(clargs),
+            )
+        _render(
+            clargs, subgraph, nodes, subgraph_edges, enabled_entities,
+            show=False,
+            layout_cache=layout_cache,
+            profile=profile,
+            saveas=os.path.join(clargs.saveas, f'{"+".join(query)}.{extension}'),
+            positions=positions,
+        )
+
+
+def _watch(clargs, enabled_entities: Dict):
+    cache = ParseCache(clargs.cache_dir, clargs.cwd, parser=clargs.parser) if clargs.cache else None
+    watcher = DirectoryWatcher(clargs.cwd, jobs=clargs.jobs, cache=cache, parser=clargs.parser)
+    layout_cache = _layout_cache(clargs, enabled_entities)
+
+    def render():
+        graph, nodes, edges = _generate_graph(clargs, watcher.models, enabled_entities)
+        _render(clargs, graph, nodes, edges, enabled_entities, show=False, layout_cache=layout_cache)
+        log.info(f'Saved {clargs.saveas}')
+
+    render()
+    log.info(f'Watching {clargs.cwd} for changes...')
+
+    try:
+        while True:
+            time.sleep(clargs.watch_interval)
+            try:
+                affected = watcher.update()
+                if affected:
+                    log.info(f'{len(affected)} classes changed')
+                    render()
+            except Exception:
+                # Such as a file caught part way through being saved: keep
+                # watching, as the next change will usually fix it.
+                log.exception('Failed to update the graph')
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
     clargs = _parse_args()
 
@@ -482,21 +1927,40 @@ def main():
         'abstract_enabled': clargs.abstract,
     }
 
-    models = get_models_for_directory(clargs.cwd)
+    if clargs.watch:
+        _watch(clargs, enabled_entities)
+        return
 
-    graph, nodes, edges = generate_graph(
-        models,
-        for_models=clargs.models,
-        **enabled_entities,
-    )
+    profile = Profile(slowest=clargs.profile_files, memory=clargs.profile_memory) if clargs.profile else None
 
-    show_graph(
-        graph, nodes, edges,
-        saveas=clargs.saveas,
-        show=clargs.show,
-        **enabled_entities,
+    models = get_models_for_directory(
+        clargs.cwd,
+        jobs=clargs.jobs,
+        cache_dir=clargs.cache_dir if clargs.cache else None,
+        parser=clargs.parser,
+        profile=profile,
     )
 
+    if clargs.models_from or clargs.each_model:
+        _batch(clargs, models, enabled_entities, _layout_cache(clargs, enabled_entities), profile=profile)
+    else:
+        with _stage(profile, 'graph'):
+            graph, nodes, edges = _generate_graph(clargs, models, enabled_entities)
+
+        _render(
+            clargs, graph, nodes, edges, enabled_entities,
+            show=clargs.show,
+            layout_cache=_layout_cache(clargs, enabled_entities),
+            profile=profile,
+        )
+
+    if profile:
+        if clargs.profile == '-':
+            profile.write(sys.stdout)
+        else:
+            with open(clargs.profile, 'w') as f:
+                profile.write(f)
+
 
 if __name__ == '__main__':
     main()
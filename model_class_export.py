@@ -0,0 +1,382 @@
+"""
+Write the dependency graph from generate_graph as text, without matplotlib.
+
+Each writer streams its output as it goes, so the size of the graph only
+affects how long writing takes, not how much memory it needs.
+"""
+import json
+import logging
+import math
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    TextIO,
+    Tuple,
+)
+from xml.sax.saxutils import escape, quoteattr
+
+from model_class_dependencies import (
+    RELATION_FIELD_TYPES,
+    PyClass,
+)
+
+from model_class_graph import (
+    BACKGROUND_COLOR,
+    EDGE_STYLES,
+    LABEL_COLOR,
+    LABEL_FONT_SIZE,
+    NODE_SIZE,
+    NODE_STYLES,
+    _edge_width,
+    _enabled_edge_kinds,
+    _enabled_node_kinds,
+    _node_label,
+)
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+log = logging.getLogger(__name__)
+
+
+def _rgba(color: str, alpha: float) -> str:
+    """Return a #rrggbbaa colour."""
+    return f'{color}{round(alpha * 255):02x}'
+
+
+def _dot_id(name: str) -> str:
+    escaped = name.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def write_dot(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        stream: TextIO,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+):
+    """Write graph to stream in Graphviz DOT format, with the same colours as show_graph.
+
+    Nodes that are in graph but not in nodes, such as base classes that are
+    not models, are written with a label only, as show_graph draws them."""
+    # show_graph draws a node as a 200pt² circle: about 0.2 inches across.
+    diameter = round(NODE_SIZE ** .5 / 72, 2)
+
+    stream.write('digraph models {\n')
+    stream.write(f'    graph [bgcolor="{BACKGROUND_COLOR}", overlap=false, splines=curved];\n')
+    stream.write(
+        f'    node [shape=circle, fixedsize=true, width={diameter}, style=filled, color=none, '
+        f'fillcolor=none, fontcolor="{LABEL_COLOR}", fontsize={LABEL_FONT_SIZE}];\n'
+    )
+
+    written = set()
+    for kind in _enabled_node_kinds(abstract_enabled):
+        fill = _rgba(NODE_STYLES[kind]['color'], NODE_STYLES[kind]['alpha'])
+        for name in nodes.get(kind, ()):
+            label = f', label={_dot_id(_node_label(graph, name))}' if kind == 'app' else ''
+            stream.write(f'    {_dot_id(name)} [fillcolor="{fill}"{label}];\n')
+            written.add(name)
+
+    for name in graph.nodes:
+        if name not in written:
+            stream.write(f'    {_dot_id(name)};\n')
+
+    weights = graph.graph.get('weights', {})
+    for kind in _enabled_edge_kinds(related_field_enabled, subclass_enabled):
+        color = _rgba(EDGE_STYLES[kind]['color'], EDGE_STYLES[kind]['alpha'])
+        for source, target in edges.get(kind, ()):
+            weight = weights.get(kind, {}).get((source, target), 1)
+            penwidth = f', penwidth={_edge_width(weight):.2f}' if weight > 1 else ''
+            stream.write(f'    {_dot_id(source)} -> {_dot_id(target)} [color="{color}"{penwidth}];\n')
+
+    stream.write('}\n')
+
+
+# show_graph draws on a 28 inch square figure. SVG sizes are in points.
+SVG_SIZE = 28 * 72
+SVG_MARGIN = 36
+SVG_NODE_RADIUS = math.sqrt(NODE_SIZE / math.pi)
+SVG_ARROW_LENGTH = 10
+
+
+def _svg_transform(positions: Dict, names) -> Callable[[Tuple[float, float]], Tuple[float, float]]:
+    """Return a function that maps layout coordinates to SVG coordinates,
+    scaling the positions of names to fill the image and flipping the y axis."""
+    xs = [positions[n][0] for n in names]
+    ys = [positions[n][1] for n in names]
+    if not xs:
+        return lambda p: (SVG_SIZE / 2, SVG_SIZE / 2)
+
+    min_x, min_y = min(xs), min(ys)
+    span = max(max(xs) - min_x, max(ys) - min_y) or 1
+    scale = (SVG_SIZE - 2 * SVG_MARGIN) / span
+    return lambda p: (SVG_MARGIN + (p[0] - min_x) * scale, SVG_SIZE - SVG_MARGIN - (p[1] - min_y) * scale)
+
+
+def _svg_edge(
+        start: Tuple[float, float], end: Tuple[float, float], rad: float,
+        width: float = 1,
+) -> Optional[str]:
+    """Return an SVG element for an edge, curved like matplotlib's arc3
+    connection style, width points wide."""
+    (x1, y1), (x2, y2) = start, end
+    if x1 == x2 and y1 == y2:
+        return None
+    stroke = f' stroke-width="{width:.2f}"' if width != 1 else ''
+    if not rad:
+        return f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}"{stroke}/>'
+
+    # SVG's y axis points down, so the control point is mirrored compared
+    # to matplotlib's arc3 to bend the edge the same way.
+    cx = (x1 + x2) / 2 - rad * (y2 - y1)
+    cy = (y1 + y2) / 2 + rad * (x2 - x1)
+    return f'<path d="M{x1:.1f} {y1:.1f}Q{cx:.1f} {cy:.1f} {x2:.1f} {y2:.1f}"{stroke}/>'
+
+
+def write_svg(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        stream: TextIO,
+        positions: Optional[Dict] = None,
+        layout_fn: Optional[Callable] = None,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+):
+    """Write graph to stream as SVG, drawn like show_graph but without matplotlib.
+
+    positions maps each node to its (x, y) position. If it is not given it
+    is computed with layout_fn, which defaults to networkx.circular_layout.
+
+    Elements are written as they are generated, so memory use depends only
+    on the size of the graph."""
+    if positions is None:
+        if layout_fn is None:
+            import networkx as nx
+            layout_fn = nx.circular_layout
+        positions = layout_fn(graph)
+
+    transform = _svg_transform(positions, graph.nodes)
+    points = {name: transform(positions[name]) for name in graph.nodes}
+
+    stream.write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+        f'width="{SVG_SIZE}pt" height="{SVG_SIZE}pt" viewBox="0 0 {SVG_SIZE} {SVG_SIZE}">\n'
+    )
+
+    edge_kinds = _enabled_edge_kinds(related_field_enabled, subclass_enabled)
+    stream.write('<defs>\n')
+    for kind in edge_kinds:
+        # The arrow ends at the edge of the target node rather than its centre.
+        stream.write(
+            f'<marker id="arrow-{kind}" markerUnits="userSpaceOnUse" orient="auto" '
+            f'markerWidth="{SVG_ARROW_LENGTH}" markerHeight="{SVG_ARROW_LENGTH}" '
+            f'refX="{SVG_ARROW_LENGTH + SVG_NODE_RADIUS:.1f}" refY="{SVG_ARROW_LENGTH / 2}" '
+            f'overflow="visible">'
+            f'<path d="M0 0L{SVG_ARROW_LENGTH} {SVG_ARROW_LENGTH / 2}L0 {SVG_ARROW_LENGTH}z" '
+            f'fill="{EDGE_STYLES[kind]["color"]}" fill-opacity="{EDGE_STYLES[kind]["alpha"]}"/>'
+            f'</marker>\n'
+        )
+    stream.write('</defs>\n')
+    stream.write(f'<rect width="100%" height="100%" fill="{BACKGROUND_COLOR}"/>\n')
+
+    weights = graph.graph.get('weights', {})
+    for kind in edge_kinds:
+        style = EDGE_STYLES[kind]
+        stream.write(
+            f'<g class="{kind}" fill="none" stroke="{style["color"]}" '
+            f'stroke-opacity="{style["alpha"]}" marker-end="url(#arrow-{kind})">\n'
+        )
+        for source, target in edges.get(kind, ()):
+            weight = weights.get(kind, {}).get((source, target), 1)
+            element = _svg_edge(points[source], points[target], style['rad'], _edge_width(weight))
+            if element:
+                stream.write(element + '\n')
+        stream.write('</g>\n')
+
+    for kind in _enabled_node_kinds(abstract_enabled):
+        style = NODE_STYLES[kind]
+        stream.write(f'<g class="{kind}" fill="{style["color"]}" fill-opacity="{style["alpha"]}">\n')
+        for name in nodes.get(kind, ()):
+            x, y = points[name]
+            stream.write(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{SVG_NODE_RADIUS:.1f}"/>\n')
+        stream.write('</g>\n')
+
+    stream.write(
+        f'<g class="labels" fill="{LABEL_COLOR}" font-family="sans-serif" font-size="{LABEL_FONT_SIZE}" '
+        f'text-anchor="middle" dominant-baseline="central">\n'
+    )
+    for name in graph.nodes:
+        x, y = points[name]
+        stream.write(f'<text x="{x:.1f}" y="{y:.1f}">{escape(_node_label(graph, name))}</text>\n')
+    stream.write('</g>\n')
+
+    stream.write('</svg>\n')
+
+
+def _model_record(name: str, kind: str, model: Optional[PyClass]) -> Dict:
+    """Describe a node. kind is 'abstract' or 'concrete' for models, and
+    'external' for other classes, such as models.Model."""
+    record = {'name': name, 'kind': kind}
+    if model is None:
+        return record
+
+    record['abstract'] = model.abstract
+    record['source'] = model.source
+    record['bases'] = list(model.class_dependencies)
+    record['fields'] = [
+        {
+            'name': field.name,
+            'type': field.type,
+            'relation': RELATION_FIELD_TYPES.get(field.type),
+            'args': list(field.args),
+            'kwargs': dict(field.kwargs),
+        }
+        for field in model.fields
+    ]
+    return record
+
+
+def _node_records(graph: 'nx.Graph', nodes: Dict) -> Iterator[Dict]:
+    models: Dict[str, PyClass] = graph.graph.get('models', {})
+    app_sizes: Dict[str, int] = graph.graph.get('app_sizes', {})
+    kinds = {name: kind for kind in ('abstract', 'concrete') for name in nodes.get(kind, ())}
+    for name in graph.nodes:
+        if name in app_sizes:
+            # An app collapsed by collapse_apps, with the number of models in it.
+            yield {'name': name, 'kind': 'app', 'models': app_sizes[name]}
+            continue
+        model = models.get(name)
+        yield _model_record(name, kinds.get(name, 'external') if model else 'external', model)
+
+
+def _edge_records(
+        graph: 'nx.Graph', edges: Dict,
+        related_field_enabled=True,
+        subclass_enabled=True,
+) -> Iterator[Dict]:
+    """Describe each edge. Edges of a graph from collapse_apps also have the
+    number of edges they stand for as their weight."""
+    weights = graph.graph.get('weights')
+    for kind in _enabled_edge_kinds(related_field_enabled, subclass_enabled):
+        for source, target in edges.get(kind, ()):
+            record = {'source': source, 'target': target, 'kind': kind}
+            if weights is not None:
+                record['weight'] = weights.get(kind, {}).get((source, target), 1)
+            yield record
+
+
+def write_json(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        stream: TextIO,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+):
+    """Write each node of graph, with the fields of each model, and each edge
+    with its kind as a single JSON document:
+
+        {"models": [{"name": ..., "kind": ..., "fields": [...]}, ...],
+         "edges": [{"source": ..., "target": ..., "kind": ...}, ...]}
+
+    Records are serialised one at a time, so no copy of the whole graph is
+    built in memory."""
+    stream.write('{"models": [')
+    for i, record in enumerate(_node_records(graph, nodes)):
+        stream.write(',\n' if i else '\n')
+        stream.write(json.dumps(record))
+    stream.write('\n], "edges": [')
+    for i, record in enumerate(_edge_records(graph, edges, related_field_enabled, subclass_enabled)):
+        stream.write(',\n' if i else '\n')
+        stream.write(json.dumps(record))
+    stream.write('\n]}\n')
+
+
+def write_jsonl(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        stream: TextIO,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+):
+    """Write the records of write_json as JSON lines, each with a "type" of
+    "model" or "edge", so that they can be read one at a time."""
+    for record in _node_records(graph, nodes):
+        stream.write(json.dumps({'type': 'model', **record}))
+        stream.write('\n')
+    for record in _edge_records(graph, edges, related_field_enabled, subclass_enabled):
+        stream.write(json.dumps({'type': 'edge', **record}))
+        stream.write('\n')
+
+
+# GraphML attributes: (id, element, type). bases is comma-separated and fields
+# holds the fields of write_json as a JSON string.
+GRAPHML_KEYS = [
+    ('kind', 'node', 'string'),
+    ('abstract', 'node', 'boolean'),
+    ('source', 'node', 'string'),
+    ('bases', 'node', 'string'),
+    ('fields', 'node', 'string'),
+    ('kind', 'edge', 'string'),
+    ('weight', 'edge', 'int'),
+]
+
+
+def write_graphml(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        stream: TextIO,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+):
+    """Write the records of write_json as GraphML, which tools such as Gephi,
+    yEd and networkx can read."""
+    stream.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    )
+    for key, element, attr_type in GRAPHML_KEYS:
+        stream.write(
+            f'<key id="{element}-{key}" for="{element}" attr.name="{key}" attr.type="{attr_type}"/>\n'
+        )
+    stream.write('<graph edgedefault="directed">\n')
+
+    def data(element: str, key: str, value: str) -> str:
+        return f'<data key="{element}-{key}">{escape(value)}</data>'
+
+    for record in _node_records(graph, nodes):
+        stream.write(f'<node id={quoteattr(record["name"])}>{data("node", "kind", record["kind"])}')
+        if 'fields' in record:
+            stream.write(data('node', 'abstract', 'true' if record['abstract'] else 'false'))
+            if record['source']:
+                stream.write(data('node', 'source', record['source']))
+            stream.write(data('node', 'bases', ','.join(record['bases'])))
+            stream.write(data('node', 'fields', json.dumps(record['fields'])))
+        stream.write('</node>\n')
+
+    for record in _edge_records(graph, edges, related_field_enabled, subclass_enabled):
+        stream.write(
+            f'<edge source={quoteattr(record["source"])} target={quoteattr(record["target"])}>'
+            f'{data("edge", "kind", record["kind"])}'
+        )
+        if 'weight' in record:
+            stream.write(data('edge', 'weight', str(record['weight'])))
+        stream.write('</edge>\n')
+
+    stream.write('</graph>\n</graphml>\n')
+
+
+# Writers that draw the graph, and so take the position of each node.
+POSITIONED_WRITERS = {'svg'}
+
+# Output formats for --format, other than drawing with matplotlib.
+WRITERS = {
+    'dot': write_dot,
+    'svg': write_svg,
+    'json': write_json,
+    'jsonl': write_jsonl,
+    'graphml': write_graphml,
+}
@@ -0,0 +1,686 @@
+"""
+Build the dependency graph of parsed models and draw it.
+
+networkx and matplotlib are imported inside the functions that need them, so
+importing this module, like model_class_dependencies, stays cheap.
+"""
+import logging
+import math
+import os
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from model_class_dependencies import (
+    Profile,
+    PyClass,
+    _stage,
+)
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+log = logging.getLogger(__name__)
+
+# Colours and sizes shared by every output format.
+BACKGROUND_COLOR = '#333333'
+LABEL_COLOR = '#eeeeee'
+LABEL_FONT_SIZE = 8
+NODE_SIZE = 200  # Area in points², as used by matplotlib.
+
+EDGE_STYLES = {
+    'foreignkey': {'color': '#4f9bd1', 'alpha': .9, 'rad': .2},
+    'onetoone': {'color': '#9bd14f', 'alpha': .9, 'rad': .2},
+    'manytomany': {'color': '#d14f9b', 'alpha': .9, 'rad': .2},
+    'subclass': {'color': '#d68bb6', 'alpha': .3, 'rad': .05},
+}
+
+NODE_STYLES = {
+    'abstract': {'color': '#555555', 'alpha': .7},
+    'concrete': {'color': '#244461', 'alpha': 1.0},
+    'app': {'color': '#61442a', 'alpha': 1.0},  # All the models of an app, from collapse_apps.
+}
+
+# show_graph draws curved arrows, one matplotlib patch each, for graphs with
+# fewer edges than this. Larger graphs are drawn with straight lines in one
+# collection per edge kind, which is much faster.
+CURVED_EDGE_LIMIT = 1000
+ARROW_SIZE = 6  # Length of straight arrowheads in points.
+
+
+def _enabled_edge_kinds(related_field_enabled=True, subclass_enabled=True) -> List[str]:
+    """Edge kinds to draw, in drawing order."""
+    kinds = []
+    if related_field_enabled:
+        kinds += ['foreignkey', 'onetoone', 'manytomany']
+    if subclass_enabled:
+        kinds.append('subclass')
+    return kinds
+
+
+def _enabled_node_kinds(abstract_enabled=True) -> List[str]:
+    """Node kinds to draw, in drawing order."""
+    return ['app', 'abstract', 'concrete'] if abstract_enabled else ['app', 'concrete']
+
+
+def _edge_width(weight: int) -> float:
+    """Line width in points of an edge that stands for weight edges."""
+    return 1 + math.log2(weight)
+
+
+def _node_label(graph: 'nx.Graph', name: str) -> str:
+    """Label for a node: its name, with the number of models in it for an
+    app collapsed by collapse_apps."""
+    app_sizes = graph.graph.get('app_sizes', {})
+    return f'{name} ({app_sizes[name]})' if name in app_sizes else str(name)
+
+
+def generate_graph(
+        models: Dict[str, PyClass],
+        for_models=None,  # Prune any nodes/edges that are not connected to a model with this name.
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+) -> Tuple['nx.MultiDiGraph', Dict, Dict]:
+    nodes, edges = classify(models, for_models)
+    graph = _build_graph(models, nodes, edges, abstract_enabled, related_field_enabled, subclass_enabled)
+    return graph, nodes, edges
+
+
+def classify(models: Dict[str, PyClass], for_models=None) -> Tuple[Dict, Dict]:
+    """Return the nodes and edges of each kind that generate_graph adds to
+    its graph, without building the graph."""
+    for_models = set(for_models) if for_models else None
+
+    # Names of every node that is connected by an edge that passes the filter.
+    filtered_nodes = set()
+
+    def filter_edge_for_model(output_list: List, self_name: str, foreign_name: str):
+        """If for_model is defined, only add the edge to output_list if it matches
+        either self_name or foreign_name.
+        If for_model is not defined then just add the edge."""
+        if not for_models:
+            output_list.append((self_name, foreign_name))
+        elif self_name in for_models or foreign_name in for_models:
+            output_list.append((self_name, foreign_name))
+            filtered_nodes.add(self_name)
+            filtered_nodes.add(foreign_name)
+
+    foreign_key_relations = []
+    one_to_one_relations = []
+    many_to_many_relations = []
+    subclass_relations = []
+
+    # Classify edges
+    for model in models.values():
+        for fk in model.foreign_key_models():
+            filter_edge_for_model(foreign_key_relations, model.name, fk)
+        for oto in model.one_to_one_models():
+            filter_edge_for_model(one_to_one_relations, model.name, oto)
+        for mtm in model.many_to_many_models():
+            filter_edge_for_model(many_to_many_relations, model.name, mtm)
+
+        for dep in model.class_dependencies:
+            filter_edge_for_model(subclass_relations, model.name, dep)
+
+    # Classify nodes
+    abstract_models = [x.name for x in models.values() if x.abstract]
+    concrete_models = [x.name for x in models.values() if not x.abstract]
+
+    if for_models:
+        # Remove any nodes that are not connected by edges filtered by for_model
+        abstract_models = [m for m in abstract_models if m in filtered_nodes]
+        concrete_models = [m for m in concrete_models if m in filtered_nodes]
+
+    nodes = {
+        'abstract': abstract_models,
+        'concrete': concrete_models,
+    }
+
+    edges = {
+        'foreignkey': foreign_key_relations,
+        'onetoone': one_to_one_relations,
+        'manytomany': many_to_many_relations,
+        'subclass': subclass_relations,
+    }
+    return nodes, edges
+
+
+def _build_graph(
+        models: Dict[str, PyClass], nodes: Dict, edges: Dict,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+) -> 'nx.MultiDiGraph':
+    """Add classified nodes and edges to a new graph."""
+    import networkx as nx
+
+    graph = nx.MultiDiGraph(format='png', directed=True)
+    # Kept by reference so that exporters can describe each model.
+    graph.graph['models'] = models
+
+    graph.add_nodes_from(nodes.get('app', ()))
+    if abstract_enabled:
+        graph.add_nodes_from(nodes['abstract'])
+
+    graph.add_nodes_from(nodes['concrete'])
+
+    if related_field_enabled:
+        graph.add_edges_from(edges['foreignkey'] + edges['onetoone'] + edges['manytomany'])
+    if subclass_enabled:
+        graph.add_edges_from(edges['subclass'])
+    return graph
+
+
+# Directions in which EdgeIndex.expand can follow edges.
+DIRECTIONS = ('both', 'forward', 'reverse')
+
+
+class EdgeIndex:
+    """The classified edges from generate_graph, indexed by the model at
+    each end, so that the edges around a few models can be found without
+    scanning them all."""
+
+    def __init__(self, edges: Dict[str, List[Tuple[str, str]]]):
+        self.forward: Dict[str, Dict[str, List[str]]] = {}
+        self.reverse: Dict[str, Dict[str, List[str]]] = {}
+        for kind, kind_edges in edges.items():
+            forward = self.forward[kind] = {}
+            reverse = self.reverse[kind] = {}
+            for source, target in kind_edges:
+                forward.setdefault(source, []).append(target)
+                reverse.setdefault(target, []).append(source)
+
+    def expand(
+            self,
+            names: Iterable[str],
+            depth: int = 1,
+            kinds: Optional[Container[str]] = None,
+            direction: str = 'both',
+    ) -> Dict[str, List[Tuple[str, str]]]:
+        """Return the edges of each kind within depth steps of names.
+
+        Starting from names, follows edges of the given kinds, or of every
+        kind if kinds is None, breadth first. direction is one of
+        DIRECTIONS: 'forward' follows edges from a model to the models it
+        refers to or inherits from, 'reverse' follows them back to the
+        models that refer to or inherit from it, and 'both' does both.
+        Each model reached in fewer than depth steps contributes its edges.
+        With the defaults, these are the edges generate_graph keeps for
+        for_models. Takes time proportional to the number of edges found."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f'direction must be one of {DIRECTIONS}, not {direction!r}')
+        kinds = [kind for kind in self.forward if kinds is None or kind in kinds]
+        forward = direction in ('both', 'forward')
+        reverse = direction in ('both', 'reverse')
+
+        # Models whose edges are included, i.e. those fewer than depth steps away.
+        inner = dict.fromkeys(names)
+        frontier = list(inner)
+        for _ in range(depth - 1):
+            reached = []
+            for name in frontier:
+                for kind in kinds:
+                    neighbours = []
+                    if forward:
+                        neighbours += self.forward[kind].get(name, ())
+                    if reverse:
+                        neighbours += self.reverse[kind].get(name, ())
+                    for neighbour in neighbours:
+                        if neighbour not in inner:
+                            inner[neighbour] = None
+                            reached.append(neighbour)
+            frontier = reached
+
+        edges = {kind: [] for kind in self.forward}
+        for kind in kinds:
+            found = edges[kind]
+            if forward:
+                for source in inner:
+                    found += ((source, target) for target in self.forward[kind].get(source, ()))
+            if reverse:
+                for target in inner:
+                    # Edges between two inner models were found above.
+                    found += (
+                        (source, target) for source in self.reverse[kind].get(target, ())
+                        if not forward or source not in inner
+                    )
+        return edges
+
+
+def filter_graph(
+        models: Dict[str, PyClass], index: EdgeIndex,
+        for_models,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+        depth: int = 1,
+        kinds: Optional[Container[str]] = None,
+        direction: str = 'both',
+) -> Tuple['nx.MultiDiGraph', Dict, Dict]:
+    """Return the same graph, nodes and edges as generate_graph with
+    for_models, using an EdgeIndex of the edges of every model.
+
+    depth, kinds and direction extend the neighbourhood of for_models as
+    described in EdgeIndex.expand.
+
+    Takes time proportional to the number of edges around for_models rather
+    than the size of the project, so many filtered views can be made from
+    one parse."""
+    edges = index.expand(for_models, depth=depth, kinds=kinds, direction=direction)
+    # In the order they were found, so that output is stable between runs.
+    connected = dict.fromkeys(name for kind_edges in edges.values() for edge in kind_edges for name in edge)
+
+    filtered_nodes = {
+        'abstract': [name for name in connected if name in models and models[name].abstract],
+        'concrete': [name for name in connected if name in models and not models[name].abstract],
+    }
+    subgraph = _build_graph(
+        models, filtered_nodes, edges,
+        abstract_enabled, related_field_enabled, subclass_enabled,
+    )
+    return subgraph, filtered_nodes, edges
+
+
+def collapse_apps(
+        models: Dict[str, PyClass], nodes: Dict, edges: Dict,
+        apps: Dict[str, str],
+        expand: Container[str] = (),
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+) -> Tuple['nx.MultiDiGraph', Dict, Dict]:
+    """Replace the models of each app with a single node named after the app,
+    from nodes and edges as returned by classify or filter_graph.
+
+    apps maps model names to app names, as returned by group_by_app. Models
+    of the apps in expand, and classes without an app such as models.Model,
+    are kept as they are. Edges of each kind between the same two nodes are
+    merged into one, and edges within a collapsed app are dropped.
+
+    Returns the graph, nodes and edges as generate_graph does, with the
+    collapsed apps as nodes of kind 'app'. graph.graph['weights'] holds the
+    number of edges merged into each edge, by kind, and
+    graph.graph['app_sizes'] the number of models in each collapsed app."""
+
+    def group(name: str) -> str:
+        app = apps.get(name)
+        return name if app is None or app in expand else app
+
+    app_sizes: Dict[str, int] = {}
+    collapsed_nodes = {'app': [], 'abstract': [], 'concrete': []}
+    for kind in ('abstract', 'concrete'):
+        for name in nodes.get(kind, ()):
+            app = group(name)
+            if app == name:
+                collapsed_nodes[kind].append(name)
+            else:
+                app_sizes[app] = app_sizes.get(app, 0) + 1
+    collapsed_nodes['app'] = list(app_sizes)
+
+    weights: Dict[str, Dict[Tuple[str, str], int]] = {}
+    for kind, kind_edges in edges.items():
+        counts = weights[kind] = {}
+        for source, target in kind_edges:
+            edge = group(source), group(target)
+            if edge[0] == edge[1] and edge != (source, target):
+                continue
+            counts[edge] = counts.get(edge, 0) + 1
+    collapsed_edges = {kind: list(counts) for kind, counts in weights.items()}
+
+    graph = _build_graph(
+        models, collapsed_nodes, collapsed_edges,
+        abstract_enabled, related_field_enabled, subclass_enabled,
+    )
+    graph.graph['weights'] = weights
+    graph.graph['app_sizes'] = app_sizes
+    return graph, collapsed_nodes, collapsed_edges
+
+
+def show_graph(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        show=True,
+        layout_fn: Optional[Callable] = None,
+        saveas=None,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+        profile: Optional[Profile] = None,
+        positions: Optional[Dict] = None,
+        curved_edge_limit: Optional[int] = CURVED_EDGE_LIMIT,
+):
+    """Draw graph with matplotlib, then show it and/or save it to saveas.
+
+    positions maps each node to its (x, y) position. If it is not given it
+    is computed with layout_fn, which takes the graph and defaults to
+    networkx.circular_layout.
+
+    Edges are drawn as curved arrows if there are fewer than
+    curved_edge_limit of them, or always if it is None. Otherwise each kind
+    of edge is drawn as straight lines in a single collection."""
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
+    if positions is not None:
+        layout = positions
+    else:
+        with _stage(profile, 'layout'):
+            layout = (layout_fn or nx.circular_layout)(graph)
+
+    with _stage(profile, 'render'):
+        fig = plt.figure(1, figsize=(28, 28))
+        ax = fig.add_subplot(1, 1, 1)
+        _draw(
+            ax, graph, layout, nodes, edges,
+            edge_kinds=_enabled_edge_kinds(related_field_enabled, subclass_enabled),
+            node_kinds=_enabled_node_kinds(abstract_enabled),
+            curved_edge_limit=curved_edge_limit,
+        )
+
+        if saveas:
+            fig.savefig(saveas)
+
+        if show:
+            plt.show()
+        else:
+            plt.close(fig)
+
+
+def _draw(
+        ax, graph: 'nx.Graph', layout: Dict, nodes: Dict, edges: Dict,
+        edge_kinds: List[str], node_kinds: List[str],
+        curved_edge_limit: Optional[int] = CURVED_EDGE_LIMIT,
+        limits: Optional[Tuple[float, float, float, float]] = None,
+):
+    """Draw edges, then nodes, then labels for the nodes of graph on ax.
+
+    limits is (left, right, bottom, top) in layout coordinates. If it is
+    given edges are always drawn as straight lines, and anything outside
+    it is clipped."""
+    import networkx as nx
+
+    ax.set_facecolor(BACKGROUND_COLOR)
+
+    edge_count = sum(len(edges.get(kind) or ()) for kind in edge_kinds)
+    curved = limits is None and (curved_edge_limit is None or edge_count < curved_edge_limit)
+    if limits is not None:
+        ax.set_xlim(*limits[:2])
+        ax.set_ylim(*limits[2:])
+    elif not curved:
+        _fit_axes(ax, layout)
+
+    # Set by collapse_apps, for edges that stand for several.
+    weights = graph.graph.get('weights', {})
+    for kind in edge_kinds:
+        style = EDGE_STYLES[kind]
+        if curved:
+            edgelist = edges.get(kind)
+            width = 1.0
+            if kind in weights and edgelist:
+                width = [_edge_width(weights[kind].get(edge, 1)) for edge in edgelist]
+            nx.draw_networkx_edges(
+                graph, layout,
+                edgelist=edgelist,
+                width=width,
+                edge_color=style['color'],
+                alpha=style['alpha'],
+                connectionstyle=f'arc3, rad={style["rad"]}',
+                ax=ax,
+            )
+        else:
+            _draw_edge_collection(ax, layout, edges.get(kind) or [], style, weights.get(kind))
+
+    for kind in node_kinds:
+        if not nodes.get(kind):
+            # A nodelist of None would draw every node.
+            continue
+        style = NODE_STYLES[kind]
+        nx.draw_networkx_nodes(
+            graph, layout,
+            nodelist=nodes[kind],
+            node_color=style['color'],
+            node_shape='o',
+            node_size=NODE_SIZE,
+            alpha=style['alpha'],
+            ax=ax,
+        )
+
+    labels = None
+    if graph.graph.get('app_sizes'):
+        labels = {name: _node_label(graph, name) for name in graph.nodes}
+    nx.draw_networkx_labels(
+        graph, layout,
+        labels=labels,
+        font_size=LABEL_FONT_SIZE,
+        font_color=LABEL_COLOR,
+        ax=ax,
+    )
+
+
+def _fit_axes(ax, layout: Dict):
+    """Set the limits of ax to fit layout with a margin, as networkx does,
+    so that sizes in points can be converted to data units before drawing."""
+    import numpy as np
+
+    points = np.array(list(layout.values()), dtype=float).reshape(-1, 2)
+    if not len(points):
+        return
+    low, high = points.min(0), points.max(0)
+    margin = np.maximum((high - low) * .05, .05)
+    ax.set_xlim(low[0] - margin[0], high[0] + margin[0])
+    ax.set_ylim(low[1] - margin[1], high[1] + margin[1])
+
+
+def _draw_edge_collection(
+        ax, layout: Dict, edgelist: List[Tuple[str, str]], style: Dict,
+        weights: Optional[Dict[Tuple[str, str], int]] = None,
+):
+    """Draw edgelist as straight lines in one LineCollection, with arrowheads
+    in one PolyCollection. Colours and alphas are given per edge, so every
+    edge is drawn in a single call however many there are. Edges from a
+    node to itself are not drawn. weights gives the number of edges that
+    each edge stands for, which sets its width."""
+    import numpy as np
+    from matplotlib.collections import LineCollection, PolyCollection
+    from matplotlib.colors import to_rgba
+
+    edgelist = [(s, t) for s, t in edgelist if s in layout and t in layout and s != t]
+    if not edgelist:
+        return
+
+    segments = np.array([(layout[s], layout[t]) for s, t in edgelist], dtype=float)
+    start, end = segments[:, 0], segments[:, 1]
+    delta = end - start
+    length = np.sqrt((delta * delta).sum(1))
+    keep = length > 0
+    start, end, delta, length = start[keep], end[keep], delta[keep], length[keep]
+    widths = 1
+    if weights:
+        widths = np.array([_edge_width(weights.get(edge, 1)) for edge in edgelist])[keep]
+    direction = delta / length[:, None]
+
+    # Sizes in points converted to data units along each axis, so that
+    # arrows stay the same size on screen whatever the layout's scale.
+    x_low, x_high = ax.get_xlim()
+    y_low, y_high = ax.get_ylim()
+    points_per_unit = np.array([
+        ax.bbox.width / (x_high - x_low),
+        ax.bbox.height / (y_high - y_low),
+    ]) * 72 / ax.figure.dpi
+
+    def to_data(offsets, size):
+        return offsets * size / points_per_unit
+
+    node_radius = math.sqrt(NODE_SIZE / math.pi)
+    tip = end - to_data(direction, node_radius)
+    base = tip - to_data(direction, ARROW_SIZE)
+    normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+    wings = to_data(normal, ARROW_SIZE / 3)
+
+    colors = np.tile(to_rgba(style['color'], style['alpha']), (len(start), 1))
+    ax.add_collection(LineCollection(np.stack([start, base], axis=1), colors=colors, linewidths=widths, zorder=1))
+    ax.add_collection(PolyCollection(
+        np.stack([tip, base + wings, base - wings], axis=1),
+        facecolors=colors, edgecolors='none', zorder=1,
+    ))
+
+
+TILE_SIZE = 14  # Inches, for each tile drawn by write_tiles.
+TILE_INDEX = 'index.html'
+
+
+def _tile_filename(row: int, column: int) -> str:
+    return f'tile-{row}-{column}.png'
+
+
+def write_tiles(
+        graph: 'nx.Graph', nodes: Dict, edges: Dict,
+        directory: str,
+        positions: Dict,
+        grid: int = 4,
+        abstract_enabled=True,
+        related_field_enabled=True,
+        subclass_enabled=True,
+) -> Dict[Tuple[int, int], Dict[Tuple[int, int], int]]:
+    """Split the laid out graph into a grid of grid × grid tiles and draw
+    each to its own PNG in directory, with an index.html that links them.
+
+    Only one tile is drawn at a time, so memory use depends on the size of
+    a tile rather than the whole graph. Each tile draws its own models and
+    every edge that touches them. Edges that leave a tile are clipped at its
+    border, which is marked in the direction of each tile they lead to with
+    how many edges go there.
+
+    Returns the number of edges between each pair of tiles, keyed by
+    (row, column) of the tiles at each end. Tiles without models are not
+    drawn."""
+    import matplotlib.pyplot as plt
+
+    os.makedirs(directory, exist_ok=True)
+    edge_kinds = _enabled_edge_kinds(related_field_enabled, subclass_enabled)
+    node_kinds = _enabled_node_kinds(abstract_enabled)
+
+    xs = [x for x, _ in positions.values()] or [0.0]
+    ys = [y for _, y in positions.values()] or [0.0]
+    left, bottom, top = min(xs), min(ys), max(ys)
+    width = max(max(xs) - left, 1e-9) / grid
+    height = max(top - bottom, 1e-9) / grid
+
+    def tile_of(node) -> Tuple[int, int]:
+        x, y = positions[node]
+        # Row 0 is at the top, as in the index.
+        return (
+            min(int((top - y) / height), grid - 1),
+            min(int((x - left) / width), grid - 1),
+        )
+
+    tiles = {node: tile_of(node) for node in graph.nodes if node in positions}
+    members: Dict[Tuple[int, int], List] = {}
+    for node, tile in tiles.items():
+        members.setdefault(tile, []).append(node)
+
+    # Edges touching each tile, by kind, and edge counts between tiles.
+    tile_edges: Dict[Tuple[int, int], Dict[str, List]] = {tile: {} for tile in members}
+    crossings: Dict[Tuple[int, int], Dict[Tuple[int, int], int]] = {tile: {} for tile in members}
+    for kind in edge_kinds:
+        for source, target in edges.get(kind) or []:
+            if source not in tiles or target not in tiles:
+                continue
+            ends = {tiles[source], tiles[target]}
+            for tile in ends:
+                tile_edges[tile].setdefault(kind, []).append((source, target))
+            if len(ends) == 1:
+                continue
+            for here, there in ((tiles[source], tiles[target]), (tiles[target], tiles[source])):
+                crossings[here][there] = crossings[here].get(there, 0) + 1
+
+    for (row, column), tile_nodes in members.items():
+        tile_top = top - row * height
+        limits = (left + column * width, left + (column + 1) * width, tile_top - height, tile_top)
+        kept = set(tile_nodes)
+
+        fig = plt.figure(figsize=(TILE_SIZE, TILE_SIZE))
+        ax = fig.add_subplot(1, 1, 1)
+        _draw(
+            ax, graph.subgraph(tile_nodes), positions,
+            {kind: [n for n in names if n in kept] for kind, names in nodes.items()},
+            tile_edges[(row, column)],
+            edge_kinds=edge_kinds,
+            node_kinds=node_kinds,
+            limits=limits,
+        )
+        for there, count in crossings[(row, column)].items():
+            _draw_exit_marker(ax, limits, (row, column), there, count)
+
+        ax.set_title(f'Tile {row}, {column}', color=LABEL_COLOR)
+        fig.savefig(os.path.join(directory, _tile_filename(row, column)), facecolor=BACKGROUND_COLOR)
+        plt.close(fig)
+
+    with open(os.path.join(directory, TILE_INDEX), 'w') as f:
+        _write_tile_index(f, grid, members, crossings)
+    return crossings
+
+
+def _draw_exit_marker(
+        ax, limits: Tuple[float, float, float, float],
+        here: Tuple[int, int], there: Tuple[int, int], count: int,
+):
+    """Label the border of tile here in the direction of tile there with
+    the number of edges between them."""
+    left, right, bottom, top = limits
+    dx, dy = there[1] - here[1], here[0] - there[0]
+    # Move from the centre of the tile towards the other tile until the border.
+    scale = 1 / max(abs(dx), abs(dy))
+    x = (left + right) / 2 + dx * scale * (right - left) / 2
+    y = (bottom + top) / 2 + dy * scale * (top - bottom) / 2
+    ax.annotate(
+        f'→ tile {there[0]}, {there[1]}: {count}',
+        (x, y),
+        fontsize=LABEL_FONT_SIZE,
+        color=LABEL_COLOR,
+        ha='left' if dx < 0 else 'right' if dx > 0 else 'center',
+        va='bottom' if dy < 0 else 'top' if dy > 0 else 'center',
+        bbox={'facecolor': BACKGROUND_COLOR, 'edgecolor': LABEL_COLOR, 'alpha': .8},
+        annotation_clip=False,
+    )
+
+
+def _write_tile_index(stream, grid: int, members: Dict, crossings: Dict):
+    """Write an HTML page showing the tiles in a grid, with links between
+    tiles that are joined by edges."""
+    stream.write(
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        '<title>Model dependencies</title>\n'
+        f'<style>body {{ background: {BACKGROUND_COLOR}; color: {LABEL_COLOR}; font-family: sans-serif; }} '
+        f'a {{ color: {EDGE_STYLES["foreignkey"]["color"]}; }} '
+        'td { vertical-align: top; } img { width: 100%; }</style>\n'
+        '</head>\n<body>\n<table>\n'
+    )
+    for row in range(grid):
+        stream.write('<tr>\n')
+        for column in range(grid):
+            tile = (row, column)
+            stream.write(f'<td id="tile-{row}-{column}">\n')
+            if tile in members:
+                filename = _tile_filename(row, column)
+                stream.write(
+                    f'<a href="{filename}"><img src="{filename}" alt="Tile {row}, {column}"></a>\n'
+                    f'<p>{len(members[tile])} models</p>\n<ul>\n'
+                )
+                for there, count in sorted(crossings[tile].items()):
+                    stream.write(
+                        f'<li><a href="#tile-{there[0]}-{there[1]}">→ tile {there[0]}, {there[1]}</a>: '
+                        f'{count} edges</li>\n'
+                    )
+                stream.write('</ul>\n')
+            stream.write('</td>\n')
+        stream.write('</tr>\n')
+    stream.write('</table>\n</body>\n</html>\n')
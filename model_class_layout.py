@@ -0,0 +1,597 @@
+"""
+Compute node positions for drawing the dependency graph, and keep them
+between runs.
+
+Each layout in LAYOUTS takes the graph, optional initial positions for some
+of its nodes and an optional iteration budget, and returns an (x, y)
+position for every node. networkx and numpy are imported inside the layouts
+that need them.
+"""
+import hashlib
+import logging
+import math
+import os
+import pickle
+import random
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from model_class_dependencies import _dump_atomic
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+log = logging.getLogger(__name__)
+
+# Increment when layouts change, so that cached positions are recomputed.
+LAYOUT_VERSION = 2
+
+Positions = Dict[Hashable, Tuple[float, float]]
+
+
+def circular_layout(
+        graph: 'nx.Graph',
+        initial: Optional[Positions] = None,
+        iterations: Optional[int] = None,
+) -> Positions:
+    """Place nodes on a circle, in graph order. initial and iterations are ignored."""
+    import networkx as nx
+    return _as_tuples(nx.circular_layout(graph))
+
+
+def spring_layout(
+        graph: 'nx.Graph',
+        initial: Optional[Positions] = None,
+        iterations: Optional[int] = None,
+) -> Positions:
+    """Force-directed layout from networkx. Each iteration takes time
+    proportional to the square of the number of nodes, and graphs of 500 or
+    more nodes need scipy.
+
+    If initial has positions for most nodes, those nodes are kept where
+    they are and only the others are laid out around them."""
+    import networkx as nx
+
+    iterations = iterations or 50
+    if not initial:
+        return _as_tuples(nx.spring_layout(graph, iterations=iterations, seed=0))
+
+    pos = _seed_positions(graph, initial)
+    placed = [node for node in graph.nodes if node in initial]
+    if len(placed) == len(graph):
+        return pos
+    if len(placed) < len(graph) / 2:
+        return _as_tuples(nx.spring_layout(graph, pos=pos, iterations=iterations, seed=0))
+    return _as_tuples(nx.spring_layout(graph, pos=pos, fixed=placed, iterations=max(1, iterations // 5), seed=0))
+
+
+def force_layout(
+        graph: 'nx.Graph',
+        initial: Optional[Positions] = None,
+        iterations: Optional[int] = None,
+        theta: float = .8,
+        seed: int = 0,
+) -> Positions:
+    """Fruchterman-Reingold force-directed layout for large graphs.
+
+    Repulsion between all pairs of nodes is approximated with a Barnes-Hut
+    quadtree, so each iteration takes O(n log n) time rather than the O(n²)
+    of spring_layout. A cell of the quadtree is treated as a single node
+    when its width is less than theta times its distance from the node it
+    acts on: 0 is exact, larger is faster and coarser.
+
+    iterations is the budget of simulation steps, 50 by default. If initial
+    has positions for most nodes, those nodes are kept where they are and
+    only the others are laid out around them, in a fifth of the budget."""
+    import numpy as np
+
+    nodes = list(graph.nodes)
+    n = len(nodes)
+    if n < 2:
+        return {node: (0.0, 0.0) for node in nodes}
+
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = [(index[s], index[t]) for s, t in graph.edges() if s != t]
+    sources = np.array([s for s, _ in edges], dtype=np.intp)
+    targets = np.array([t for _, t in edges], dtype=np.intp)
+
+    iterations = iterations or 50
+    rng = np.random.default_rng(seed)
+    fixed = None
+    placed = [node for node in nodes if node in initial] if initial else []
+    if placed:
+        seeded = _seed_positions(graph, initial)
+        pos = np.array([seeded[node] for node in nodes], dtype=float)
+        if len(placed) >= n / 2:
+            fixed = np.array([node in initial for node in nodes])
+            iterations = max(1, iterations // 5)
+    else:
+        pos = rng.uniform(-1, 1, (n, 2))
+
+    span = max(float(np.ptp(pos, axis=0).max()), 1e-3)
+    k = span / math.sqrt(n)  # Ideal distance between nodes.
+    temperature = span / 10 if fixed is None else span / 50
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = _repulsion(pos, k * k, theta)
+        if len(edges):
+            delta = pos[targets] - pos[sources]
+            attraction = delta * (np.sqrt((delta * delta).sum(1)) / k)[:, None]
+            for axis in (0, 1):
+                displacement[:, axis] += np.bincount(sources, attraction[:, axis], n)
+                displacement[:, axis] -= np.bincount(targets, attraction[:, axis], n)
+
+        length = np.sqrt((displacement * displacement).sum(1))
+        step = displacement * (np.minimum(length, temperature) / np.maximum(length, 1e-12))[:, None]
+        if fixed is not None:
+            step[fixed] = 0
+        pos += step
+        temperature -= cooling
+
+    if not placed:
+        # Centre on the origin and scale to [-1, 1], as networkx layouts do.
+        pos -= pos.mean(0)
+        pos /= max(float(np.abs(pos).max()), 1e-12)
+
+    return {node: (float(pos[i, 0]), float(pos[i, 1])) for i, node in enumerate(nodes)}
+
+
+def _spread_bits(values):
+    """Interleave the lower 16 bits of values with zeros, for Morton codes."""
+    values = values & 0xFFFF
+    values = (values | (values << 8)) & 0x00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F
+    values = (values | (values << 2)) & 0x33333333
+    values = (values | (values << 1)) & 0x55555555
+    return values
+
+
+def _repulsion(pos, strength: float, theta: float, max_depth: int = 16):
+    """Return the repulsive force on each point from all others: strength
+    times the inverse of their distance, directed away from each other.
+
+    Points are sorted by Morton code, so every cell of the quadtree at every
+    level is a contiguous run of points and can be summarised with reduceat.
+    The tree is then walked for all points at once, one level at a time: a
+    (point, cell) pair is either far enough to use the cell's centre of mass,
+    or is replaced by the pairs of the point with the cell's children."""
+    import numpy as np
+
+    n = len(pos)
+    depth = min(max_depth, max(1, math.ceil(math.log(n, 4)) + 2))
+    side = 1 << depth
+
+    low = pos.min(0)
+    span = max(float((pos.max(0) - low).max()), 1e-12)
+    cell = np.minimum(((pos - low) * (side / span)).astype(np.int64), side - 1)
+    codes = _spread_bits(cell[:, 0]) | (_spread_bits(cell[:, 1]) << 1)
+
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    points = pos[order]
+
+    # For each level: cell ids, point counts, centres of mass, the cell of
+    # each point, and where each cell's children start and end in the next level.
+    levels = []
+    for level in range(depth + 1):
+        ids = codes >> (2 * (depth - level))
+        first = np.empty(n, dtype=bool)
+        first[0] = True
+        np.not_equal(ids[1:], ids[:-1], out=first[1:])
+        starts = np.flatnonzero(first)
+        mass = np.diff(np.append(starts, n))
+        centre = np.add.reduceat(points, starts, axis=0) / mass[:, None]
+        levels.append((ids[starts], mass, centre, np.cumsum(first) - 1))
+
+    children = []
+    for level in range(depth):
+        parents = np.searchsorted(levels[level][0], levels[level + 1][0] >> 2)
+        cells = np.arange(len(levels[level][0]))
+        children.append((np.searchsorted(parents, cells, 'left'), np.searchsorted(parents, cells, 'right')))
+
+    force = np.zeros((n, 2))
+    pair_points = np.arange(n)
+    pair_cells = np.zeros(n, dtype=np.intp)
+    for level in range(depth + 1):
+        _, mass, centre, point_cell = levels[level]
+        delta = points[pair_points] - centre[pair_cells]
+        distance2 = np.maximum((delta * delta).sum(1), 1e-12)
+        weight = mass[pair_cells].astype(float)
+        own = point_cell[pair_points] == pair_cells
+
+        if level == depth:
+            # Leaves are not split further: act on each point from the
+            # centre of mass of the other points in its own leaf.
+            others = weight - own
+            delta[own] *= (weight[own] / np.maximum(others[own], 1))[:, None]
+            distance2 = np.maximum((delta * delta).sum(1), 1e-12)
+            use = others > 0
+            weight = others
+        else:
+            width = span / (1 << level)
+            use = ~own & (width * width < theta * theta * distance2)
+
+        push = delta[use] * (strength * weight[use] / distance2[use])[:, None]
+        for axis in (0, 1):
+            force[:, axis] += np.bincount(pair_points[use], push[:, axis], n)
+
+        if level == depth:
+            break
+
+        near_points = pair_points[~use]
+        near_cells = pair_cells[~use]
+        first_child, end_child = children[level]
+        start = first_child[near_cells]
+        count = end_child[near_cells] - start
+        pair_points = np.repeat(near_points, count)
+        offsets = np.arange(len(pair_points)) - np.repeat(np.cumsum(count) - count, count)
+        pair_cells = np.repeat(start, count) + offsets
+
+    result = np.empty_like(force)
+    result[order] = force
+    return result
+
+
+def layered_layout(
+        graph: 'nx.Graph',
+        initial: Optional[Positions] = None,
+        iterations: Optional[int] = None,
+        relation_weight: float = .1,
+        max_width: Optional[int] = None,
+) -> Positions:
+    """Sugiyama-style layout that places models in layers by inheritance
+    depth, with base classes at the top.
+
+    Each model is one layer below the deepest of its base classes, so
+    subclass edges always point upwards. Models in each layer are then
+    ordered to reduce edge crossings by sweeping down and up the layers,
+    sorting each by the barycentre of its neighbours in the layers already
+    swept. Field relations are drawn between layers and count for
+    relation_weight of a subclass edge when ordering. iterations caps the
+    number of sweeps, 8 by default, and sweeping stops early once the order
+    is stable. The order with the fewest crossings between adjacent layers
+    is kept. Each sweep takes time roughly linear in the size of the graph.
+
+    Layers wider than max_width, twice the square root of the number of
+    models by default, are wrapped onto several rows. initial is ignored."""
+    import numpy as np
+
+    nodes = list(graph.nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+
+    index = {node: i for i, node in enumerate(nodes)}
+    sources, targets, weights = [], [], []
+    parents: List[List[int]] = [[] for _ in nodes]
+    for source, target in graph.edges():
+        if source == target:
+            continue
+        s, t = index[source], index[target]
+        if _is_subclass_edge(graph, source, target):
+            parents[s].append(t)
+            weights.append(1.0)
+        else:
+            weights.append(relation_weight)
+        sources.append(s)
+        targets.append(t)
+
+    rank = _inheritance_depth(parents)
+    layers = [[] for _ in range(max(rank) + 1)]
+    for i in range(n):
+        layers[rank[i]].append(i)
+
+    # Each edge in both directions, grouped by the layer of the node it
+    # pulls on and split by whether the other end is above or below it.
+    ends = np.array(sources + targets, dtype=np.intp)
+    others = np.array(targets + sources, dtype=np.intp)
+    edge_weights = np.array(weights + weights, dtype=float)
+    rank = np.array(rank, dtype=np.intp)
+    above, below = [], []
+    for direction, pulls in ((above, rank[others] < rank[ends]), (below, rank[others] > rank[ends])):
+        grouped = np.argsort(rank[ends[pulls]], kind='stable')
+        end, other, weight = ends[pulls][grouped], others[pulls][grouped], edge_weights[pulls][grouped]
+        bounds = np.searchsorted(rank[end], np.arange(len(layers) + 1))
+        for layer in range(len(layers)):
+            part = slice(bounds[layer], bounds[layer + 1])
+            direction.append((end[part], other[part], weight[part]))
+
+    # Relative position of each node within its layer, from 0 to 1 so that
+    # layers of different widths can be compared.
+    x = np.zeros(n)
+    members = [np.array(layer, dtype=np.intp) for layer in layers]
+    local = np.zeros(n, dtype=np.intp)
+    for layer in members:
+        x[layer] = (np.arange(len(layer)) + .5) / len(layer)
+        local[layer] = np.arange(len(layer))
+
+    def sweep(order, pulls) -> bool:
+        changed = False
+        for layer in order:
+            nodes_in_layer = members[layer]
+            end, other, weight = pulls[layer]
+            if not len(end):
+                continue
+            size = len(nodes_in_layer)
+            total = np.bincount(local[end], weight, size)
+            pulled = np.bincount(local[end], weight * x[other], size)
+            barycentre = np.where(total > 0, pulled / np.maximum(total, 1e-12), x[nodes_in_layer])
+            ordered = nodes_in_layer[np.argsort(barycentre, kind='stable')]
+            if (ordered != nodes_in_layer).any():
+                changed = True
+                members[layer] = ordered
+                x[ordered] = (np.arange(size) + .5) / size
+                local[ordered] = np.arange(size)
+        return changed
+
+    def crossings() -> float:
+        total = 0.0
+        for layer in range(1, len(layers)):
+            end, other, weight = above[layer]
+            adjacent = rank[other] == layer - 1
+            total += _crossings(local[other[adjacent]], local[end[adjacent]], weight[adjacent])
+        return total
+
+    # A sweep can undo some of the work of the one before, so keep the
+    # order with the fewest crossings between adjacent layers.
+    down, up = range(1, len(layers)), range(len(layers) - 2, -1, -1)
+    best, fewest = list(members), crossings()
+    unchanged = 0
+    for i in range(iterations or 8):
+        if sweep(up if i % 2 else down, below if i % 2 else above):
+            unchanged = 0
+            count = crossings()
+            if count < fewest:
+                best, fewest = list(members), count
+        else:
+            unchanged += 1
+        if unchanged == 2 or fewest == 0:
+            break
+    members = best
+
+    max_width = max_width or max(8, math.ceil(2 * math.sqrt(n)))
+    rows = []
+    for layer in members:
+        rows.extend(layer[start:start + max_width] for start in range(0, len(layer), max_width))
+
+    widest = max(len(row) for row in rows)
+    x_step = 2 / max(widest - 1, 1)
+    y_step = 2 / max(len(rows) - 1, 1)
+    positions = {}
+    for row_index, row in enumerate(rows):
+        left = -(len(row) - 1) * x_step / 2
+        y = 1 - row_index * y_step if len(rows) > 1 else 0.0
+        for column, i in enumerate(row):
+            positions[nodes[i]] = (left + column * x_step, y)
+    return positions
+
+
+def _crossings(upper, lower, weight) -> float:
+    """Return the number of crossings between edges joining two layers,
+    each weighted by the product of the weights of the crossing edges.
+    upper and lower are the positions of the ends of each edge in its layer.
+
+    Counts inversions with a bottom-up merge sort: at each level, each
+    element of the right half of a block is compared with the sorted left
+    half using one searchsorted over all blocks at once."""
+    import numpy as np
+
+    if len(upper) < 2:
+        return 0.0
+    order = np.lexsort((lower, upper))
+    values = lower[order].astype(np.int64)
+    weights = weight[order]
+    span = int(values.max()) + 1
+    position = np.arange(len(values))
+    total = 0.0
+    size = 1
+    while size < len(values):
+        block = position // (2 * size)
+        right = (position // size) % 2 == 1
+        # Left halves are sorted and blocks are in order, so these keys are ascending.
+        left_keys = (block * span + values)[~right]
+        left_weights = np.concatenate(([0.0], np.cumsum(weights[~right])))
+        keys = block[right] * span + values[right]
+        greater = (
+            left_weights[np.searchsorted(left_keys, block[right] * span + span, 'left')]
+            - left_weights[np.searchsorted(left_keys, keys, 'right')]
+        )
+        total += float((weights[right] * greater).sum())
+
+        merged = np.argsort(block * span + values, kind='stable')
+        values, weights = values[merged], weights[merged]
+        size *= 2
+    return total
+
+
+def _is_subclass_edge(graph: 'nx.Graph', source, target) -> bool:
+    """Return True if source inherits from target. Graphs without models
+    from generate_graph treat every edge as inheritance."""
+    models = graph.graph.get('models')
+    if models is None:
+        return True
+    model = models.get(source)
+    return model is not None and target in model.class_dependencies
+
+
+def _inheritance_depth(parents: List[List[int]]) -> List[int]:
+    """Return the length of the longest chain of parents above each node.
+
+    Cycles are broken by placing the first unplaced node as soon as there
+    are none left whose parents are all placed."""
+    waiting = [len(p) for p in parents]
+    children: List[List[int]] = [[] for _ in parents]
+    for child, node_parents in enumerate(parents):
+        for parent in node_parents:
+            children[parent].append(child)
+
+    depth = [0] * len(parents)
+    placed = [False] * len(parents)
+    ready = deque(i for i, count in enumerate(waiting) if count == 0)
+    unplaced = iter(range(len(parents)))
+    remaining = len(parents)
+    while remaining:
+        if not ready:
+            ready.append(next(i for i in unplaced if not placed[i]))
+        node = ready.popleft()
+        if placed[node]:
+            continue
+        placed[node] = True
+        remaining -= 1
+        for child in children[node]:
+            if placed[child]:
+                continue
+            depth[child] = max(depth[child], depth[node] + 1)
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                ready.append(child)
+    return depth
+
+
+LAYOUTS: Dict[str, Callable[..., Positions]] = {
+    'circular': circular_layout,
+    'spring': spring_layout,
+    'force': force_layout,
+    'layered': layered_layout,
+}
+
+
+def _as_tuples(positions) -> Positions:
+    return {node: (float(p[0]), float(p[1])) for node, p in positions.items()}
+
+
+def _seed_positions(graph: 'nx.Graph', initial: Positions) -> Positions:
+    """Return initial positions for every node in graph. A node without one
+    is placed at the centre of its neighbours that have one, or near the
+    centre of the layout if none do."""
+    rng = random.Random(0)
+    positions = {node: initial[node] for node in graph.nodes if node in initial}
+    if positions:
+        centre_x = sum(p[0] for p in positions.values()) / len(positions)
+        centre_y = sum(p[1] for p in positions.values()) / len(positions)
+    else:
+        centre_x = centre_y = 0.0
+
+    for node in graph.nodes:
+        if node in positions:
+            continue
+        placed = [initial[n] for n in _neighbours(graph, node) if n in initial]
+        if placed:
+            x = sum(p[0] for p in placed) / len(placed)
+            y = sum(p[1] for p in placed) / len(placed)
+        else:
+            x, y = centre_x, centre_y
+        # Jitter so that new nodes with the same neighbours do not overlap.
+        positions[node] = (x + rng.uniform(-.05, .05), y + rng.uniform(-.05, .05))
+    return positions
+
+
+def _neighbours(graph: 'nx.Graph', node):
+    if graph.is_directed():
+        yield from graph.predecessors(node)
+        yield from graph.successors(node)
+    else:
+        yield from graph.neighbors(node)
+
+
+def graph_fingerprint(graph: 'nx.Graph', layout: str = '') -> str:
+    """Return a hash of the nodes and edges of graph, independent of the
+    order they were added in."""
+    digest = hashlib.sha1(f'{LAYOUT_VERSION}:{layout}'.encode())
+    for node in sorted(map(str, graph.nodes)):
+        digest.update(b'n' + node.encode() + b'\0')
+    for source, target in sorted((str(s), str(t)) for s, t in graph.edges()):
+        digest.update(b'e' + source.encode() + b'\0' + target.encode() + b'\0')
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """Keep the positions of the most recent layout for a key between runs.
+
+    If the fingerprint of the graph is unchanged its positions are reused
+    without running the layout. Otherwise the layout is run starting from the
+    cached positions of any nodes that are still in the graph, so the diagram
+    stays stable across small schema changes.
+
+    key should identify what is being drawn, e.g. the project directory and
+    options. Each key has its own file, and only the max_files most recently
+    used are kept. If cache_dir is None positions are only kept in memory."""
+
+    def __init__(self, cache_dir: Optional[str], key: str, max_files: int = 32):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, f'layout-{digest}.pickle') if cache_dir else None
+        self.max_files = max_files
+        self.fingerprint: Optional[str] = None
+        self.positions: Positions = {}
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+
+        try:
+            with open(self.path, 'rb') as f:
+                self.fingerprint, self.positions = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            log.warning(f'Ignoring unreadable layout cache {self.path}: {e}')
+
+    def layout(self, graph: 'nx.Graph', layout: str = 'circular', iterations: Optional[int] = None) -> Positions:
+        """Return positions for graph from the cache, or from LAYOUTS[layout]
+        seeded with cached positions."""
+        fingerprint = graph_fingerprint(graph, f'{layout}:{iterations}' if iterations else layout)
+        if fingerprint == self.fingerprint:
+            log.debug('Layout cache hit')
+            if self.path:
+                self._touch()
+            return self.positions
+
+        initial = {node: self.positions[node] for node in graph.nodes if node in self.positions}
+        log.debug(f'Layout cache miss: {len(initial)} of {len(graph)} nodes have cached positions')
+        positions = LAYOUTS[layout](graph, initial or None, iterations)
+
+        self.fingerprint, self.positions = fingerprint, positions
+        if self.path:
+            _dump_atomic(self.path, (fingerprint, positions))
+            self._prune()
+        return positions
+
+    def _touch(self):
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Remove the least recently used layout files beyond max_files."""
+        try:
+            entries = [
+                e for e in os.scandir(self.cache_dir)
+                if e.name.startswith('layout-') and e.name.endswith('.pickle')
+            ]
+        except OSError:
+            return
+
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_files:]:
+            if entry.path == self.path:
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def layout_fn(self, layout: str = 'circular', iterations: Optional[int] = None) -> Callable[['nx.Graph'], Positions]:
+        """Return a function that can be passed as the layout_fn of show_graph."""
+        return lambda graph: self.layout(graph, layout, iterations)
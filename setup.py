@@ -12,6 +12,12 @@ log = logging.getLogger(__name__)
 setup(
     name='djmodgraph',
     version='0.1',
+    py_modules=[
+        'model_class_dependencies',
+        'model_class_export',
+        'model_class_graph',
+        'model_class_layout',
+    ],
     scripts=[
         'model_class_dependencies.py',
     ],
@@ -131,3 +131,24 @@ class Bill(ParliamentDotUkMixin, BaseModel):
         related_name='bills',
     )
 """
+
+DIAMOND_MODELS = """class Child(Left, Right):
+    child = models.CharField(max_length=10)
+
+
+class Left(Base):
+    name = models.TextField()
+    left = models.CharField(max_length=10)
+
+
+class Right(Base):
+    right = models.CharField(max_length=10)
+
+
+class Base(models.Model):
+    name = models.CharField(max_length=10)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
+"""
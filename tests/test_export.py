@@ -0,0 +1,223 @@
+"""
+
+"""
+
+import io
+import json
+import logging
+import os
+import xml.etree.ElementTree as ElementTree
+from unittest import TestCase
+
+import networkx as nx
+
+from model_class_dependencies import (
+    get_models_for_directory,
+    group_by_app,
+)
+from model_class_export import (
+    SVG_MARGIN,
+    SVG_SIZE,
+    write_dot,
+    write_graphml,
+    write_json,
+    write_jsonl,
+    write_svg,
+)
+from model_class_graph import (
+    classify,
+    collapse_apps,
+    generate_graph,
+)
+
+log = logging.getLogger(__name__)
+
+
+class DotExportTests(TestCase):
+    """Tests to ensure write_dot writes every node and edge that show_graph would draw."""
+
+    def setUp(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.graph, self.nodes, self.edges = generate_graph(get_models_for_directory(directory))
+
+    def _write_dot(self, **kwargs) -> str:
+        stream = io.StringIO()
+        write_dot(self.graph, self.nodes, self.edges, stream, **kwargs)
+        return stream.getvalue()
+
+    def test_write_dot(self):
+        dot = self._write_dot()
+        lines = dot.splitlines()
+        self.assertEqual('digraph models {', lines[0])
+        self.assertEqual('}', lines[-1])
+
+        self.assertIn('    "Constituency" [fillcolor="#244461ff"];', lines)
+        self.assertIn('    "BaseModel" [fillcolor="#555555b2"];', lines)
+        self.assertIn('    "ConstituencyResult" -> "Constituency" [color="#4f9bd1e6"];', lines)
+        self.assertIn('    "BaseModel" -> "models.Model" [color="#d68bb64c"];', lines)
+
+        edges = [line for line in lines if ' -> ' in line]
+        self.assertEqual(sum(len(e) for e in self.edges.values()), len(edges))
+
+        node_lines = [line for line in lines[3:] if ' -> ' not in line and line != '}']
+        self.assertEqual(self.graph.number_of_nodes(), len(node_lines))
+
+    def test_write_dot__disabled_entities(self):
+        dot = self._write_dot(abstract_enabled=False, subclass_enabled=False)
+        self.assertNotIn('#555555', dot)
+        self.assertNotIn('#d68bb6', dot)
+        self.assertIn('#4f9bd1', dot)
+
+
+class SvgExportTests(TestCase):
+    """Tests to ensure write_svg draws every node, label and edge that show_graph would draw."""
+
+    SVG = '{http://www.w3.org/2000/svg}'
+
+    def setUp(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.graph, self.nodes, self.edges = generate_graph(get_models_for_directory(directory))
+
+    def _write_svg(self, graph=None, nodes=None, edges=None, **kwargs):
+        stream = io.StringIO()
+        write_svg(graph or self.graph, nodes or self.nodes, edges or self.edges, stream, **kwargs)
+        return ElementTree.fromstring(stream.getvalue())
+
+    def _group(self, root, name):
+        return root.find(f'{self.SVG}g[@class="{name}"]')
+
+    def test_write_svg(self):
+        root = self._write_svg()
+
+        self.assertEqual(len(self.nodes['concrete']), len(self._group(root, 'concrete')))
+        self.assertEqual(len(self.nodes['abstract']), len(self._group(root, 'abstract')))
+        self.assertEqual('#244461', self._group(root, 'concrete').get('fill'))
+
+        labels = [text.text or '' for text in self._group(root, 'labels')]
+        self.assertListEqual(list(self.graph.nodes), labels)
+
+        for kind, edges in self.edges.items():
+            group = self._group(root, kind)
+            self.assertEqual(len([e for e in edges if e[0] != e[1]]), len(group), kind)
+
+    def test_write_svg__disabled_entities(self):
+        root = self._write_svg(abstract_enabled=False, related_field_enabled=False)
+        self.assertIsNone(self._group(root, 'abstract'))
+        self.assertIsNone(self._group(root, 'foreignkey'))
+        self.assertIsNotNone(self._group(root, 'subclass'))
+
+    def test_write_svg__positions(self):
+        graph = nx.MultiDiGraph()
+        graph.add_edge('A', 'B<T>')
+        nodes = {'abstract': [], 'concrete': ['A', 'B<T>']}
+        edges = {'foreignkey': [('A', 'B<T>')]}
+
+        root = self._write_svg(graph, nodes, edges, positions={'A': (0, 0), 'B<T>': (2, 1)})
+        circles = [(float(c.get('cx')), float(c.get('cy'))) for c in self._group(root, 'concrete')]
+        self.assertEqual((SVG_MARGIN, SVG_SIZE - SVG_MARGIN), circles[0])
+        self.assertEqual((SVG_SIZE - SVG_MARGIN, SVG_SIZE / 2), circles[1])
+
+        self.assertListEqual(['A', 'B<T>'], [t.text for t in self._group(root, 'labels')])
+        self.assertTrue(self._group(root, 'foreignkey')[0].get('d').startswith('M36.0 1980.0Q'))
+
+
+class StructuredExportTests(TestCase):
+    """Tests to ensure the JSON, JSON lines and GraphML exports describe the same graph."""
+
+    def setUp(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.graph, self.nodes, self.edges = generate_graph(get_models_for_directory(directory))
+
+    def _write(self, writer, **kwargs) -> str:
+        stream = io.StringIO()
+        writer(self.graph, self.nodes, self.edges, stream, **kwargs)
+        return stream.getvalue()
+
+    def test_write_json(self):
+        data = json.loads(self._write(write_json))
+
+        self.assertListEqual(list(self.graph.nodes), [m['name'] for m in data['models']])
+        self.assertEqual(sum(len(e) for e in self.edges.values()), len(data['edges']))
+
+        models = {m['name']: m for m in data['models']}
+        self.assertEqual('external', models['models.Model']['kind'])
+        self.assertNotIn('fields', models['models.Model'])
+        self.assertEqual('abstract', models['BaseModel']['kind'])
+        self.assertTrue(models['BaseModel']['abstract'])
+
+        chair = models['CommitteeChair']
+        self.assertEqual('concrete', chair['kind'])
+        self.assertTrue(chair['source'].endswith('committees.py'))
+        self.assertListEqual(['PeriodMixin', 'BaseModel'], chair['bases'])
+        member = chair['fields'][0]
+        self.assertEqual('foreignkey', member['relation'])
+        self.assertListEqual(['CommitteeMember'], member['args'])
+        self.assertEqual('models.CASCADE', member['kwargs']['on_delete'])
+        self.assertIn({'source': 'CommitteeChair', 'target': 'CommitteeMember', 'kind': 'foreignkey'}, data['edges'])
+
+    def test_write_jsonl(self):
+        lines = [json.loads(line) for line in self._write(write_jsonl, subclass_enabled=False).splitlines()]
+        data = json.loads(self._write(write_json, subclass_enabled=False))
+
+        self.assertListEqual(data['models'], [
+            {k: v for k, v in line.items() if k != 'type'} for line in lines if line['type'] == 'model'
+        ])
+        self.assertListEqual(data['edges'], [
+            {k: v for k, v in line.items() if k != 'type'} for line in lines if line['type'] == 'edge'
+        ])
+        self.assertNotIn('subclass', {edge['kind'] for edge in data['edges']})
+
+    def test_write_graphml(self):
+        graph = nx.parse_graphml(self._write(write_graphml))
+
+        self.assertEqual(self.graph.number_of_nodes(), graph.number_of_nodes())
+        self.assertEqual(sum(len(e) for e in self.edges.values()), graph.number_of_edges())
+
+        chair = graph.nodes['CommitteeChair']
+        self.assertEqual('concrete', chair['kind'])
+        self.assertFalse(chair['abstract'])
+        self.assertEqual('PeriodMixin,BaseModel', chair['bases'])
+        self.assertEqual('foreignkey', json.loads(chair['fields'])[0]['relation'])
+        self.assertEqual('external', graph.nodes['models.Model']['kind'])
+        self.assertIn(('CommitteeChair', 'CommitteeMember', 'foreignkey'), list(graph.edges(data='kind')))
+
+    def test_collapsed_apps(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        classes = get_models_for_directory(directory)
+        nodes, edges = classify(classes)
+        self.graph, self.nodes, self.edges = collapse_apps(classes, nodes, edges, group_by_app(classes, directory))
+        weights = self.graph.graph['weights']
+
+        data = json.loads(self._write(write_json))
+        models = {m['name']: m for m in data['models']}
+        self.assertDictEqual({'name': 'somepackage', 'kind': 'app', 'models': 7}, models['somepackage'])
+        self.assertListEqual(
+            [weights[edge['kind']][(edge['source'], edge['target'])] for edge in data['edges']],
+            [edge['weight'] for edge in data['edges']],
+        )
+
+        graph = nx.parse_graphml(self._write(write_graphml))
+        self.assertEqual('app', graph.nodes['somepackage']['kind'])
+        self.assertListEqual(
+            sorted((edge['source'], edge['target'], edge['weight']) for edge in data['edges']),
+            sorted(graph.edges(data='weight')),
+        )
+
+        stream = io.StringIO()
+        write_dot(self.graph, self.nodes, self.edges, stream)
+        self.assertIn(
+            '    "example-models-package" -> "someotherpackage.subpackage" [color="#4f9bd1e6", penwidth=3.32];',
+            stream.getvalue().splitlines(),
+        )
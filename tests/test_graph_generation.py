@@ -11,7 +11,15 @@ from model_class_dependencies import (
     PyClass,
     generate_graph,
     _flatten,
+    app_label,
     get_models_for_directory,
+    group_by_app,
+)
+from model_class_graph import (
+    EdgeIndex,
+    classify,
+    collapse_apps,
+    filter_graph,
 )
 
 log = logging.getLogger(__name__)
@@ -95,3 +103,170 @@ class GraphGenerationTests(TestCase):
 
         self.assertFalse(graph.has_node('DeclaredInterest'))
         self.assertFalse(graph.has_node('WebAddress'))
+
+
+class FilterGraphTests(TestCase):
+    """Tests to ensure filtering the full graph matches generate_graph with for_models."""
+
+    def setUp(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.classes: Dict[str, PyClass] = get_models_for_directory(directory)
+
+    def assertSameGraph(self, expected, actual):
+        expected_graph, expected_nodes, expected_edges = expected
+        graph, nodes, edges = actual
+        self.assertSetEqual(set(expected_graph.nodes), set(graph.nodes))
+        self.assertListEqual(sorted(expected_graph.edges()), sorted(graph.edges()))
+        for kind in expected_nodes:
+            self.assertListEqual(sorted(expected_nodes[kind]), sorted(nodes[kind]))
+        for kind in expected_edges:
+            self.assertListEqual(sorted(expected_edges[kind]), sorted(edges[kind]))
+
+    def test_filter_graph(self):
+        queries = [[name] for name in self.classes] + [['Party', 'Constituency'], ['models.Model'], ['Missing']]
+        for entities in [
+            {},
+            {'abstract_enabled': False},
+            {'related_field_enabled': False},
+            {'subclass_enabled': False},
+        ]:
+            _, edges = classify(self.classes)
+            index = EdgeIndex(edges)
+            for query in queries:
+                with self.subTest(query=query, **entities):
+                    self.assertSameGraph(
+                        generate_graph(self.classes, for_models=query, **entities),
+                        filter_graph(self.classes, index, query, **entities),
+                    )
+
+
+class EdgeIndexTests(TestCase):
+    """Tests to ensure neighbourhoods follow the chosen kinds and direction to the chosen depth."""
+
+    EDGES = {
+        'foreignkey': [('A', 'B'), ('B', 'C'), ('C', 'D'), ('E', 'A'), ('A', 'B')],
+        'onetoone': [],
+        'manytomany': [('F', 'B')],
+        'subclass': [('B', 'Base'), ('D', 'Base')],
+    }
+
+    def setUp(self):
+        self.index = EdgeIndex(self.EDGES)
+
+    def expand(self, *args, **kwargs):
+        return {kind: sorted(edges) for kind, edges in self.index.expand(*args, **kwargs).items()}
+
+    def test_depth_one_is_incident_edges(self):
+        self.assertDictEqual(
+            {
+                'foreignkey': [('A', 'B'), ('A', 'B'), ('B', 'C')],
+                'onetoone': [],
+                'manytomany': [('F', 'B')],
+                'subclass': [('B', 'Base')],
+            },
+            self.expand(['B']),
+        )
+
+    def test_depth(self):
+        edges = self.expand(['B'], depth=2)
+        self.assertListEqual([('A', 'B'), ('A', 'B'), ('B', 'C'), ('C', 'D'), ('E', 'A')], edges['foreignkey'])
+        self.assertListEqual([('B', 'Base'), ('D', 'Base')], edges['subclass'])
+
+        edges = self.expand(['B'], depth=3)
+        self.assertListEqual([('B', 'Base'), ('D', 'Base')], edges['subclass'])
+
+    def test_direction(self):
+        forward = self.expand(['A'], depth=3, direction='forward')
+        self.assertListEqual([('A', 'B'), ('A', 'B'), ('B', 'C'), ('C', 'D')], forward['foreignkey'])
+        self.assertListEqual([('B', 'Base')], forward['subclass'])
+        self.assertListEqual([], forward['manytomany'])
+
+        reverse = self.expand(['B'], depth=3, direction='reverse')
+        self.assertListEqual([('A', 'B'), ('A', 'B'), ('E', 'A')], reverse['foreignkey'])
+        self.assertListEqual([('F', 'B')], reverse['manytomany'])
+        self.assertListEqual([], reverse['subclass'])
+
+        with self.assertRaises(ValueError):
+            self.index.expand(['A'], direction='up')
+
+    def test_kinds(self):
+        edges = self.expand(['Base'], depth=4, kinds=['subclass'])
+        self.assertListEqual([('B', 'Base'), ('D', 'Base')], edges['subclass'])
+        self.assertListEqual([], edges['foreignkey'])
+
+    def test_filter_graph_with_depth(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        classes = get_models_for_directory(directory)
+        _, edges = classify(classes)
+        index = EdgeIndex(edges)
+
+        neighbours, _, _ = filter_graph(classes, index, ['Party'])
+        expected = generate_graph(classes, for_models=list(neighbours.nodes))[0]
+        deeper, _, _ = filter_graph(classes, index, ['Party'], depth=2)
+        self.assertSetEqual(set(expected.nodes), set(deeper.nodes))
+        self.assertListEqual(sorted(expected.edges()), sorted(deeper.edges()))
+
+
+class CollapseAppsTests(TestCase):
+    """Models are grouped by the directory they are defined in."""
+
+    def setUp(self):
+        self.directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.classes = get_models_for_directory(self.directory)
+        self.apps = group_by_app(self.classes, self.directory)
+        self.nodes, self.edges = classify(self.classes)
+
+    def test_app_label(self):
+        self.assertEqual('shop', app_label('/project/shop/models.py', '/project'))
+        self.assertEqual('shop.orders', app_label('/project/shop/orders/models.py', '/project'))
+        self.assertEqual('shop', app_label('/project/shop/models/order.py', '/project'))
+        self.assertEqual('project', app_label('/project/base.py', '/project'))
+
+    def test_group_by_app(self):
+        self.assertEqual('example-models-package', self.apps['Committee'])
+        self.assertEqual('somepackage', self.apps['Town'])
+        self.assertEqual('someotherpackage', self.apps['Party'])
+        self.assertEqual('someotherpackage.subpackage', self.apps['Person'])
+        self.assertDictEqual(self.apps, group_by_app(self.classes))
+
+    def test_collapse_apps(self):
+        graph, nodes, edges = collapse_apps(self.classes, self.nodes, self.edges, self.apps)
+
+        self.assertSetEqual(set(self.apps.values()), set(nodes['app']))
+        self.assertListEqual([], nodes['abstract'] + nodes['concrete'])
+        self.assertEqual(len(self.classes), sum(graph.graph['app_sizes'].values()))
+
+        weights = graph.graph['weights']
+        for kind, kind_edges in self.edges.items():
+            self.assertListEqual(list(weights[kind]), edges[kind])
+            # Edges within an app are dropped and every other edge is counted once.
+            between = [
+                (source, target) for source, target in kind_edges
+                if self.apps.get(source, source) != self.apps.get(target, target)
+            ]
+            self.assertEqual(len(between), sum(weights[kind].values()))
+            for source, target in edges[kind]:
+                self.assertTrue(graph.has_edge(source, target))
+
+        self.assertIn(('example-models-package', 'someotherpackage.subpackage'), edges['foreignkey'])
+
+    def test_collapse_apps__expand(self):
+        _, nodes, edges = collapse_apps(self.classes, self.nodes, self.edges, self.apps, expand=['somepackage'])
+
+        self.assertNotIn('somepackage', nodes['app'])
+        self.assertSetEqual(
+            {name for name, app in self.apps.items() if app == 'somepackage'},
+            set(nodes['abstract'] + nodes['concrete']),
+        )
+        # Edges between models of an expanded app are kept.
+        self.assertIn(('Town', 'Country'), edges['foreignkey'])
+        self.assertIn(('Experience', 'someotherpackage.subpackage'), edges['foreignkey'])
@@ -0,0 +1,53 @@
+"""
+
+"""
+
+import logging
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+log = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportTests(TestCase):
+    """Tests to ensure the parsing core can be used without loading plotting libraries."""
+
+    def _loaded_modules(self, code: str):
+        result = subprocess.run(
+            [sys.executable, '-c', code + '\nimport sys\nprint(" ".join(sys.modules))'],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+        return set(result.stdout.split())
+
+    def test_core_does_not_import_plotting(self):
+        modules = self._loaded_modules(
+            'from model_class_dependencies import get_models_for_directory\n'
+            'get_models_for_directory("tests/data/example-models-package")'
+        )
+        self.assertNotIn('matplotlib', modules)
+        self.assertNotIn('networkx', modules)
+
+    def test_graph_module_imports_plotting_lazily(self):
+        modules = self._loaded_modules('import model_class_graph')
+        self.assertNotIn('matplotlib', modules)
+        self.assertNotIn('networkx', modules)
+
+    def test_graph_functions_available_from_core(self):
+        import model_class_dependencies
+        import model_class_graph
+
+        self.assertIs(model_class_graph.generate_graph, model_class_dependencies.generate_graph)
+        self.assertIs(model_class_graph.show_graph, model_class_dependencies.show_graph)
+
+    def test_graph_functions_from_graph_module(self):
+        from model_class_dependencies import _flatten, get_models_for_directory
+        from model_class_graph import generate_graph
+
+        models = get_models_for_directory(os.path.join(REPO_ROOT, 'tests/data/example-models-package'))
+        graph, nodes, edges = generate_graph(models)
+        self.assertLessEqual(set(_flatten(nodes.values())), set(graph.nodes))
+        self.assertGreater(graph.number_of_edges(), 0)
@@ -0,0 +1,223 @@
+"""
+
+"""
+
+import logging
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import networkx as nx
+import numpy as np
+
+from model_class_dependencies import PyClass
+from model_class_layout import (
+    LAYOUTS,
+    LayoutCache,
+    _crossings,
+    _repulsion,
+    force_layout,
+    graph_fingerprint,
+    layered_layout,
+    spring_layout,
+)
+
+log = logging.getLogger(__name__)
+
+
+def _graph(edges) -> nx.MultiDiGraph:
+    graph = nx.MultiDiGraph()
+    graph.add_edges_from(edges)
+    return graph
+
+
+class LayoutCacheTests(TestCase):
+    """Tests to ensure layouts are reused for unchanged graphs and seeded for changed ones."""
+
+    EDGES = [('A', 'B'), ('B', 'C'), ('C', 'A'), ('D', 'A')]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp.name
+        self.layout = mock.Mock(wraps=spring_layout)
+        patcher = mock.patch.dict(LAYOUTS, spring=self.layout)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_graph_fingerprint(self):
+        fingerprint = graph_fingerprint(_graph(self.EDGES))
+        self.assertEqual(fingerprint, graph_fingerprint(_graph(reversed(self.EDGES))))
+        self.assertNotEqual(fingerprint, graph_fingerprint(_graph(self.EDGES[:-1])))
+        self.assertNotEqual(fingerprint, graph_fingerprint(_graph(self.EDGES + [('A', 'B')])))
+        self.assertNotEqual(fingerprint, graph_fingerprint(_graph(self.EDGES), 'spring'))
+
+    def test_unchanged_graph_skips_layout(self):
+        positions = LayoutCache(self.cache_dir, 'project').layout(_graph(self.EDGES), 'spring')
+        self.assertEqual(1, self.layout.call_count)
+
+        cached = LayoutCache(self.cache_dir, 'project').layout(_graph(reversed(self.EDGES)), 'spring')
+        self.assertEqual(1, self.layout.call_count)
+        self.assertEqual(positions, cached)
+
+        LayoutCache(self.cache_dir, 'other project').layout(_graph(self.EDGES), 'spring')
+        self.assertEqual(2, self.layout.call_count)
+
+    def test_changed_graph_is_seeded(self):
+        positions = LayoutCache(self.cache_dir, 'project').layout(_graph(self.EDGES), 'spring')
+
+        graph = _graph(self.EDGES + [('E', 'D')])
+        updated = LayoutCache(self.cache_dir, 'project').layout(graph, 'spring')
+        self.assertEqual(2, self.layout.call_count)
+
+        initial = self.layout.call_args[0][1]
+        self.assertEqual(positions, initial)
+        self.assertEqual(set(graph.nodes), set(updated))
+
+    def test_old_layouts_are_pruned(self):
+        """Only the most recently used layouts are kept, one file per key."""
+        for i in range(5):
+            cache = LayoutCache(self.cache_dir, f'project {i}', max_files=3)
+            cache.layout(_graph(self.EDGES), 'spring')
+            cache.layout(_graph(self.EDGES + [('E', 'A')]), 'spring')
+            os.utime(cache.path, (i, i))
+
+        self.assertEqual(3, len(os.listdir(self.cache_dir)))
+
+        # A cache hit counts as a use, so project 2 is kept over project 3.
+        LayoutCache(self.cache_dir, 'project 2', max_files=3).layout(_graph(self.EDGES + [('E', 'A')]), 'spring')
+        LayoutCache(self.cache_dir, 'project 5', max_files=3).layout(_graph(self.EDGES), 'spring')
+        self.assertEqual(3, len(os.listdir(self.cache_dir)))
+        for i in (2, 4, 5):
+            self.assertTrue(os.path.exists(LayoutCache(self.cache_dir, f'project {i}').path))
+
+    def test_memory_only(self):
+        cache = LayoutCache(None, 'project')
+        cache.layout(_graph(self.EDGES), 'spring')
+        cache.layout(_graph(self.EDGES), 'spring')
+        self.assertEqual(1, self.layout.call_count)
+        self.assertListEqual([], os.listdir(self.cache_dir))
+
+
+class ForceLayoutTests(TestCase):
+    """Tests for the Barnes-Hut approximation and the force layout built on it."""
+
+    def _exact_repulsion(self, points):
+        delta = points[:, None, :] - points[None, :, :]
+        distance2 = (delta * delta).sum(2)
+        np.fill_diagonal(distance2, np.inf)
+        return (delta / distance2[:, :, None]).sum(1)
+
+    def _relative_error(self, points, theta):
+        exact = self._exact_repulsion(points)
+        approximate = _repulsion(points, 1.0, theta)
+        return np.linalg.norm(approximate - exact, axis=1) / np.linalg.norm(exact, axis=1)
+
+    def test_repulsion_is_close_to_exact(self):
+        points = np.random.default_rng(0).random((300, 2))
+        self.assertLess(np.median(self._relative_error(points, 0)), 1e-3)
+        self.assertLess(np.median(self._relative_error(points, .8)), .05)
+
+    def test_repulsion_with_coincident_points(self):
+        points = np.array([[0., 0.], [0., 0.], [1., 1.]])
+        self.assertTrue(np.isfinite(_repulsion(points, 1.0, .8)).all())
+
+    def test_every_node_is_placed(self):
+        graph = nx.gnm_random_graph(200, 400, seed=0, directed=True)
+        positions = force_layout(graph, iterations=20)
+        self.assertSetEqual(set(graph.nodes), set(positions))
+        values = np.array(list(positions.values()))
+        self.assertTrue(np.isfinite(values).all())
+        self.assertAlmostEqual(1.0, np.abs(values).max())
+
+    def test_connected_nodes_are_closer(self):
+        graph = nx.MultiDiGraph()
+        graph.add_edges_from([(f'a{i}', f'a{i + 1}') for i in range(20)])
+        graph.add_edges_from([(f'b{i}', f'b{i + 1}') for i in range(20)])
+        positions = {node: np.array(xy) for node, xy in force_layout(graph).items()}
+
+        def mean_distance(group_a, group_b):
+            return np.mean([np.linalg.norm(positions[a] - positions[b]) for a in group_a for b in group_b])
+
+        a = [node for node in graph if node.startswith('a')]
+        b = [node for node in graph if node.startswith('b')]
+        self.assertLess(mean_distance(a, a), mean_distance(a, b))
+
+    def test_placed_nodes_are_kept(self):
+        graph = nx.gnm_random_graph(100, 200, seed=0, directed=True)
+        positions = force_layout(graph, iterations=20)
+
+        graph.add_edge('new', 0)
+        updated = force_layout(graph, positions, iterations=20)
+        self.assertSetEqual(set(graph.nodes), set(updated))
+        for node, position in positions.items():
+            self.assertEqual(position, updated[node])
+
+    def test_small_graphs(self):
+        self.assertDictEqual({}, force_layout(nx.MultiDiGraph()))
+        graph = nx.MultiDiGraph()
+        graph.add_node('A')
+        self.assertDictEqual({'A': (0.0, 0.0)}, force_layout(graph))
+
+
+class LayeredLayoutTests(TestCase):
+    """Tests to ensure inheritance hierarchies are placed in ordered layers."""
+
+    def _models(self, bases):
+        models = {name: PyClass(name, parents, []) for name, parents in bases.items()}
+        for model in models.values():
+            model.is_model = True
+        return models
+
+    def _graph(self, bases, relations=()):
+        graph = _graph([(name, parent) for name, parents in bases.items() for parent in parents])
+        graph.add_edges_from(relations)
+        graph.graph['models'] = self._models(bases)
+        return graph
+
+    def test_subclasses_are_below_bases(self):
+        bases = {
+            'Base': [],
+            'Mixin': [],
+            'Child': ['Base'],
+            'GrandChild': ['Child', 'Mixin'],
+            'Other': ['Base'],
+        }
+        positions = layered_layout(self._graph(bases, relations=[('Base', 'GrandChild')]))
+
+        self.assertSetEqual(set(bases), set(positions))
+        y = {name: position[1] for name, position in positions.items()}
+        self.assertEqual(y['Base'], y['Mixin'])
+        self.assertEqual(y['Child'], y['Other'])
+        self.assertGreater(y['Base'], y['Child'])
+        self.assertGreater(y['Child'], y['GrandChild'])
+
+    def test_crossings_are_removed(self):
+        # Children are added in the opposite order to their parents.
+        bases = {'A': [], 'B': [], 'C': [], 'C1': ['C'], 'B1': ['B'], 'A1': ['A']}
+        positions = layered_layout(self._graph(bases))
+        for parent in 'ABC':
+            self.assertEqual(positions[parent][0], positions[f'{parent}1'][0])
+
+    def test_edges_without_models_are_inheritance(self):
+        positions = layered_layout(_graph([('B', 'A'), ('C', 'B')]))
+        self.assertGreater(positions['A'][1], positions['B'][1])
+        self.assertGreater(positions['B'][1], positions['C'][1])
+
+    def test_cycles(self):
+        positions = layered_layout(_graph([('A', 'B'), ('B', 'C'), ('C', 'A'), ('D', 'A')]))
+        self.assertSetEqual({'A', 'B', 'C', 'D'}, set(positions))
+
+    def test_wide_layers_are_wrapped(self):
+        bases = {'Base': [], **{f'Child{i}': ['Base'] for i in range(10)}}
+        positions = layered_layout(self._graph(bases), max_width=4)
+        rows = {position[1] for position in positions.values()}
+        self.assertEqual(4, len(rows))
+        self.assertEqual(11, len(set(positions.values())))
+
+    def test_crossing_count(self):
+        self.assertEqual(0, _crossings(np.array([0, 1]), np.array([0, 1]), np.ones(2)))
+        self.assertEqual(1, _crossings(np.array([0, 1]), np.array([1, 0]), np.ones(2)))
+        self.assertEqual(0, _crossings(np.array([0, 0]), np.array([1, 0]), np.ones(2)))
+        self.assertEqual(.5, _crossings(np.array([0, 1, 2]), np.array([1, 0, 2]), np.array([1, .5, 1])))
+        self.assertEqual(3, _crossings(np.array([0, 1, 2]), np.array([2, 1, 0]), np.ones(3)))
@@ -8,6 +8,9 @@ from typing import Dict
 from unittest import TestCase
 
 from model_class_dependencies import (
+    filter_models,
+    get_models_for_directory,
+    inherit_mixin_fields,
     parse_classes_from_directory,
     PyClass,
 )
@@ -85,3 +88,33 @@ class FilesystemDiscoveryTests(TestCase):
             expected_classes,
             actual_classes
         )
+
+    def test_parse_classes_from_directory__parallel(self):
+        """Parsing with several jobs should give the same result as a serial run."""
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+
+        serial = parse_classes_from_directory(directory)
+        parallel = parse_classes_from_directory(directory, jobs=2)
+
+        self.assertListEqual(list(serial.keys()), list(parallel.keys()))
+        self.assertListEqual(list(serial.values()), list(parallel.values()))
+
+    def test_get_models_for_directory__two_phase(self):
+        """Parsing fields only for models should give the same result as
+        parsing every class in full."""
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+
+        expected = parse_classes_from_directory(directory)
+        filter_models(expected)
+        inherit_mixin_fields(expected)
+
+        actual = get_models_for_directory(directory)
+
+        self.assertListEqual(list(expected.keys()), list(actual.keys()))
+        self.assertListEqual(list(expected.values()), list(actual.values()))
@@ -10,6 +10,7 @@ from unittest import TestCase
 from model_class_dependencies import (
     PyClass,
     filter_models,
+    parse_classes,
     parse_classes_from_directory,
 )
 
@@ -66,3 +67,21 @@ class ModelFilteringTests(TestCase):
             expected_models,
             actual_models
         )
+
+    def test_filter_models__deep_inheritance(self):
+        """Models are found at any distance from models.Model, whatever
+        order the classes are defined in."""
+        depth = 50
+        text = ''.join(
+            f'class Level{i}(Level{i - 1}):\n    pass\n\n'
+            for i in reversed(range(1, depth))
+        )
+        text += 'class Level0(models.Model):\n    pass\n\n'
+        text += 'class NotAModel(object):\n    pass\n\n'
+        text += 'class AlsoNotAModel(NotAModel):\n    pass\n\n'
+
+        classes: Dict[str, PyClass] = parse_classes(text)
+        examined = filter_models(classes)
+
+        self.assertCountEqual([f'Level{i}' for i in range(depth)], classes.keys())
+        self.assertEqual(depth, examined)
@@ -0,0 +1,134 @@
+"""
+
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import model_class_dependencies
+from model_class_dependencies import (
+    ParseCache,
+    find_python_files,
+    get_models_for_directory,
+    parse_classes_from_directory,
+)
+
+log = logging.getLogger(__name__)
+
+
+class ParseCacheTests(TestCase):
+    """Tests to ensure cached parse results are reused only while they are valid."""
+
+    def setUp(self):
+        source = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.tmp = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmp, 'project')
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+        shutil.copytree(source, self.directory)
+        self.file_count = len(list(find_python_files(self.directory)))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _parse(self):
+        cache = ParseCache(self.cache_dir, self.directory)
+        parse_classes = mock.Mock(wraps=model_class_dependencies.parse_classes)
+        with mock.patch.dict(model_class_dependencies.PARSERS, regex=parse_classes):
+            classes = parse_classes_from_directory(self.directory, cache=cache, headers_only=True)
+        return classes, parse_classes.call_count
+
+    def _get_models(self):
+        parse_classes = mock.Mock(wraps=model_class_dependencies.parse_classes)
+        with mock.patch.dict(model_class_dependencies.PARSERS, regex=parse_classes):
+            models = get_models_for_directory(self.directory, cache_dir=self.cache_dir)
+        return models, parse_classes.call_count
+
+    def test_warm_run_parses_nothing(self):
+        cold, cold_calls = self._parse()
+        warm, warm_calls = self._parse()
+
+        self.assertEqual(cold_calls, self.file_count)
+        self.assertEqual(warm_calls, 0)
+        self.assertListEqual(list(cold.values()), list(warm.values()))
+
+    def test_changed_file_is_parsed_again(self):
+        self._parse()
+
+        filepath = os.path.join(self.directory, 'address.py')
+        with open(filepath, 'a') as f:
+            f.write('\n\nclass Extra(models.Model):\n    name = models.CharField(max_length=10)\n')
+
+        classes, calls = self._parse()
+        self.assertEqual(calls, 1)
+        self.assertIn('Extra', classes)
+
+    def test_touched_file_with_same_contents_is_not_parsed(self):
+        self._parse()
+
+        filepath = os.path.join(self.directory, 'address.py')
+        stat = os.stat(filepath)
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        _, calls = self._parse()
+        self.assertEqual(calls, 0)
+
+    def test_deleted_file_is_dropped(self):
+        self._parse()
+        os.remove(os.path.join(self.directory, 'address.py'))
+
+        classes, calls = self._parse()
+        self.assertEqual(calls, 0)
+        self.assertNotIn('WebAddress', classes)
+
+    def test_version_change_invalidates_cache(self):
+        self._parse()
+
+        with mock.patch.object(model_class_dependencies, 'CACHE_VERSION', -1):
+            _, calls = self._parse()
+
+        self.assertEqual(calls, self.file_count)
+
+    def test_model_bodies_are_cached(self):
+        cold, cold_calls = self._get_models()
+        warm, warm_calls = self._get_models()
+
+        self.assertGreater(cold_calls, self.file_count)
+        self.assertEqual(warm_calls, 0)
+        self.assertListEqual(list(cold.keys()), list(warm.keys()))
+        for name, model in cold.items():
+            self.assertListEqual(list(model.fields), list(warm[name].fields))
+
+    def test_full_parse_with_cache(self):
+        """Without headers_only, cached classes are returned with their fields."""
+        expected = parse_classes_from_directory(self.directory)
+        cache = ParseCache(self.cache_dir, self.directory)
+
+        self.assertListEqual(
+            list(expected.values()),
+            list(parse_classes_from_directory(self.directory, cache=cache).values()),
+        )
+
+    def test_base_class_change_in_another_file(self):
+        """A subclass in an unchanged file stops being a model with its base."""
+        base = os.path.join(self.directory, 'base_changes.py')
+        with open(base, 'w') as f:
+            f.write('class ChangingBase(models.Model):\n    name = models.CharField(max_length=10)\n')
+        with open(os.path.join(self.directory, 'child_of_changing.py'), 'w') as f:
+            f.write('class ChangingChild(ChangingBase):\n    size = models.IntegerField()\n')
+
+        models, _ = self._get_models()
+        self.assertIn('ChangingChild', models)
+
+        with open(base, 'w') as f:
+            f.write('class ChangingBase(object):\n    name = models.CharField(max_length=10)\n')
+
+        models, _ = self._get_models()
+        self.assertNotIn('ChangingBase', models)
+        self.assertNotIn('ChangingChild', models)
+        self.assertListEqual(list(get_models_for_directory(self.directory)), list(models))
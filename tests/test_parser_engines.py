@@ -0,0 +1,79 @@
+"""
+
+"""
+
+import logging
+import os
+from unittest import TestCase
+
+from model_class_dependencies import (
+    PARSERS,
+    get_models_for_directory,
+    parse_classes,
+)
+from .data.data_parsing import *
+
+log = logging.getLogger(__name__)
+
+NESTED_PARENTHESES_MODEL = """@register
+class Thing(BaseModel):
+    name = models.CharField(max_length=64, help_text='Name (or alias)')
+    owner = models.ForeignKey(
+        'Person',
+        on_delete=models.CASCADE,
+        limit_choices_to=Q(active=True),
+    )
+
+    class Choices(models.TextChoices):
+        RED = 'r', _('Red')
+
+    class Meta:
+        ordering = ('name',)
+        abstract = True
+
+    def get_label(self):
+        label = format_label(self.name)
+        return label
+"""
+
+
+class ParserEngineTests(TestCase):
+    """Tests to ensure that each engine in PARSERS produces the same structures."""
+
+    def test_engines_match_regex_on_simple_input(self):
+        for text in [SIMPLE_MODEL, COMPLEX_MODEL, MULTIPLE_MODELS, MODEL_WITH_MIXIN]:
+            expected = parse_classes(text)
+            for name, parse in PARSERS.items():
+                with self.subTest(parser=name):
+                    self.assertDictEqual(expected, parse(text))
+
+    def test_engines_match_regex_on_example_package(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        expected = get_models_for_directory(directory)
+
+        for name in PARSERS:
+            with self.subTest(parser=name):
+                actual = get_models_for_directory(directory, parser=name)
+                self.assertListEqual(list(expected.keys()), list(actual.keys()))
+                for model in expected.values():
+                    self.assertCountEqual(model.related_models(), actual[model.name].related_models())
+                    self.assertEqual(model.abstract, actual[model.name].abstract)
+
+    def test_nested_parentheses_and_classes(self):
+        for name in ['ast', 'tokenize']:
+            with self.subTest(parser=name):
+                thing = PARSERS[name](NESTED_PARENTHESES_MODEL)['Thing']
+                self.assertListEqual(['name', 'owner'], [f.name for f in thing.fields])
+                self.assertEqual('Name (or alias)', thing.fields[0].kwargs['help_text'])
+                self.assertEqual('Q(active=True)', thing.fields[1].kwargs['limit_choices_to'])
+                self.assertListEqual(['Person'], thing.fields[1].args)
+                self.assertTrue(thing.abstract)
+
+    def test_invalid_syntax_is_tolerated(self):
+        text = SIMPLE_MODEL + '\ndef broken(:\n'
+        for name in ['ast', 'tokenize']:
+            with self.subTest(parser=name):
+                self.assertDictEqual(parse_classes(text), PARSERS[name](text))
@@ -3,9 +3,13 @@ Run with `nosetests --traverse-namespace`
 """
 
 import logging
+import pickle
+import tracemalloc
 from unittest import TestCase
 
 from model_class_dependencies import (
+    Field,
+    InheritedFields,
     inherit_mixin_fields,
     parse_field,
     parse_field_params,
@@ -118,3 +122,123 @@ class ParsingTests(TestCase):
 
         print(publication.foreign_key_models())
         self.assertTrue('Bill' in publication.foreign_key_models())
+
+    def test_inherit_mixin_fields__transitive_mro(self):
+        """Fields are inherited from every ancestor in method resolution order,
+        with fields closer to the model taking precedence."""
+        models = parse_classes(DIAMOND_MODELS)
+        for x in models.values():
+            x.is_model = True
+
+        inherit_mixin_fields(models)
+
+        child = models["Child"]
+        self.assertListEqual(
+            ["child", "name", "left", "right", "created_on"],
+            [x.name for x in child.fields]
+        )
+        # Left overrides the `name` field declared on Base.
+        self.assertEqual("models.TextField", child.fields[1].type)
+
+    def test_inherit_mixin_fields__shares_base_fields(self):
+        models = parse_classes(DIAMOND_MODELS)
+        for x in models.values():
+            x.is_model = True
+
+        inherit_mixin_fields(models)
+        inherit_mixin_fields(models)  # Resolving again should not duplicate fields.
+
+        child = models["Child"]
+        self.assertIsInstance(child.fields, InheritedFields)
+        self.assertIs(models["Left"].fields, child.fields.bases[0])
+        self.assertIs(models["Base"].fields, models["Left"].fields.bases[0])
+        self.assertIs(models["Base"].fields, models["Right"].fields.bases[0])
+        self.assertEqual(5, len(child.fields))
+
+    def test_inherit_mixin_fields__deep_chain(self):
+        """Each model is resolved from the resolved fields of its base, so long
+        chains of mixins do not slow down inheritance or field access."""
+        depth = 400
+        models = parse_classes(''.join(
+            f'class Mixin{d}({f"Mixin{d - 1}" if d else "models.Model"}):\n'
+            f'    field_{d} = models.CharField(max_length=10)\n\n'
+            for d in range(depth)
+        ))
+        for x in models.values():
+            x.is_model = True
+
+        inherit_mixin_fields(models)
+
+        fields = models[f'Mixin{depth - 1}'].fields
+        self.assertEqual(depth, len(fields))
+        self.assertEqual(f'field_{depth - 1}', fields[0].name)
+        self.assertEqual('field_0', fields[-1].name)
+        self.assertListEqual(models[f'Mixin{depth - 2}'].fields.mro(), fields.mro()[1:])
+
+    def test_inherit_mixin_fields__memory_grows_linearly(self):
+        """Resolving a chain of mixins does not copy the fields of each base
+        into each subclass, so memory grows with the depth of the chain
+        rather than its square."""
+
+        def peak(depth: int) -> int:
+            models = parse_classes(''.join(
+                f'class Mixin{d}({f"Mixin{d - 1}" if d else "models.Model"}):\n'
+                f'    field_{d} = models.CharField(max_length=10)\n\n'
+                for d in range(depth)
+            ))
+            tracemalloc.start()
+            try:
+                inherit_mixin_fields(models)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        # Four times as deep: about four times the memory if linear, sixteen if quadratic.
+        self.assertLess(peak(2000), peak(500) * 8)
+
+    def test_inherited_fields__wide_mixins(self):
+        """The order of fields follows Python's own method resolution order
+        for classes that combine many mixins."""
+        classes = {}
+        fields = {}
+        for i in range(40):
+            # Each class extends up to three earlier ones, newest first, as
+            # mixins are usually listed before the classes they build on.
+            bases = [f'C{j}' for j in range(i - 1, max(i - 8, -1), -3)]
+            classes[f'C{i}'] = type(f'C{i}', tuple(classes[b] for b in bases) or (object,), {})
+            fields[f'C{i}'] = InheritedFields(
+                [Field(f'f{i}', 'models.CharField', [], {}), Field('shared', 'models.CharField', [str(i)], {})],
+                tuple(fields[b] for b in bases),
+            )
+
+        for name, cls in classes.items():
+            expected = [c.__name__ for c in cls.__mro__ if c is not object]
+            names = [f'f{c[1:]}' for c in expected]
+            self.assertListEqual(names[:1] + ['shared'] + names[1:], [field.name for field in fields[name]])
+            self.assertEqual(name[1:], fields[name][1].args[0])
+            self.assertEqual(len(expected) + 1, len(fields[name]))
+
+    def test_relations_are_indexed_once(self):
+        """Relation accessors reuse the index built from fields until fields
+        is replaced."""
+        bill = parse_classes(COMPLEX_MODEL)["Bill"]
+        bill.is_model = True
+
+        fk_models = bill.foreign_key_models()
+        self.assertIs(fk_models, bill.foreign_key_models())
+        self.assertListEqual(["BillType", "ParliamentarySession"], bill.related_models())
+        self.assertListEqual([], bill.many_to_many_models())
+
+        bill.fields = [x for x in bill.fields if x.name != 'session']
+        self.assertListEqual(["BillType"], bill.foreign_key_models())
+
+    def test_parsed_strings_are_shared(self):
+        models = parse_classes(MULTIPLE_MODELS)
+        fks = [f for m in models.values() for f in m.fields if f.type == "models.ForeignKey"]
+        self.assertGreater(len(fks), 1)
+        for fk in fks[1:]:
+            self.assertIs(fks[0].type, fk.type)
+
+        bill = pickle.loads(pickle.dumps(models["Bill"]))
+        self.assertEqual(models["Bill"], bill)
+        self.assertIs(fks[0].type, [f for f in bill.fields if f.type == "models.ForeignKey"][0].type)
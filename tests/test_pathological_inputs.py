@@ -0,0 +1,104 @@
+"""
+Ensure that parsing time grows linearly with the size of the input.
+
+Each input here is large enough that a pattern with quadratic behaviour would
+take minutes or hours, while a linear one finishes in well under a second.
+"""
+
+import logging
+import time
+from unittest import TestCase
+
+from model_class_dependencies import (
+    PARSERS,
+    parse_classes,
+)
+
+log = logging.getLogger(__name__)
+
+TIME_LIMIT_SECONDS = 2
+
+MODEL_TEMPLATE = """
+
+class GeneratedModel{index}(ParliamentDotUkMixin, BaseModel):
+    title = models.CharField(max_length=512)
+    description = models.TextField(blank=True)
+    person = models.ForeignKey(
+        'Person',
+        on_delete=models.CASCADE,
+        related_name='generated_{index}',
+    )
+    tags = models.ManyToManyField('Tag')
+
+    class Meta:
+        abstract = {abstract}
+
+    def __str__(self):
+        return f'{{self.title}}'
+"""
+
+
+def _model(body: str) -> str:
+    return f'class Adversarial(models.Model):\n{body}'
+
+
+ADVERSARIAL_BODIES = {
+    'assignments without calls': '    value = 1\n' * 100_000,
+    'long whitespace run': ' ' * 1_000_000 + 'x\n',
+    'many whitespace-only lines': '    \n' * 200_000,
+    'meta without abstract': '    class Meta:\n        ordering = 1\n' * 50_000,
+    'unclosed calls': '    value = call(\n' * 100_000,
+    'unclosed calls closed at end': '    value = call(\n' * 100_000 + ')\n',
+    'long token': '    ' + 'x' * 1_000_000 + ' = 1\n',
+}
+
+ADVERSARIAL_FILES = {
+    'unclosed class headers': 'class Adversarial(\n' * 100_000,
+    'long class name': 'class ' + 'A' * 1_000_000 + '\n',
+    'many empty classes': 'class Empty(object):\n    pass\n' * 100_000,
+}
+
+
+class PathologicalInputTests(TestCase):
+    def assertFast(self, parse, text: str, limit: float = TIME_LIMIT_SECONDS):
+        start = time.perf_counter()
+        parse(text)
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, limit, f'Took {elapsed:.2f}s to parse {len(text)} characters')
+
+    def test_large_generated_file(self):
+        text = ''.join(
+            MODEL_TEMPLATE.format(index=i, abstract=i % 2 == 0)
+            for i in range(5_000)
+        )
+        self.assertGreater(len(text), 2_000_000)
+
+        start = time.perf_counter()
+        classes = parse_classes(text)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, TIME_LIMIT_SECONDS)
+        self.assertEqual(5_000, len(classes))
+        self.assertTrue(classes['GeneratedModel0'].abstract)
+        self.assertFalse(classes['GeneratedModel1'].abstract)
+        self.assertEqual(4, len(classes['GeneratedModel1'].fields))
+
+    def test_adversarial_class_bodies(self):
+        for label, body in ADVERSARIAL_BODIES.items():
+            with self.subTest(label):
+                self.assertFast(parse_classes, _model(body))
+
+    def test_adversarial_files(self):
+        for label, text in ADVERSARIAL_FILES.items():
+            with self.subTest(label):
+                self.assertFast(parse_classes, text)
+
+    def test_adversarial_inputs_with_other_engines(self):
+        """ast and tokenize are slower per character, so use smaller inputs."""
+        inputs = {label: _model(body[:len(body) // 10]) for label, body in ADVERSARIAL_BODIES.items()}
+        inputs.update({label: text[:len(text) // 10] for label, text in ADVERSARIAL_FILES.items()})
+
+        for name in ['ast', 'tokenize']:
+            for label, text in inputs.items():
+                with self.subTest(parser=name, input=label):
+                    self.assertFast(PARSERS[name], text)
@@ -0,0 +1,89 @@
+"""
+
+"""
+
+import io
+import json
+import logging
+import os
+import tempfile
+import tracemalloc
+from unittest import TestCase
+
+from model_class_dependencies import (
+    Profile,
+    _starmap,
+    find_python_files,
+    generate_graph,
+    get_models_for_directory,
+    show_graph,
+)
+
+log = logging.getLogger(__name__)
+
+
+class ProfileTests(TestCase):
+    """Tests to ensure --profile reports every stage without changing the results."""
+
+    def setUp(self):
+        self.directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+
+    def test_profile_stages(self):
+        profile = Profile(slowest=3)
+        models = get_models_for_directory(self.directory, profile=profile)
+        with profile.stage('graph'):
+            graph, nodes, edges = generate_graph(models)
+        show_graph(graph, nodes, edges, show=False, profile=profile)
+
+        self.assertEqual(list(get_models_for_directory(self.directory)), list(models))
+
+        report = json.loads(_write(profile))
+        self.assertListEqual(
+            ['walk', 'read', 'parse', 'filter', 'inherit', 'graph', 'layout', 'render'],
+            [stage['name'] for stage in report['stages']]
+        )
+        for stage in report['stages']:
+            self.assertGreaterEqual(stage['seconds'], 0)
+            self.assertGreater(stage['peak_memory'], 0)
+
+        self.assertEqual(len(list(find_python_files(self.directory))), report['files']['count'])
+
+        slowest = report['slowest_files']
+        self.assertEqual(3, len(slowest))
+        times = [f['read_seconds'] + f['parse_seconds'] for f in slowest]
+        self.assertListEqual(sorted(times, reverse=True), times)
+        for f in slowest:
+            self.assertEqual(os.path.getsize(f['path']), f['size'])
+
+    def test_profile_with_cache(self):
+        """Files that are served from the cache are not read or parsed again."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            get_models_for_directory(self.directory, cache_dir=cache_dir)
+
+            profile = Profile(memory=False)
+            get_models_for_directory(self.directory, cache_dir=cache_dir, profile=profile)
+
+        report = profile.report()
+        self.assertEqual(0, report['files']['count'])
+        self.assertIsNone(report['stages'][0]['peak_memory'])
+
+    def test_workers_do_not_trace_memory(self):
+        """Tracing is left to the main process, so parallel parsing is not slowed down."""
+        profile = Profile()
+        with profile.stage('parse'):
+            self.assertTrue(tracemalloc.is_tracing())
+            tracing = _starmap(_is_tracing, [(i,) for i in range(4)], jobs=2)
+        self.assertListEqual([False] * 4, tracing)
+
+
+def _is_tracing(_) -> bool:
+    return tracemalloc.is_tracing()
+
+
+def _write(profile: Profile) -> str:
+    stream = io.StringIO()
+    profile.write(stream)
+    return stream.getvalue()
@@ -0,0 +1,137 @@
+"""
+
+"""
+
+import logging
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.patches import FancyArrowPatch
+
+from model_class_dependencies import (
+    get_models_for_directory,
+    group_by_app,
+)
+from model_class_graph import (
+    EDGE_STYLES,
+    TILE_INDEX,
+    _edge_width,
+    classify,
+    collapse_apps,
+    generate_graph,
+    show_graph,
+    write_tiles,
+)
+from model_class_layout import circular_layout
+
+log = logging.getLogger(__name__)
+
+
+class ShowGraphTests(TestCase):
+    """Tests to ensure large graphs are drawn with one collection per edge kind."""
+
+    def setUp(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.graph, self.nodes, self.edges = generate_graph(get_models_for_directory(directory))
+        self.edge_count = sum(len(e) for e in self.edges.values())
+        self.addCleanup(plt.close, 'all')
+
+    def _draw(self, **kwargs):
+        """Draw the graph and return its axes, keeping the figure open."""
+        with mock.patch.object(plt, 'close'):
+            show_graph(self.graph, self.nodes, self.edges, show=False, **kwargs)
+        return plt.figure(1).axes[0]
+
+    def test_small_graph_is_curved(self):
+        ax = self._draw(curved_edge_limit=self.edge_count + 1)
+        self.assertFalse([c for c in ax.collections if isinstance(c, LineCollection)])
+        self.assertTrue([p for p in ax.patches if isinstance(p, FancyArrowPatch)])
+
+    def test_large_graph_is_batched(self):
+        ax = self._draw(curved_edge_limit=self.edge_count)
+        self.assertFalse([p for p in ax.patches if isinstance(p, FancyArrowPatch)])
+
+        lines = [c for c in ax.collections if isinstance(c, LineCollection)]
+        arrows = [c for c in ax.collections if isinstance(c, PolyCollection)]
+        self.assertEqual(len([k for k in EDGE_STYLES if self.edges[k]]), len(lines))
+        self.assertEqual(len(lines), len(arrows))
+
+        drawn = sum(len(c.get_segments()) for c in lines)
+        loops = sum(1 for edges in self.edges.values() for s, t in edges if s == t)
+        self.assertEqual(self.edge_count - loops, drawn)
+
+        subclass = lines[-1]
+        self.assertEqual(len(self.edges['subclass']), len(subclass.get_segments()))
+        for color in subclass.get_colors():
+            self.assertAlmostEqual(EDGE_STYLES['subclass']['alpha'], color[3])
+
+    def test_collapsed_apps(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        classes = get_models_for_directory(directory)
+        nodes, edges = classify(classes)
+        self.graph, self.nodes, self.edges = collapse_apps(classes, nodes, edges, group_by_app(classes, directory))
+        weights = self.graph.graph['weights']
+
+        ax = self._draw(curved_edge_limit=0)
+        self.assertIn('somepackage (7)', [text.get_text() for text in ax.texts])
+
+        foreignkey = [c for c in ax.collections if isinstance(c, LineCollection)][0]
+        self.assertListEqual(
+            [_edge_width(weights['foreignkey'][edge]) for edge in self.edges['foreignkey']],
+            list(foreignkey.get_linewidths()),
+        )
+
+
+class WriteTilesTests(TestCase):
+    """Tests to ensure tiles cover every model and count the edges between them."""
+
+    def setUp(self):
+        directory = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.graph, self.nodes, self.edges = generate_graph(get_models_for_directory(directory))
+        self.positions = circular_layout(self.graph)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_write_tiles(self):
+        crossings = write_tiles(self.graph, self.nodes, self.edges, self.tmp.name, positions=self.positions, grid=2)
+
+        files = set(os.listdir(self.tmp.name))
+        self.assertIn(TILE_INDEX, files)
+        self.assertSetEqual({f'tile-{row}-{column}.png' for row, column in crossings}, files - {TILE_INDEX})
+
+        with open(os.path.join(self.tmp.name, TILE_INDEX)) as f:
+            index = f.read()
+        for row, column in crossings:
+            self.assertIn(f'src="tile-{row}-{column}.png"', index)
+
+        for here, counts in crossings.items():
+            self.assertNotIn(here, counts)
+            for there, count in counts.items():
+                self.assertEqual(count, crossings[there][here])
+
+        xs = [x for x, _ in self.positions.values()]
+        ys = [y for _, y in self.positions.values()]
+        middle_x, middle_y = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+
+        def tile(node):
+            x, y = self.positions[node]
+            return int(y <= middle_y), int(x >= middle_x)
+
+        expected = sum(
+            1 for edges in self.edges.values() for source, target in edges
+            if tile(source) != tile(target)
+        )
+        self.assertEqual(2 * expected, sum(sum(counts.values()) for counts in crossings.values()))
+        self.assertEqual(4, len(crossings))
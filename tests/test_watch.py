@@ -0,0 +1,127 @@
+"""
+
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import model_class_dependencies
+from model_class_dependencies import (
+    DirectoryWatcher,
+    get_models_for_directory,
+)
+
+log = logging.getLogger(__name__)
+
+
+class DirectoryWatcherTests(TestCase):
+    """Tests to ensure watch mode only resolves models affected by a change."""
+
+    def setUp(self):
+        source = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'tests/data/example-models-package'
+        )
+        self.tmp = tempfile.mkdtemp()
+        self.directory = os.path.join(self.tmp, 'project')
+        shutil.copytree(source, self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _edit(self, relpath: str, text: str):
+        filepath = os.path.join(self.directory, relpath)
+        with open(filepath, 'a') as f:
+            f.write(text)
+
+        # Make sure the change is visible on filesystems with coarse timestamps.
+        stat = os.stat(filepath)
+        os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_initial_models_match_full_run(self):
+        watcher = DirectoryWatcher(self.directory)
+        expected = get_models_for_directory(self.directory)
+
+        self.assertListEqual(list(expected.keys()), list(watcher.models.keys()))
+        for name, model in expected.items():
+            self.assertCountEqual(
+                [f.name for f in model.fields],
+                [f.name for f in watcher.models[name].fields],
+            )
+
+    def test_update_without_changes(self):
+        watcher = DirectoryWatcher(self.directory)
+        self.assertSetEqual(set(), watcher.update())
+
+    def test_update_resolves_subclasses_of_changed_class(self):
+        watcher = DirectoryWatcher(self.directory)
+        town = watcher.models['Town']
+        post = watcher.models['GovernmentPost']
+
+        self._edit(
+            'someotherpackage/subpackage/posts.py',
+            '\n\nclass BasePost(BaseModel):\n    extra = models.CharField(max_length=10)\n',
+        )
+        affected = watcher.update()
+
+        self.assertIn('BasePost', affected)
+        self.assertIn('GovernmentPost', affected)
+        self.assertNotIn('Town', affected)
+
+        self.assertIs(town, watcher.models['Town'])
+        self.assertIsNot(post, watcher.models['GovernmentPost'])
+        self.assertIn('extra', [f.name for f in watcher.models['GovernmentPost'].fields])
+
+    def test_update_adds_and_removes_models(self):
+        watcher = DirectoryWatcher(self.directory)
+
+        self._edit('address.py', '\n\nclass Extra(BaseModel):\n    name = models.CharField(max_length=10)\n')
+        watcher.update()
+        self.assertIn('Extra', watcher.models)
+
+        os.remove(os.path.join(self.directory, 'address.py'))
+        watcher.update()
+        self.assertNotIn('Extra', watcher.models)
+        self.assertNotIn('WebAddress', watcher.models)
+        self.assertIn('Person', watcher.models)
+
+    def test_file_removed_before_it_is_parsed(self):
+        """A file that disappears between the walk and the parse, such as an
+        editor's temporary file, is skipped without losing later changes."""
+        watcher = DirectoryWatcher(self.directory)
+        temporary = os.path.join(self.directory, '.address.py.swp.py')
+        with open(temporary, 'w') as f:
+            f.write('class Temporary(models.Model):\n    name = models.CharField(max_length=10)\n')
+
+        parse_files = model_class_dependencies.parse_files
+
+        def remove_then_parse(filepaths, *args, **kwargs):
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return parse_files(filepaths, *args, **kwargs)
+
+        with mock.patch.object(model_class_dependencies, 'parse_files', side_effect=remove_then_parse):
+            self._edit('address.py', '\n\nclass Extra(BaseModel):\n    name = models.CharField(max_length=10)\n')
+            watcher.update()
+
+        self.assertIn('Extra', watcher.models)
+        self.assertNotIn('Temporary', watcher.models)
+        self.assertSetEqual(set(), watcher.update())
+
+        self._edit('committees.py', '\n\nclass Later(BaseModel):\n    name = models.CharField(max_length=10)\n')
+        watcher.update()
+        self.assertIn('Later', watcher.models)
+
+    def test_failed_update_is_retried(self):
+        watcher = DirectoryWatcher(self.directory)
+        self._edit('address.py', '\n\nclass Extra(BaseModel):\n    name = models.CharField(max_length=10)\n')
+
+        with mock.patch.object(model_class_dependencies, 'parse_files', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                watcher.update()
+
+        watcher.update()
+        self.assertIn('Extra', watcher.models)